@@ -0,0 +1,21 @@
+"""
+URL configuration of the API, without the admin and the documentation
+(the ROOT_URLCONF of payment_system.settings_api).
+"""
+from django.conf import settings
+from django.urls import path, re_path, include
+
+from wallets.views import operations, get_token, export_operations, metrics
+
+if settings.WALLETS_ASYNC_READS:
+    from wallets.async_views import operations_async as operations
+
+urlpatterns = [
+    path('wallets/', include('wallets.urls')),
+    path('generate_token/', get_token),
+    path('metrics', metrics),
+    re_path('operations/(?P<wallet_id>[0-9]+)/'
+            '(?P<operation>[a-z]*)/?export/$', export_operations),
+    re_path('operations/(?P<wallet_id>[0-9]+)/'
+            '(?P<operation>[a-z]*)/?$', operations),
+]
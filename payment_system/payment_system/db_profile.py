@@ -0,0 +1,85 @@
+"""
+Database profile built from the environment.
+
+WALLETS_DB_ENGINE selects the backend: "sqlite" (default) or "postgresql".
+SQLite uses WALLETS_DB_NAME as the file path, PostgreSQL also reads
+WALLETS_DB_USER, WALLETS_DB_PASSWORD, WALLETS_DB_HOST and WALLETS_DB_PORT.
+WALLETS_DB_CONN_MAX_AGE keeps the connections open between requests.
+
+The "replica" database is added if WALLETS_DB_REPLICA_NAME (SQLite)
+or WALLETS_DB_REPLICA_HOST (PostgreSQL) is set, the other parameters
+are the same as the primary ones (see wallets.replicas).
+
+The SQLite PRAGMAs are applied to every new connection
+by wallets.signals, WALLETS_SQLITE_PRAGMAS overrides them
+as "name=value,name=value" ("" disables all of them).
+"""
+import os
+
+SQLITE_PRAGMAS = {
+    # readers do not block the writer and the writer does not block readers
+    'journal_mode': 'WAL',
+    # in the WAL mode a commit is durable after a crash of the process,
+    # only a power loss may drop the last transactions
+    'synchronous': 'NORMAL',
+    # wait for the write lock instead of failing with "database is locked"
+    'busy_timeout': '5000',
+    'mmap_size': str(256 * 1024 * 1024),
+    # negative values are KiB
+    'cache_size': str(-64 * 1024),
+    'temp_store': 'MEMORY',
+}
+
+
+def sqlite_pragmas(environ=os.environ) -> dict:
+    value = environ.get('WALLETS_SQLITE_PRAGMAS')
+    if value is None:
+        return dict(SQLITE_PRAGMAS)
+
+    pragmas = {}
+    for item in filter(None, (item.strip() for item in value.split(','))):
+        name, _, setting = item.partition('=')
+        if not (name.isidentifier() and setting.replace('-', '').isalnum()):
+            raise ValueError(f'Invalid SQLite PRAGMA: {item}')
+        pragmas[name.lower()] = setting
+    return pragmas
+
+
+def databases(base_dir, environ=os.environ) -> dict:
+    """
+    Returns the DATABASES setting.
+    """
+    engine = environ.get('WALLETS_DB_ENGINE', 'sqlite')
+    database = {
+        'ATOMIC_REQUESTS': True,
+        'CONN_MAX_AGE': int(environ.get('WALLETS_DB_CONN_MAX_AGE', 60)),
+    }
+    if engine == 'sqlite':
+        database.update({
+            'ENGINE': 'django.db.backends.sqlite3',
+            'NAME': environ.get('WALLETS_DB_NAME', base_dir / 'db.sqlite3'),
+            # seconds, the same as busy_timeout for the Python driver
+            'OPTIONS': {'timeout': 5},
+        })
+    elif engine == 'postgresql':
+        database.update({
+            'ENGINE': 'django.db.backends.postgresql',
+            'NAME': environ.get('WALLETS_DB_NAME', 'payment_system'),
+            'USER': environ.get('WALLETS_DB_USER', 'postgres'),
+            'PASSWORD': environ.get('WALLETS_DB_PASSWORD', ''),
+            'HOST': environ.get('WALLETS_DB_HOST', 'localhost'),
+            'PORT': environ.get('WALLETS_DB_PORT', '5432'),
+        })
+    else:
+        raise ValueError(f'Unsupported WALLETS_DB_ENGINE: {engine}')
+
+    result = {'default': database}
+    if engine == 'sqlite' and environ.get('WALLETS_DB_REPLICA_NAME'):
+        result['replica'] = dict(database, NAME=environ['WALLETS_DB_REPLICA_NAME'])
+    elif engine == 'postgresql' and environ.get('WALLETS_DB_REPLICA_HOST'):
+        result['replica'] = dict(database, HOST=environ['WALLETS_DB_REPLICA_HOST'],
+                                 PORT=environ.get('WALLETS_DB_REPLICA_PORT', database['PORT']))
+    if 'replica' in result:
+        # read-only, the views are made atomic on the primary only
+        result['replica'].update(ATOMIC_REQUESTS=False, TEST={'MIRROR': 'default'})
+    return result
@@ -12,6 +12,8 @@ https://docs.djangoproject.com/en/3.1/ref/settings/
 import os
 from pathlib import Path
 
+from payment_system.db_profile import databases, sqlite_pragmas
+
 # Build paths inside the project like this: BASE_DIR / 'subdir'.
 BASE_DIR = Path(__file__).resolve().parent.parent
 
@@ -53,6 +55,8 @@ INSTALLED_APPS = [
 CRISPY_TEMPLATE_PACK = 'bootstrap4'
 
 MIDDLEWARE = [
+    'wallets.middleware.MetricsMiddleware',
+    'wallets.middleware.ContentNegotiationMiddleware',
     'django.middleware.security.SecurityMiddleware',
     'django.contrib.sessions.middleware.SessionMiddleware',
     'django.middleware.common.CommonMiddleware',
@@ -88,13 +92,92 @@ WSGI_APPLICATION = 'payment_system.wsgi.application'
 # Database
 # https://docs.djangoproject.com/en/3.1/ref/settings/#databases
 
-DATABASES = {
+# The database is configured by the WALLETS_DB_* environment variables,
+# see payment_system.db_profile
+DATABASES = databases(BASE_DIR)
+
+# Reads of the GET requests go to the "replica" database if it is configured,
+# see wallets.replicas
+DATABASE_ROUTERS = ['wallets.replicas.ReplicaRouter']
+WALLETS_REPLICA_STICKY_SECONDS = int(os.environ.get('WALLETS_REPLICA_STICKY_SECONDS', 5))
+WALLETS_REPLICA_MAX_LAG = float(os.environ.get('WALLETS_REPLICA_MAX_LAG', 5))
+
+# Applied to every new SQLite connection by wallets.signals
+WALLETS_SQLITE_PRAGMAS = sqlite_pragmas()
+
+# Ping the connections kept from the previous request (CONN_MAX_AGE)
+# and reconnect if they are broken
+WALLETS_DB_HEALTH_CHECKS = os.environ.get('WALLETS_DB_HEALTH_CHECKS', '1') == '1'
+
+# Serve the read-only views by the async views (see wallets.async_views),
+# enabled by asgi.py
+WALLETS_ASYNC_READS = os.environ.get('WALLETS_ASYNC_READS') == '1'
+
+# Size of the thread pool running the ORM queries of the async views
+WALLETS_ASYNC_DB_THREADS = int(os.environ.get('WALLETS_ASYNC_DB_THREADS', 8))
+
+# Directory shared by the worker processes of the host to aggregate /metrics,
+# only the metrics of the serving process are exported if not set
+WALLETS_METRICS_DIR = os.environ.get('WALLETS_METRICS_DIR')
+
+# Use caches shared by the worker processes in production
+CACHES = {
     'default': {
-        'ENGINE': 'django.db.backends.sqlite3',
-        'NAME': BASE_DIR / 'db.sqlite3',
-        'ATOMIC_REQUESTS': True,
-    }
+        'BACKEND': 'django.core.cache.backends.locmem.LocMemCache',
+        'OPTIONS': {'MAX_ENTRIES': 100000},
+    },
+    # operation summaries of the closed periods (see wallets.summaries),
+    # must be shared with the import_operations command to drop the summaries
+    # of the imported wallets in the worker processes
+    'summaries': {
+        'BACKEND': os.environ.get('WALLETS_SUMMARY_CACHE_BACKEND',
+                                  'django.core.cache.backends.locmem.LocMemCache'),
+        'LOCATION': os.environ.get('WALLETS_SUMMARY_CACHE_LOCATION', 'summaries'),
+        'OPTIONS': {'MAX_ENTRIES': 100000},
+    },
+    # wallet and operations GET responses (see wallets.response_cache),
+    # the responses are only cached if the backend is configured,
+    # the invalidations must be seen by all the worker processes
+    'responses': {
+        'BACKEND': os.environ.get('WALLETS_RESPONSE_CACHE_BACKEND',
+                                  'django.core.cache.backends.locmem.LocMemCache'),
+        'LOCATION': os.environ.get('WALLETS_RESPONSE_CACHE_LOCATION', 'responses'),
+        'OPTIONS': {'MAX_ENTRIES': 100000},
+    },
+    # responses stored for the Idempotency-Key header (see wallets.idempotency),
+    # must be shared (e.g. memcached) if there are several worker processes,
+    # otherwise a retry reaching another worker is applied again
+    'idempotency': {
+        'BACKEND': os.environ.get('WALLETS_IDEMPOTENCY_CACHE_BACKEND',
+                                  'django.core.cache.backends.locmem.LocMemCache'),
+        'LOCATION': os.environ.get('WALLETS_IDEMPOTENCY_CACHE_LOCATION', 'idempotency'),
+        'OPTIONS': {'MAX_ENTRIES': 100000},
+    },
 }
+WALLETS_IDEMPOTENCY_CACHE = 'idempotency'
+WALLETS_IDEMPOTENCY_TTL = int(os.environ.get('WALLETS_IDEMPOTENCY_TTL', 24 * 60 * 60))
+WALLETS_SUMMARY_CACHE = 'summaries'
+WALLETS_RESPONSE_CACHE = 'responses'
+WALLETS_RESPONSE_CACHE_TTL = int(os.environ.get(
+    'WALLETS_RESPONSE_CACHE_TTL', 300 if 'WALLETS_RESPONSE_CACHE_BACKEND' in os.environ else 0))
+
+# Apply deposits and transfers in groups of up to MAX_SIZE per transaction,
+# the writer waits at most MAX_WAIT seconds to fill a group, the requests
+# not taken by the writer within TIMEOUT seconds fail with 503
+WALLETS_GROUP_COMMIT = os.environ.get('WALLETS_GROUP_COMMIT') == '1'
+WALLETS_GROUP_COMMIT_MAX_SIZE = int(os.environ.get('WALLETS_GROUP_COMMIT_MAX_SIZE', 64))
+WALLETS_GROUP_COMMIT_MAX_WAIT = float(os.environ.get('WALLETS_GROUP_COMMIT_MAX_WAIT', 0.002))
+WALLETS_GROUP_COMMIT_TIMEOUT = float(os.environ.get('WALLETS_GROUP_COMMIT_TIMEOUT', 5.0))
+
+# Deposits and transfers failed by lock conflicts are run again up to ATTEMPTS
+# times within RETRY_BUDGET seconds (see wallets.retries)
+WALLETS_TRANSACTION_ATTEMPTS = int(os.environ.get('WALLETS_TRANSACTION_ATTEMPTS', 10))
+WALLETS_TRANSACTION_RETRY_BUDGET = float(os.environ.get('WALLETS_TRANSACTION_RETRY_BUDGET', 2.0))
+
+# The archive_operations command moves the operations older than AFTER_DAYS
+# to the archive table in batches of BATCH_SIZE (see wallets.archive)
+WALLETS_ARCHIVE_AFTER_DAYS = int(os.environ.get('WALLETS_ARCHIVE_AFTER_DAYS', 180))
+WALLETS_ARCHIVE_BATCH_SIZE = int(os.environ.get('WALLETS_ARCHIVE_BATCH_SIZE', 5000))
 
 
 # Password validation
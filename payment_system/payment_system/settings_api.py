@@ -0,0 +1,37 @@
+"""
+Settings of the API workers: payment_system.settings without
+the admin, the sessions, the messages, the static files and the forms.
+
+The API authenticates by tokens (see wallets.decorators) and returns
+JSON or MessagePack, so these apps and their middleware only slow
+down the start of a worker and every request. The admin and the
+documentation page are served by the workers with the full settings,
+which also run the migrations of all the apps.
+
+Run with DJANGO_SETTINGS_MODULE=payment_system.settings_api,
+manage.py startup_report compares the startup of the profiles.
+"""
+from payment_system.settings import *  # noqa: F401,F403
+
+INSTALLED_APPS = [
+    # users and tokens
+    'django.contrib.auth',
+    'django.contrib.contenttypes',
+    'rest_framework.authtoken',
+
+    'wallets',
+]
+
+MIDDLEWARE = [
+    'wallets.middleware.MetricsMiddleware',
+    'wallets.middleware.ContentNegotiationMiddleware',
+    'django.middleware.security.SecurityMiddleware',
+    'django.middleware.common.CommonMiddleware',
+]
+
+ROOT_URLCONF = 'payment_system.api_urls'
+
+TEMPLATES = []
+
+# the responses are not translated, the catalogs are not loaded
+USE_I18N = False
@@ -14,15 +14,12 @@ Including another URLconf
     2. Add a URL to urlpatterns:  path('blog/', include('blog.urls'))
 """
 from django.contrib import admin
-from django.urls import path, re_path, include
+from django.urls import path, re_path
 
-from wallets.views import operations, documentation, get_token
+from payment_system import api_urls
+from wallets.views import documentation
 
-urlpatterns = [
+urlpatterns = api_urls.urlpatterns + [
     path('admin/', admin.site.urls),
-    path('wallets/', include('wallets.urls')),
-    path('generate_token/', get_token),
-    re_path('operations/(?P<wallet_id>[0-9]+)/'
-            '(?P<operation>[a-z]*)/?$', operations),
     re_path('^$', documentation),
 ]
@@ -0,0 +1,143 @@
+"""
+Archival of the old operations.
+
+The history grows without bound, while the transfers and most history
+reads only touch the recent operations. The archive_operations command
+moves the operations older than WALLETS_ARCHIVE_AFTER_DAYS days
+from the Operation table to ArchivedOperation, so the size
+of the Operation table and of its indexes follows the recent activity.
+
+The operations are moved in batches in the (wallet, date, id) order,
+each batch in its own transaction, so the archived operations
+of a wallet always precede its operations left in the Operation table
+in the (date, id) order of the history. The history is read
+from the tables one after another (see history), the archive
+is only queried by the pages reaching it. The moved operations keep
+their ids and dates, so the cached pages and summaries stay valid.
+
+The imported operations dated before the cutoff are moved
+by the import in its transaction (see archive_imported).
+"""
+import datetime
+import time
+
+from django.conf import settings
+from django.db import connection, transaction
+from django.db.models import F, Q
+
+from wallets.models import Operation, ArchivedOperation, OperationArchive
+from wallets.pagination import keyset_filter
+from wallets.retries import retry_on_lock_errors
+
+ARCHIVE_AFTER_DAYS = getattr(settings, 'WALLETS_ARCHIVE_AFTER_DAYS', 180)
+ARCHIVE_BATCH_SIZE = getattr(settings, 'WALLETS_ARCHIVE_BATCH_SIZE', 5000)
+# seconds between the batches, leaves the database to the transfers
+ARCHIVE_PAUSE = getattr(settings, 'WALLETS_ARCHIVE_PAUSE', 0.05)
+
+BATCH_ORDERING = ('wallet_id', 'date', 'id')
+COLUMNS = 'id, name, wallet_id, date, amount'
+
+
+def history(filters: dict, ordering: tuple) -> list:
+    """
+    Returns the querysets of the operations and of the archived
+    operations matching the filters in the order they are read in.
+    The archived operations of a wallet precede its other operations,
+    so they are read last in the descending order of the dates
+    and first in the ascending order.
+    """
+    querysets = [Operation.objects.filter(**filters).order_by(*ordering),
+                 ArchivedOperation.objects.filter(**filters).order_by(*ordering)]
+    return querysets if ordering[0].startswith('-') else querysets[::-1]
+
+
+def lock_archive() -> OperationArchive:
+    """
+    Returns the archive state locked until the end of the transaction,
+    the batches and the imports moving operations are serialized by it.
+    """
+    return OperationArchive.objects.select_for_update().get_or_create(pk=1)[0]
+
+
+def _move(where: str, params: list) -> int:
+    """
+    Moves the operations matching the condition to the archive,
+    returns their number. No matching operations may be added
+    concurrently, see lock_archive.
+    """
+    table = Operation._meta.db_table
+    with connection.cursor() as cursor:
+        cursor.execute(f'INSERT INTO {ArchivedOperation._meta.db_table} ({COLUMNS}) '
+                       f'SELECT {COLUMNS} FROM {table} WHERE {where}', params)
+        cursor.execute(f'DELETE FROM {table} WHERE {where}', params)
+        moved = cursor.rowcount
+    OperationArchive.objects.filter(pk=1).update(operations=F('operations') + moved)
+    return moved
+
+
+@retry_on_lock_errors
+@transaction.atomic
+def archive_batch(cutoff: datetime.date, after: tuple, batch_size: int) -> list:
+    """
+    Moves the first `batch_size` operations dated before the cutoff
+    following the (wallet id, date, id) key `after` in this order.
+    Returns the keys of the moved operations.
+    """
+    lock_archive()
+    keys = list(
+        Operation.objects.filter(date__lt=cutoff)
+        .filter(keyset_filter(BATCH_ORDERING, after) if after else Q())
+        .order_by(*BATCH_ORDERING).values_list(*BATCH_ORDERING)[:batch_size]
+    )
+    if keys:
+        _move(f'id IN ({", ".join(["%s"] * len(keys))})', [key[2] for key in keys])
+    return keys
+
+
+def archive_operations(cutoff: datetime.date = None, batch_size: int = ARCHIVE_BATCH_SIZE,
+                       pause: float = ARCHIVE_PAUSE, report=None) -> int:
+    """
+    Moves the operations dated before the cutoff (WALLETS_ARCHIVE_AFTER_DAYS
+    days ago by default) to the archive and returns their number.
+    The cutoff never moves back, an interrupted run is completed
+    by the next one. `report` is called with the number
+    of the moved operations after every batch.
+    """
+    cutoff = cutoff or datetime.date.today() - datetime.timedelta(days=ARCHIVE_AFTER_DAYS)
+    with transaction.atomic():
+        state = lock_archive()
+        cutoff = max(cutoff, state.cutoff or cutoff)
+        OperationArchive.objects.filter(pk=state.pk).update(cutoff=cutoff, complete=False)
+
+    moved, after = 0, None
+    while True:
+        keys = archive_batch(cutoff, after, batch_size)
+        moved += len(keys)
+        if report is not None:
+            report(moved)
+        if len(keys) < batch_size:
+            break
+        after = keys[-1]
+        time.sleep(pause)
+
+    # not complete if another run has moved the cutoff meanwhile
+    OperationArchive.objects.filter(pk=1, cutoff=cutoff).update(complete=True)
+    return moved
+
+
+def archive_imported(state: OperationArchive, wallet_ids, last_id: int) -> int:
+    """
+    Moves the operations added after the id `last_id` and dated
+    before the cutoff to the archive, returns their number.
+    Called by the imports in their transaction with the archive state
+    locked. While an archive run is in progress all the operations
+    of the wallets dated before the cutoff are moved, so the older
+    operations not archived yet do not follow the imported ones.
+    """
+    if state.complete:
+        # all the other operations before the cutoff are archived
+        return _move('id > %s AND date < %s', [last_id, state.cutoff])
+
+    wallet_ids = list(wallet_ids)
+    return _move(f'wallet_id IN ({", ".join(["%s"] * len(wallet_ids))}) AND date < %s',
+                 wallet_ids + [state.cutoff])
@@ -0,0 +1,58 @@
+"""
+Async versions of the read-only views for the ASGI deployment.
+
+Under ASGI Django runs all sync views in one thread, so slow history
+reads would block the money transfers. These views run the blocking
+ORM work in the bounded wallets.db_pool thread pool instead,
+writes are still delegated to the sync views.
+"""
+from asgiref.sync import sync_to_async
+from django.core.handlers.asgi import ASGIRequest
+from django.db import transaction
+
+from wallets.db_pool import run_in_db_thread
+from wallets.decorators import decorator_for_authorization, async_require_http_methods
+from wallets.replicas import replica_reads
+from wallets.serializers import ApiResponse
+from wallets.views import read_wallets, read_wallet, read_operations, \
+    see_wallets_or_create, crud_for_the_wallet
+
+
+@transaction.non_atomic_requests
+@decorator_for_authorization
+@replica_reads
+@async_require_http_methods(["GET", "POST"])
+async def see_wallets_or_create_async(request: ASGIRequest) -> ApiResponse:
+    """
+    Async version of see_wallets_or_create.
+    """
+    if request.method == "GET":
+        return await run_in_db_thread(read_wallets, request)
+
+    return await sync_to_async(see_wallets_or_create)(request)
+
+
+@transaction.non_atomic_requests
+@decorator_for_authorization
+@replica_reads
+@async_require_http_methods(["GET", "POST", "DELETE"])
+async def crud_for_the_wallet_async(request: ASGIRequest, wallet_id: str) -> ApiResponse:
+    """
+    Async version of crud_for_the_wallet.
+    """
+    if request.method == 'GET':
+        return await run_in_db_thread(read_wallet, int(wallet_id))
+
+    return await sync_to_async(crud_for_the_wallet)(request, wallet_id)
+
+
+@transaction.non_atomic_requests
+@decorator_for_authorization
+@replica_reads
+@async_require_http_methods(["GET"])
+async def operations_async(request: ASGIRequest, wallet_id: str,
+                           operation: str) -> ApiResponse:
+    """
+    Async version of operations.
+    """
+    return await run_in_db_thread(read_operations, request, int(wallet_id), operation)
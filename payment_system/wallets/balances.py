@@ -0,0 +1,137 @@
+"""
+Wallet balance changes with the opt-in hot wallet mode.
+
+The balance of a hot wallet is split between the wallet row (slot 0)
+and `Wallet.slots` WalletSlot rows (slots 1..N), so concurrent credits
+update different rows instead of waiting for one row lock.
+Credits go to a random slot, debits take the money from a slot
+with enough funds, moving all slots to the wallet row if there is
+no such slot. Slot balances are never negative.
+"""
+import random
+
+from django.db import connection
+from django.db.models import F, Sum, Subquery, OuterRef, Value
+from django.db.models.functions import Coalesce
+
+from wallets.models import Wallet, WalletSlot
+from wallets.money import Money, MoneyField
+
+BALANCE_CHUNK = 250
+
+
+def total_balance():
+    """
+    Returns the expression of the whole wallet balance
+    for Wallet querysets.
+    """
+    slots = WalletSlot.objects.filter(wallet=OuterRef('pk')).order_by() \
+        .values('wallet').annotate(total=Sum('balance')).values('total')
+    return F('balance') + Coalesce(Subquery(slots), Value(0), output_field=MoneyField())
+
+
+def add_balances(deltas: dict) -> None:
+    """
+    Adds the changes in cents to the balances of the wallet rows,
+    one UPDATE statement per 250 wallets.
+    """
+    table = Wallet._meta.db_table
+    items = [(pk, delta) for pk, delta in deltas.items() if delta]
+    for i in range(0, len(items), BALANCE_CHUNK):
+        chunk = items[i:i + BALANCE_CHUNK]
+        values = ', '.join(['(CAST(%s AS INTEGER), CAST(%s AS BIGINT))'] * len(chunk))
+        with connection.cursor() as cursor:
+            cursor.execute(
+                f'UPDATE {table} SET balance = {table}.balance + t.column2 '
+                f'FROM (VALUES {values}) AS t '
+                f'WHERE {table}.id = t.column1',
+                [value for item in chunk for value in item],
+            )
+
+
+def credit(wallet_id: int, amount: Money):
+    """
+    Adds the amount to the wallet balance.
+    Returns the changed slot or None if the wallet does not exist.
+    """
+    if Wallet.objects.filter(pk=wallet_id, slots=0).update(balance=F('balance') + amount.cents):
+        return 0
+
+    slots = Wallet.objects.filter(pk=wallet_id).values_list('slots', flat=True).first()
+    if not slots:
+        return None
+
+    slot = random.randint(1, slots)
+    if WalletSlot.objects.filter(wallet_id=wallet_id, slot=slot) \
+            .update(balance=F('balance') + amount.cents):
+        return slot
+
+    # the slot was removed by set_hot_mode meanwhile,
+    # the wallet row is a part of the balance in every mode
+    if Wallet.objects.filter(pk=wallet_id).update(balance=F('balance') + amount.cents):
+        return 0
+    return None
+
+
+def debit(wallet_id: int, amount: Money, checkpoints: dict):
+    """
+    Subtracts the amount from the wallet balance if it is enough.
+    Returns the changed slot or None if the balance is insufficient
+    or the wallet does not exist.
+
+    The slots emptied to pay the amount are added to `checkpoints`.
+    """
+    debited = Wallet.objects.filter(pk=wallet_id, balance__gte=amount) \
+        .update(balance=F('balance') - amount.cents)
+    if debited:
+        return 0
+
+    slots = list(WalletSlot.objects.filter(wallet_id=wallet_id, balance__gt=0)
+                 .values_list('slot', 'balance'))
+    if not slots:
+        return None
+
+    candidates = [slot for slot, balance in slots if balance >= amount]
+    random.shuffle(candidates)
+    for slot in candidates:
+        debited = WalletSlot.objects.filter(wallet_id=wallet_id, slot=slot,
+                                            balance__gte=amount) \
+            .update(balance=F('balance') - amount.cents)
+        if debited:
+            return slot
+
+    if not sweep([wallet_id], checkpoints):
+        return None
+
+    debited = Wallet.objects.filter(pk=wallet_id, balance__gte=amount) \
+        .update(balance=F('balance') - amount.cents)
+    return 0 if debited else None
+
+
+def sweep(wallet_ids: list, checkpoints: dict) -> bool:
+    """
+    Moves the slot balances of the hot wallets to the wallet rows.
+    The changed slots are added to `checkpoints`.
+    Returns True if any money was moved.
+
+    Only the amounts read are moved, so a credit landing meanwhile
+    in a slot which was empty stays in it.
+    """
+    slots = list(WalletSlot.objects.select_for_update()
+                 .filter(wallet__in=wallet_ids, balance__gt=0)
+                 .values_list('wallet', 'slot', 'balance'))
+    if not slots:
+        return False
+
+    totals = {}
+    for wallet_id, slot, balance in slots:
+        totals[wallet_id] = totals.get(wallet_id, 0) + balance.cents
+        checkpoints.setdefault((wallet_id, slot), (0, 0))
+    for wallet_id, total in totals.items():
+        Wallet.objects.filter(pk=wallet_id).update(balance=F('balance') + total)
+        checkpoints.setdefault((wallet_id, 0), (0, 0))
+    for wallet_id, slot, balance in slots:
+        WalletSlot.objects.filter(wallet_id=wallet_id, slot=slot) \
+            .update(balance=F('balance') - balance.cents)
+    return True
+
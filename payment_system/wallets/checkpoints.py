@@ -0,0 +1,149 @@
+import datetime
+
+from django.db import connection, transaction
+from django.db.models import Sum, OuterRef, Subquery
+
+from wallets.balances import sweep
+from wallets.models import Wallet, WalletSlot, Operation, ArchivedOperation, \
+    BalanceCheckpoint
+from wallets.money import Money, ZERO
+
+CHECKPOINT_CHUNK = 250
+
+
+def record_checkpoints(date: datetime.date, totals: dict) -> None:
+    """
+    Adds the deposits and withdrawals of the day to the checkpoints
+    of the wallet slots and sets their closing balance
+    to the current slot balance.
+
+    `totals` maps (wallet id, slot) to (deposits, withdrawals) in cents.
+    Must be called in the transaction that changed the balances,
+    after the change. One upsert statement is run per 250 slots.
+    """
+    table = BalanceCheckpoint._meta.db_table
+    wallet_table = Wallet._meta.db_table
+    slot_table = WalletSlot._meta.db_table
+    items = list(totals.items())
+    for i in range(0, len(items), CHECKPOINT_CHUNK):
+        chunk = items[i:i + CHECKPOINT_CHUNK]
+        values = ', '.join(['(CAST(%s AS INTEGER), CAST(%s AS INTEGER), '
+                            'CAST(%s AS BIGINT), CAST(%s AS BIGINT))']
+                           * len(chunk))
+        params = [date]
+        for (wallet_id, slot), (deposits, withdrawals) in chunk:
+            params += [wallet_id, slot, deposits, withdrawals]
+
+        with connection.cursor() as cursor:
+            cursor.execute(
+                f'INSERT INTO {table} (wallet_id, slot, date, balance, deposits, withdrawals) '
+                f'SELECT w.id, t.column2, %s, '
+                f'CASE WHEN t.column2 = 0 THEN w.balance ELSE COALESCE(s.balance, 0) END, '
+                f't.column3, t.column4 '
+                f'FROM (VALUES {values}) AS t '
+                f'JOIN {wallet_table} w ON w.id = t.column1 '
+                f'LEFT JOIN {slot_table} s ON s.wallet_id = t.column1 AND s.slot = t.column2 '
+                f'WHERE true '
+                f'ON CONFLICT (wallet_id, slot, date) DO UPDATE SET '
+                f'balance = excluded.balance, '
+                f'deposits = {table}.deposits + excluded.deposits, '
+                f'withdrawals = {table}.withdrawals + excluded.withdrawals',
+                params,
+            )
+
+
+def balance_as_of(wallet: Wallet, date: datetime.date) -> Money:
+    """
+    Returns the wallet balance at the end of the day.
+
+    For every slot of the wallet takes the closing balance of the nearest
+    checkpoint on or before the day. If there is none, the opening balance
+    of the first checkpoint after the day is taken, or the current slot
+    balance if the slot has no checkpoints.
+    """
+    checkpoints = BalanceCheckpoint.objects.filter(wallet=wallet)
+    nearest = checkpoints.filter(slot=OuterRef('slot')).values('date')
+    before = checkpoints.filter(date=Subquery(
+        nearest.filter(date__lte=date).order_by('-date')[:1]
+    ))
+    after = checkpoints.filter(date=Subquery(
+        nearest.filter(date__gt=date).order_by('date')[:1]
+    ))
+
+    balances = {0: wallet.balance}
+    balances.update(WalletSlot.objects.filter(wallet=wallet).values_list('slot', 'balance'))
+    for checkpoint in after:
+        balances[checkpoint.slot] = \
+            checkpoint.balance - checkpoint.deposits + checkpoint.withdrawals
+    for checkpoint in before:
+        balances[checkpoint.slot] = checkpoint.balance
+
+    return sum(balances.values(), ZERO)
+
+
+def statement(wallet: Wallet, date_from: datetime.date,
+              date_to: datetime.date) -> dict:
+    """
+    Returns the opening and closing balances and the totals
+    of the wallet operations for the period, both days included.
+    """
+    totals = BalanceCheckpoint.objects \
+        .filter(wallet=wallet, date__gte=date_from, date__lte=date_to) \
+        .aggregate(deposits=Sum('deposits'), withdrawals=Sum('withdrawals'))
+    return {
+        'wallet_id': wallet.id,
+        'date_from': date_from,
+        'date_to': date_to,
+        'opening_balance': balance_as_of(wallet, date_from - datetime.timedelta(days=1)),
+        'closing_balance': balance_as_of(wallet, date_to),
+        'deposits': totals['deposits'] or ZERO,
+        'withdrawals': totals['withdrawals'] or ZERO,
+    }
+
+
+@transaction.atomic
+def rebuild_checkpoints(wallet_ids: list) -> int:
+    """
+    Recreates the checkpoints of the wallets from their operations,
+    archived ones included.
+    Closing balances are counted back from the current wallet balances,
+    the slots of hot wallets are moved to the wallet rows first.
+    Returns the number of created checkpoints.
+
+    The checkpoints are written by one INSERT ... SELECT,
+    the closing balance of a day is the wallet balance minus
+    the net amount of the later days (a window sum).
+    """
+    sweep(wallet_ids, {})
+    wallet_ids = list(Wallet.objects.select_for_update().filter(pk__in=wallet_ids)
+                      .values_list('pk', flat=True))
+    BalanceCheckpoint.objects.filter(wallet__in=wallet_ids).delete()
+    if not wallet_ids:
+        return 0
+
+    table = BalanceCheckpoint._meta.db_table
+    wallet_table = Wallet._meta.db_table
+    placeholders = ', '.join(['%s'] * len(wallet_ids))
+    operations = ' UNION ALL '.join(
+        f'SELECT wallet_id, name, date, amount FROM {model._meta.db_table} '
+        f'WHERE wallet_id IN ({placeholders})'
+        for model in (Operation, ArchivedOperation)
+    )
+    with connection.cursor() as cursor:
+        cursor.execute(
+            f'INSERT INTO {table} (wallet_id, slot, date, balance, deposits, withdrawals) '
+            f'SELECT d.wallet_id, 0, d.date, w.balance - COALESCE(SUM(d.net) OVER ('
+            f'PARTITION BY d.wallet_id ORDER BY d.date DESC '
+            f'ROWS BETWEEN UNBOUNDED PRECEDING AND 1 PRECEDING), 0), '
+            f'd.deposits, d.withdrawals '
+            f'FROM (SELECT wallet_id, date, '
+            f"SUM(CASE WHEN name = 'deposit' THEN amount ELSE 0 END) AS deposits, "
+            f"SUM(CASE WHEN name = 'withdrawal' THEN amount ELSE 0 END) AS withdrawals, "
+            f"SUM(CASE WHEN name = 'deposit' THEN amount "
+            f"WHEN name = 'withdrawal' THEN -amount ELSE 0 END) AS net "
+            f'FROM ({operations}) o '
+            f'GROUP BY wallet_id, date) d '
+            f'JOIN {wallet_table} w ON w.id = d.wallet_id',
+            wallet_ids * 2,
+        )
+        return cursor.rowcount
@@ -0,0 +1,35 @@
+import asyncio
+import contextvars
+from concurrent.futures import ThreadPoolExecutor
+
+from django.conf import settings
+from django.db import close_old_connections
+
+db_executor = ThreadPoolExecutor(
+    max_workers=getattr(settings, 'WALLETS_ASYNC_DB_THREADS', 8),
+    thread_name_prefix='wallets-db',
+)
+
+
+def _call_with_connection(func, *args):
+    close_old_connections()
+    try:
+        return func(*args)
+    finally:
+        close_old_connections()
+
+
+async def run_in_db_thread(func, *args):
+    """
+    Runs the blocking ORM function in the bounded thread pool
+    and returns its result.
+
+    Each pool thread keeps its own database connection,
+    so at most WALLETS_ASYNC_DB_THREADS connections are used
+    by the async views. The function runs in a copy of the caller's
+    context, so the database routing (see wallets.replicas) applies.
+    """
+    loop = asyncio.get_running_loop()
+    context = contextvars.copy_context()
+    return await loop.run_in_executor(db_executor, context.run,
+                                      _call_with_connection, func, *args)
@@ -1,6 +1,17 @@
-from django.http import JsonResponse
+import asyncio
+import functools
+
+from django.http import HttpResponseNotAllowed
 from rest_framework import status
-from rest_framework.authtoken.models import Token
+
+from wallets.db_pool import run_in_db_thread
+from wallets.serializers import ApiResponse
+from wallets.token_cache import token_cache
+
+
+def get_token_key(request) -> str:
+    meta = request.META.get('HTTP_AUTHORIZATION', '').split()
+    return meta[-1] if meta else None
 
 
 def decorator_for_authorization(func):
@@ -8,14 +19,48 @@ def decorator_for_authorization(func):
     Checks the token entered by the user.
     If it does not exist in the database,
     the 401-UNAUTHORIZED status is returned.
+
+    Checked tokens are cached in the process (see TokenCache).
+    Async views are supported, for them the database is queried
+    in the wallets.db_pool threads on a cache miss.
     """
+    if asyncio.iscoroutinefunction(func):
+        @functools.wraps(func)
+        async def async_wrapper_checking_token(*args, **kwargs):
+            token = get_token_key(args[0])
+            valid = token and token_cache.get(token)
+            if token and valid is None:
+                valid = await run_in_db_thread(token_cache.is_valid, token)
+            if not valid:
+                return ApiResponse({}, status=status.HTTP_401_UNAUTHORIZED)
+
+            return await func(*args, **kwargs)
+
+        return async_wrapper_checking_token
+
+    @functools.wraps(func)
     def wrapper_checking_token(*args, **kwargs):
-        request = args[0]
-        meta = request.META.get('HTTP_AUTHORIZATION', '').split()
-        token = meta[-1] if meta else None
-        if not (token and Token.objects.filter(key=token)):
-            return JsonResponse({}, status=status.HTTP_401_UNAUTHORIZED)
+        token = get_token_key(args[0])
+        if not (token and token_cache.is_valid(token)):
+            return ApiResponse({}, status=status.HTTP_401_UNAUTHORIZED)
 
         return func(*args, **kwargs)
 
     return wrapper_checking_token
+
+
+def async_require_http_methods(methods: list):
+    """
+    Async version of django.views.decorators.http.require_http_methods.
+    """
+    def decorator(func):
+        @functools.wraps(func)
+        async def inner(request, *args, **kwargs):
+            if request.method not in methods:
+                return HttpResponseNotAllowed(methods)
+
+            return await func(request, *args, **kwargs)
+
+        return inner
+
+    return decorator
@@ -0,0 +1,61 @@
+import csv
+import io
+import json
+
+from django.conf import settings
+
+EXPORT_CHUNK_SIZE = getattr(settings, 'WALLETS_EXPORT_CHUNK_SIZE', 2000)
+EXPORT_FIELDS = ('id', 'name', 'wallet_id', 'date', 'amount')
+
+
+def iter_rows(querysets: list):
+    """
+    Yields the chunks of operations of the querysets, one after another,
+    as tuples of EXPORT_FIELDS. Rows are read from the database cursor
+    chunk by chunk without creating model instances.
+    """
+    chunk = []
+    for queryset in querysets:
+        rows = queryset.values_list(*EXPORT_FIELDS).iterator(chunk_size=EXPORT_CHUNK_SIZE)
+        for row in rows:
+            chunk.append(row)
+            if len(chunk) == EXPORT_CHUNK_SIZE:
+                yield chunk
+                chunk = []
+    if chunk:
+        yield chunk
+
+
+def to_ndjson(querysets: list):
+    """
+    Yields operations as JSON lines, amounts are exact strings.
+    """
+    for chunk in iter_rows(querysets):
+        yield ''.join(
+            f'{{"id": {id_}, "name": {json.dumps(name)}, "wallet_id": {wallet_id}, '
+            f'"date": "{date.isoformat()}", "amount": "{amount}"}}\n'
+            for id_, name, wallet_id, date, amount in chunk
+        )
+
+
+def to_csv(querysets: list):
+    """
+    Yields operations as CSV lines starting with the header line.
+    """
+    buffer = io.StringIO()
+    writer = csv.writer(buffer)
+    writer.writerow(EXPORT_FIELDS)
+    for chunk in iter_rows(querysets):
+        writer.writerows(chunk)
+        yield buffer.getvalue()
+        buffer.seek(0)
+        buffer.truncate()
+
+    if buffer.tell():
+        yield buffer.getvalue()
+
+
+EXPORT_FORMATS = {
+    'ndjson': (to_ndjson, 'application/x-ndjson'),
+    'csv': (to_csv, 'text/csv'),
+}
@@ -0,0 +1,153 @@
+"""
+Group commit of transfers and deposits.
+
+Request threads put their transfers to a queue and wait,
+one writer thread per process takes up to `max_size` queued transfers
+(waiting at most `max_wait` seconds for more after the first one)
+and applies them in one transaction, so the commit cost is shared
+by the whole group. Each transfer is checked separately and each
+caller gets the status of its own transfer after the group is committed.
+
+A caller gives up with TransactionAborted if its transfer is not taken
+by the writer within `timeout` seconds, the transfer is then dropped.
+"""
+import os
+import queue
+import threading
+import time
+from concurrent.futures import Future, TimeoutError
+
+from django.db import connection, close_old_connections
+
+from wallets.metrics import registry
+from wallets.retries import TransactionAborted
+
+
+class GroupCommitter:
+    """
+    Applies the submitted (sender, receiver, amount) transfers in groups
+    by `apply`, which takes a list of transfers and returns
+    the list of their statuses. The sender of a deposit is None.
+
+    If the group fails, its transfers are applied one by one,
+    so one broken transfer does not fail the others. If the group
+    or one of its transfers is aborted by lock conflicts,
+    the remaining transfers fail with TransactionAborted,
+    so the writer is not blocked by retrying them.
+    """
+    def __init__(self, apply, max_size: int, max_wait: float, timeout: float = 5.0):
+        self.apply = apply
+        self.max_size = max_size
+        self.max_wait = max_wait
+        self.timeout = timeout
+        self._queue = queue.Queue()
+        self._lock = threading.Lock()
+        self._thread = None
+        self._pid = None
+
+    def submit(self, sender, receiver: int, amount) -> int:
+        """
+        Queues the transfer and returns its status
+        after the group containing it is committed.
+        Raises the exception of the transfer if it failed,
+        or TransactionAborted if it is not applied in time.
+        """
+        self._start()
+        future = Future()
+        self._queue.put(((sender, receiver, amount), future))
+        try:
+            return future.result(timeout=self.timeout)
+        except TimeoutError:
+            if future.cancel():
+                raise TransactionAborted('group_commit')
+        # the group containing the transfer is being committed
+        return future.result()
+
+    def stop(self) -> None:
+        """
+        Stops the writer thread after the queued transfers are applied.
+        """
+        with self._lock:
+            thread, self._thread = self._thread, None
+            if thread is not None and self._pid == os.getpid():
+                self._queue.put(None)
+                thread.join()
+
+    def _start(self) -> None:
+        # the writer thread does not survive a fork, so a worker process
+        # started from a preloaded application starts its own,
+        # a writer thread which has died is started again
+        if self._thread is not None and self._thread.is_alive() and self._pid == os.getpid():
+            return
+
+        with self._lock:
+            if self._thread is None or not self._thread.is_alive() or self._pid != os.getpid():
+                if self._pid != os.getpid():
+                    self._queue = queue.Queue()
+                self._pid = os.getpid()
+                self._thread = threading.Thread(target=self._run, name='group-commit',
+                                                daemon=True)
+                self._thread.start()
+
+    def _collect(self, first: tuple) -> tuple:
+        group = [first]
+        deadline = time.monotonic() + self.max_wait
+        while len(group) < self.max_size:
+            timeout = deadline - time.monotonic()
+            try:
+                item = self._queue.get(timeout=timeout) if timeout > 0 \
+                    else self._queue.get_nowait()
+            except queue.Empty:
+                break
+            if item is None:
+                return group, True
+            group.append(item)
+        return group, False
+
+    def _run(self) -> None:
+        group = []
+        try:
+            stopped = False
+            while not stopped:
+                item = self._queue.get()
+                if item is None:
+                    break
+
+                group, stopped = self._collect(item)
+                # the transfers given up by their callers are dropped
+                group = [item for item in group if item[1].set_running_or_notify_cancel()]
+                if not group:
+                    continue
+                try:
+                    close_old_connections()
+                    registry.observe('wallets_group_commit_size', (), len(group))
+                    self._commit(group)
+                except Exception as error:
+                    _fail(group, error)
+        finally:
+            _fail(group, TransactionAborted('group_commit'))
+            connection.close()
+
+    def _commit(self, group: list) -> None:
+        try:
+            statuses = self.apply([item[0] for item in group])
+        except Exception as error:
+            if len(group) == 1 or isinstance(error, TransactionAborted):
+                _fail(group, error)
+                return
+
+            for i, item in enumerate(group):
+                self._commit([item])
+                if isinstance(item[1].exception(), TransactionAborted):
+                    _fail(group[i + 1:], item[1].exception())
+                    return
+            return
+
+        for (_, future), result in zip(group, statuses):
+            future.set_result(result)
+
+
+def _fail(group: list, error: Exception) -> None:
+    for _, future in group:
+        if not future.done():
+            future.set_exception(error)
@@ -0,0 +1,98 @@
+"""
+Idempotency keys for the money endpoints.
+
+A request with the "Idempotency-Key" header is executed once,
+its response is stored under (token, key) with the hash of the request
+and replayed for the retries without touching the database.
+The store is the WALLETS_IDEMPOTENCY_CACHE cache of django.core.cache,
+entries expire after WALLETS_IDEMPOTENCY_TTL seconds. The cache must be
+shared by the worker processes (e.g. memcached) if there are several.
+"""
+import functools
+import hashlib
+
+from django.conf import settings
+from django.core.cache import caches
+from django.http import HttpResponse
+from rest_framework import status
+
+from wallets.decorators import get_token_key
+from wallets.metrics import registry
+from wallets.serializers import ApiResponse
+
+IDEMPOTENCY_CACHE = getattr(settings, 'WALLETS_IDEMPOTENCY_CACHE', 'default')
+IDEMPOTENCY_TTL = getattr(settings, 'WALLETS_IDEMPOTENCY_TTL', 24 * 60 * 60)
+# bounds the time a key stays locked if the process dies during the request
+IDEMPOTENCY_PENDING_TTL = 60
+MAX_KEY_LENGTH = 255
+# Vary: Accept tells the shared caches the response depends on the format
+REPLAYED_HEADERS = ('Vary',)
+
+
+def cache_key(token: str, key: str) -> str:
+    digest = hashlib.sha256(f'{token}:{key}'.encode()).hexdigest()
+    return f'wallets:idempotency:{digest}'
+
+
+def request_hash(request) -> str:
+    digest = hashlib.sha256()
+    digest.update(f'{request.method} {request.path}\n'.encode())
+    digest.update(request.body)
+    return digest.hexdigest()[:32]
+
+
+def idempotent(func):
+    """
+    Replays the stored response of the request
+    with the same Idempotency-Key header and token.
+
+    Returns status 409-CONFLICT while the first request is executed
+    and 422-UNPROCESSABLE ENTITY if the key was used
+    for another request. Server errors are not stored,
+    so such requests can be retried with the same key.
+    """
+    @functools.wraps(func)
+    def wrapper_replaying_response(request, *args, **kwargs):
+        key = request.META.get('HTTP_IDEMPOTENCY_KEY')
+        if key is None:
+            return func(request, *args, **kwargs)
+
+        if not key or len(key) > MAX_KEY_LENGTH:
+            return ApiResponse({}, status=status.HTTP_400_BAD_REQUEST)
+
+        cache = caches[IDEMPOTENCY_CACHE]
+        name = cache_key(get_token_key(request), key)
+        fingerprint = request_hash(request)
+        if not cache.add(name, (fingerprint, None, None, None), IDEMPOTENCY_PENDING_TTL):
+            stored = cache.get(name)
+            if stored is not None and stored[0] != fingerprint:
+                registry.inc('wallets_idempotency_conflicts_total', ())
+                return ApiResponse({}, status=status.HTTP_422_UNPROCESSABLE_ENTITY)
+
+            if stored is None or stored[1] is None:
+                registry.inc('wallets_idempotency_conflicts_total', ())
+                return ApiResponse({}, status=status.HTTP_409_CONFLICT)
+
+            registry.inc('wallets_idempotency_replays_total', ())
+            response = HttpResponse(stored[2], status=stored[1], content_type=stored[3])
+            for header, value in stored[4]:
+                response[header] = value
+            response['Idempotent-Replayed'] = 'true'
+            return response
+
+        try:
+            response = func(request, *args, **kwargs)
+        except BaseException:
+            cache.delete(name)
+            raise
+
+        if response.status_code >= 500:
+            cache.delete(name)
+        else:
+            headers = [(header, response[header]) for header in REPLAYED_HEADERS
+                       if response.has_header(header)]
+            cache.set(name, (fingerprint, response.status_code, response.content,
+                             response['Content-Type'], headers), IDEMPOTENCY_TTL)
+        return response
+
+    return wrapper_replaying_response
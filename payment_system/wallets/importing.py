@@ -0,0 +1,357 @@
+"""
+Bulk import of historical operations.
+
+The operations are read from a CSV file with the header
+wallet_id,name,amount[,date] (the format of the reconcile corrections)
+or from an NDJSON file with the same keys, one operation per line
+in both formats.
+The date defaults to today, the amounts are not rounded,
+so they must have at most two decimals.
+
+The operations are imported in chunks, each chunk in one transaction
+with the balance changes of its wallets and the position reached
+in the file (OperationImport), so an interrupted import resumes
+after the last committed chunk. The rows are inserted by executemany,
+since creating a model instance per row takes most of the time
+of bulk_create. The balance checkpoints of the imported wallets
+are rebuilt when the file is imported.
+
+The cached responses and summaries of the imported wallets are dropped
+by bumping their versions, the web workers only see the bumps if the
+caches are shared, see local_caches.
+
+The operations dated before the archive cutoff are moved to the archive
+in the transaction of their chunk (see wallets.archive).
+
+The operations are not checked against the balances,
+the dry run validates the file without writing anything
+and reports the wallets which would end with a negative balance.
+"""
+import csv
+import datetime
+from itertools import accumulate, islice
+from operator import itemgetter
+
+from django.core.cache import caches
+from django.core.cache.backends.locmem import LocMemCache
+from django.db import connection, transaction
+from django.db.models import F, Max
+
+from wallets.archive import lock_archive, archive_imported
+from wallets.balances import add_balances, total_balance
+from wallets.checkpoints import rebuild_checkpoints
+from wallets.models import Wallet, Operation, OperationImport
+from wallets.money import Money, MAX_AMOUNT, parse_cents
+from wallets.response_cache import bump_versions, RESPONSE_CACHE, RESPONSE_CACHE_TTL
+from wallets.retries import retry_on_lock_errors
+from wallets.serializers import loads
+from wallets.summaries import forget_summaries, SUMMARY_CACHE
+
+FORMATS = ('csv', 'ndjson')
+FIELDS = ('wallet_id', 'name', 'amount', 'date')
+NAMES = ('deposit', 'withdrawal')
+IMPORT_CHUNK_SIZE = 10000
+CHECKPOINT_CHUNK_SIZE = 500
+MAX_ERRORS = 20
+
+
+class InvalidRecord(ValueError):
+    """
+    Raised for an invalid record of the imported file.
+    """
+    def __init__(self, line: int, message: str):
+        super().__init__(f'line {line}: {message}')
+        self.line = line
+
+
+def read_chunks(file, format: str, chunk_size: int, position: int = 0, line: int = 0,
+                end: int = None):
+    """
+    Yields (byte offset, line number, records) after every `chunk_size`
+    lines of the binary file from the byte offset `position`
+    to `end`. Records are (line number, fields), fields are the raw
+    (wallet_id, name, amount[, date]) values or InvalidRecord
+    if the line can not be read. A record takes one line.
+    """
+    file.seek(0)
+    if format == 'csv':
+        header = file.readline()
+        columns = next(csv.reader([header.decode('utf-8-sig')]), [])
+        missing = [field for field in FIELDS[:3] if field not in columns]
+        if missing:
+            raise InvalidRecord(1, f'missing columns: {", ".join(missing)}')
+        get_fields = itemgetter(*(columns.index(field) for field in FIELDS if field in columns))
+        if position == 0:
+            position, line = len(header), 1
+    file.seek(position)
+
+    while end is None or position < end:
+        lines = list(islice(file, chunk_size))
+        if end is not None:
+            lines = lines[:_lines_before(lines, end - position)]
+        if not lines:
+            return
+
+        records = []
+        if format == 'csv':
+            rows = csv.reader(b''.join(lines).decode(errors='replace').split('\n'))
+            for row in rows:
+                if row:
+                    try:
+                        records.append((line + rows.line_num, get_fields(row)))
+                    except IndexError:
+                        records.append((line + rows.line_num,
+                                        InvalidRecord(line + rows.line_num, 'missing values')))
+        else:
+            for number, raw in enumerate(lines, line + 1):
+                if raw.isspace():
+                    continue
+                try:
+                    item = loads(raw)
+                    records.append((number, (item.get('wallet_id'), item.get('name'),
+                                             item.get('amount'), item.get('date'))))
+                except (ValueError, AttributeError):
+                    records.append((number, InvalidRecord(number, 'invalid JSON object')))
+
+        position += sum(map(len, lines))
+        line += len(lines)
+        yield position, line, records
+
+
+def _lines_before(lines: list, size: int) -> int:
+    """
+    Returns the number of the lines within the first `size` bytes.
+    """
+    for count, length in enumerate(accumulate(map(len, lines))):
+        if length > size:
+            return count
+    return len(lines)
+
+
+def clean_record(wallet_id, name, amount, date=None, today=None) -> tuple:
+    """
+    Returns the (wallet id, name, amount in cents, date) operation.
+    Raises ValueError if the record is invalid.
+    """
+    today = today or datetime.date.today()
+    if name not in NAMES:
+        raise ValueError(f'unknown operation {name!r}')
+    try:
+        if type(wallet_id) not in (int, str):
+            raise TypeError
+        wallet_id = int(wallet_id)
+        date = datetime.date.fromisoformat(date) if date else today
+    except (TypeError, ValueError):
+        raise ValueError('invalid wallet_id or date')
+    cents = parse_cents(amount)
+    if not 0 < cents <= MAX_AMOUNT.cents:
+        raise ValueError(f'invalid amount {amount!r}')
+    if date > today:
+        raise ValueError(f'date {date} is in the future')
+    return wallet_id, name, cents, date
+
+
+def missing_wallets(operations: list, lines: list) -> dict:
+    """
+    Returns {wallet id: first line} of the operations
+    of nonexistent wallets.
+    """
+    wallet_ids = {operation[0] for operation in operations}
+    existing = set(Wallet.objects.filter(pk__in=wallet_ids).values_list('pk', flat=True))
+    missing = {}
+    for operation, line in zip(operations, lines):
+        if operation[0] not in existing:
+            missing.setdefault(operation[0], line)
+    return missing
+
+
+def balance_changes(operations: list, deltas: dict) -> dict:
+    """
+    Adds the balance changes in cents of the operations to `deltas`.
+    """
+    for wallet_id, name, cents, _ in operations:
+        deltas[wallet_id] = deltas.get(wallet_id, 0) + (cents if name == 'deposit' else -cents)
+    return deltas
+
+
+@retry_on_lock_errors
+@transaction.atomic
+def import_chunk(operations: list, lines: list, progress: OperationImport,
+                 position: int, line: int) -> None:
+    """
+    Inserts the (wallet id, name, amount in cents, date) operations,
+    changes the balances of their wallets and saves the position
+    after the chunk in the file. Raises InvalidRecord
+    if a wallet does not exist.
+    """
+    missing = missing_wallets(operations, lines)
+    if missing:
+        wallet_id, first_line = next(iter(missing.items()))
+        raise InvalidRecord(first_line, f'wallet {wallet_id} does not exist')
+
+    archive = lock_archive()
+    archived = archive.cutoff is not None and \
+        min(operation[3] for operation in operations) < archive.cutoff
+    if archived:
+        last_id = Operation.objects.aggregate(last=Max('pk'))['last'] or 0
+
+    # inserted in the order of the indexes, the sort is stable, so
+    # the operations of a wallet on a day keep the order of the file
+    with connection.cursor() as cursor:
+        cursor.executemany(
+            f'INSERT INTO {Operation._meta.db_table} (wallet_id, name, amount, date) '
+            f'VALUES (%s, %s, %s, %s)',
+            sorted(operations, key=itemgetter(0, 3)),
+        )
+    deltas = balance_changes(operations, {})
+    if archived:
+        archive_imported(archive, deltas, last_id)
+    add_balances(deltas)
+    OperationImport.objects.filter(pk=progress.pk).update(
+        position=position, line=line, operations=F('operations') + len(operations),
+    )
+    bump_versions(deltas)
+    forget_summaries(deltas)
+
+
+def local_caches() -> list:
+    """
+    Returns the aliases of the caches of the responses and summaries
+    which are local to this process, the web workers keep serving
+    the responses and summaries of the imported wallets cached by them.
+    """
+    aliases = [SUMMARY_CACHE]
+    if RESPONSE_CACHE_TTL > 0:
+        aliases.append(RESPONSE_CACHE)
+    return [alias for alias in aliases if isinstance(caches[alias], LocMemCache)]
+
+
+def _operation_indexes() -> tuple:
+    with connection.cursor() as cursor:
+        existing = connection.introspection.get_constraints(cursor, Operation._meta.db_table)
+    return existing, Operation._meta.indexes
+
+
+def drop_operation_indexes() -> None:
+    """
+    Drops the indexes of the operations, the inserts into the table
+    without them are several times faster. The history queries
+    are slow until create_operation_indexes is called.
+    """
+    existing, indexes = _operation_indexes()
+    with connection.schema_editor() as editor:
+        for index in indexes:
+            if index.name in existing:
+                editor.remove_index(Operation, index)
+
+
+def create_operation_indexes() -> None:
+    """
+    Creates the missing indexes of the operations.
+    """
+    existing, indexes = _operation_indexes()
+    with connection.schema_editor() as editor:
+        for index in indexes:
+            if index.name not in existing:
+                editor.add_index(Operation, index)
+
+
+def imported_wallets(file, format: str, position: int) -> set:
+    """
+    Returns the wallet ids of the records before the byte offset `position`.
+    """
+    wallet_ids = set()
+    for _, _, records in read_chunks(file, format, IMPORT_CHUNK_SIZE, end=position):
+        wallet_ids.update(int(fields[0]) for _, fields in records
+                          if not isinstance(fields, InvalidRecord))
+    return wallet_ids
+
+
+def negative_balances(deltas: dict) -> list:
+    """
+    Returns the (wallet id, balance) of the wallets whose balance
+    would be negative after the changes in cents.
+    """
+    negative = []
+    wallet_ids = sorted(deltas)
+    for i in range(0, len(wallet_ids), IMPORT_CHUNK_SIZE):
+        for pk, balance in Wallet.objects.filter(pk__in=wallet_ids[i:i + IMPORT_CHUNK_SIZE]) \
+                .annotate(total=total_balance()).values_list('pk', 'total'):
+            if balance.cents + deltas[pk] < 0:
+                negative.append((pk, Money(balance.cents + deltas[pk])))
+    return negative
+
+
+def import_operations(file, format: str, source: str, chunk_size: int = IMPORT_CHUNK_SIZE,
+                      dry_run: bool = False, report=None) -> dict:
+    """
+    Imports the operations of the binary file after the position
+    saved for the source and rebuilds the checkpoints of their wallets.
+    `report` is called with the number of the operations
+    and the line number after every chunk.
+
+    Raises InvalidRecord at the first invalid record, the chunks
+    before it stay imported. The dry run collects the errors instead
+    and also returns the wallets which would end with a negative balance.
+    """
+    if dry_run:
+        progress = OperationImport.objects.filter(source=source).first() \
+            or OperationImport(source=source)
+    else:
+        progress, _ = OperationImport.objects.get_or_create(source=source)
+
+    today = datetime.date.today()
+    result = {'operations': 0, 'wallets': 0, 'checkpoints': 0,
+              'errors': [], 'error_count': 0, 'negative': []}
+    wallet_ids = set()
+    deltas = {}
+
+    def error(invalid: InvalidRecord) -> None:
+        if not dry_run:
+            raise invalid
+        result['error_count'] += 1
+        if len(result['errors']) < MAX_ERRORS:
+            result['errors'].append(str(invalid))
+
+    def flush(operations: list, lines: list, position: int, line: int) -> None:
+        if dry_run:
+            missing = missing_wallets(operations, lines)
+            for wallet_id, first_line in missing.items():
+                error(InvalidRecord(first_line, f'wallet {wallet_id} does not exist'))
+            balance_changes([operation for operation in operations
+                             if operation[0] not in missing], deltas)
+        else:
+            import_chunk(operations, lines, progress, position, line)
+            wallet_ids.update(operation[0] for operation in operations)
+        result['operations'] += len(operations)
+        if report is not None:
+            report(result['operations'], line)
+
+    for position, line, records in read_chunks(file, format, chunk_size,
+                                               progress.position, progress.line):
+        operations, lines = [], []
+        for number, fields in records:
+            try:
+                if isinstance(fields, InvalidRecord):
+                    raise fields
+                operations.append(clean_record(*fields, today=today))
+                lines.append(number)
+            except InvalidRecord as invalid:
+                error(invalid)
+            except ValueError as invalid:
+                error(InvalidRecord(number, str(invalid)))
+        if operations:
+            flush(operations, lines, position, line)
+
+    if dry_run:
+        result['wallets'] = len(deltas)
+        result['negative'] = negative_balances(deltas)
+        return result
+
+    if progress.position:
+        wallet_ids.update(imported_wallets(file, format, progress.position))
+    wallet_ids = sorted(wallet_ids)
+    for i in range(0, len(wallet_ids), CHECKPOINT_CHUNK_SIZE):
+        result['checkpoints'] += rebuild_checkpoints(wallet_ids[i:i + CHECKPOINT_CHUNK_SIZE])
+    result['wallets'] = len(wallet_ids)
+    return result
@@ -0,0 +1,219 @@
+"""
+Load generator for the money endpoints.
+
+Seeds wallets, then drives deposits, withdrawals (including pairs of
+opposite transfers running at the same time) and history reads through
+the full WSGI handler from a thread pool, and reports throughput,
+latency percentiles, queries per request and lock errors.
+"""
+import json
+import random
+import sys
+import threading
+import time
+from concurrent.futures import ThreadPoolExecutor
+
+from django.contrib.auth.models import User
+from django.core.handlers.wsgi import WSGIHandler
+from django.core.signals import got_request_exception
+from django.db import connection, connections
+from django.db.models import Sum
+from django.test import RequestFactory, override_settings
+from rest_framework.authtoken.models import Token
+
+from wallets.balances import total_balance
+from wallets.models import Wallet
+from wallets.money import Money, ZERO
+from wallets.views import set_hot_mode, group_committer
+
+LOCK_ERRORS = ('database is locked', 'database table is locked', 'deadlock',
+               'could not serialize', 'lock timeout')
+
+_local = threading.local()
+
+
+def _store_exception(**kwargs):
+    _local.exception = sys.exc_info()[1]
+
+
+def _count_query(execute, sql, params, many, context):
+    _local.queries += 1
+    return execute(sql, params, many, context)
+
+
+def percentile(values: list, percent: float) -> float:
+    """
+    Returns the percentile of the sorted values (nearest rank).
+    """
+    if not values:
+        return 0.0
+    return values[min(len(values) - 1, int(len(values) * percent / 100))]
+
+
+def seed(wallets: int, balance: Money, prefix: str) -> list:
+    """
+    Creates the wallets with the balance and returns their ids.
+    """
+    Wallet.objects.bulk_create([
+        Wallet(name=f'{prefix} {i}', client_firstname='load', client_surname='test',
+               balance=balance)
+        for i in range(wallets)
+    ], batch_size=500)
+    return list(Wallet.objects.filter(name__startswith=f'{prefix} ')
+                .order_by('pk').values_list('pk', flat=True))
+
+
+def get_token() -> str:
+    user = User.objects.filter(username='loadtest').first() or \
+        User.objects.create_user(username='loadtest', password=None)
+    return Token.objects.get_or_create(user=user)[0].key
+
+
+def build_plan(wallet_ids: list, requests: int, mix: dict, amount: Money,
+               seed_: int = None, hot: bool = False) -> list:
+    """
+    Returns the shuffled list of (kind, method, path, body) requests.
+    Opposite transfers are kept next to each other,
+    so they run concurrently. If `hot` is set all deposits
+    go to the first wallet.
+    """
+    rnd = random.Random(seed_)
+    weights = [mix[kind] for kind in ('deposit', 'withdrawal', 'opposite', 'history')]
+    kinds = rnd.choices(('deposit', 'withdrawal', 'opposite', 'history'),
+                        weights=weights, k=requests)
+    groups = []
+    for kind in kinds:
+        sender, receiver = rnd.sample(wallet_ids, 2)
+        body = json.dumps({'amount': str(amount)})
+        if kind == 'deposit':
+            receiver = wallet_ids[0] if hot else receiver
+            groups.append([(kind, 'POST', f'/wallets/{receiver}/deposits/', body)])
+        elif kind == 'withdrawal':
+            groups.append([(kind, 'POST', f'/wallets/{sender}/withdrawals/{receiver}/', body)])
+        elif kind == 'opposite':
+            groups.append([
+                ('opposite', 'POST', f'/wallets/{sender}/withdrawals/{receiver}/', body),
+                ('opposite', 'POST', f'/wallets/{receiver}/withdrawals/{sender}/', body),
+            ])
+        else:
+            groups.append([(kind, 'GET', f'/operations/{sender}/?filter=-date', None)])
+    rnd.shuffle(groups)
+    return [request for group in groups for request in group]
+
+
+def run_plan(plan: list, token: str, workers: int, host: str) -> list:
+    """
+    Sends the requests through the WSGI handler from the thread pool.
+    Returns the list of (kind, status, seconds, queries, lock error) results.
+    """
+    handler = WSGIHandler()
+    factory = RequestFactory(HTTP_HOST=host, HTTP_AUTHORIZATION=f'Token {token}')
+    wrapped = set()
+
+    def send(item):
+        kind, method, path, body = item
+        if threading.get_ident() not in wrapped:
+            wrapped.add(threading.get_ident())
+            connection.execute_wrappers.append(_count_query)
+
+        if method == 'GET':
+            environ = factory.get(path).environ
+        else:
+            environ = factory.generic(method, path, body, 'application/json').environ
+        _local.queries = 0
+        _local.exception = None
+        started = time.perf_counter()
+        response = handler(environ, lambda *args: None)
+        response.close()
+        seconds = time.perf_counter() - started
+        error = str(_local.exception or '').lower()
+        return (kind, response.status_code, seconds, _local.queries,
+                any(lock in error for lock in LOCK_ERRORS))
+
+    got_request_exception.connect(_store_exception)
+    try:
+        with ThreadPoolExecutor(max_workers=workers) as executor:
+            return list(executor.map(send, plan))
+    finally:
+        got_request_exception.disconnect(_store_exception)
+
+
+def summarize(results: list, seconds: float) -> dict:
+    """
+    Returns the statistics of the results per request kind and in total.
+    """
+    kinds = sorted({result[0] for result in results})
+    summary = {}
+    for kind in kinds + ['total']:
+        selected = [r for r in results if kind in (r[0], 'total')]
+        latencies = sorted(r[2] for r in selected)
+        summary[kind] = {
+            'requests': len(selected),
+            'throughput': round(len(selected) / seconds, 1) if seconds else 0.0,
+            'status': {str(code): sum(1 for r in selected if r[1] == code)
+                       for code in sorted({r[1] for r in selected})},
+            'p50_ms': round(percentile(latencies, 50) * 1000, 2),
+            'p95_ms': round(percentile(latencies, 95) * 1000, 2),
+            'p99_ms': round(percentile(latencies, 99) * 1000, 2),
+            'queries_per_request': round(sum(r[3] for r in selected) / len(selected), 2),
+            'lock_errors': sum(1 for r in selected if r[4]),
+        }
+    return summary
+
+
+def check_balances(wallet_ids: list, initial: Money, results: list,
+                   amount: Money) -> dict:
+    """
+    Checks that the sum of the wallet balances equals
+    the initial balances plus the successful deposits.
+    """
+    deposited = amount * sum(1 for r in results if r[0] == 'deposit' and r[1] == 200)
+    expected = initial * len(wallet_ids) + deposited
+    actual = Wallet.objects.filter(pk__in=wallet_ids).annotate(total=total_balance()) \
+        .aggregate(sum=Sum('total'))['sum'] or ZERO
+    return {
+        'expected_total': str(expected),
+        'actual_total': str(actual),
+        'consistent': actual == expected,
+    }
+
+
+def run(wallets: int = 100, requests: int = 1000, workers: int = 8, mix: dict = None,
+        balance: Money = Money.parse("1000.00"), amount: Money = Money.parse("1.00"),
+        host: str = '127.0.0.1', seed_: int = None, hot_slots: int = None,
+        group_commit: tuple = None) -> dict:
+    """
+    Runs the load test and returns the machine-readable report.
+
+    If `hot_slots` is set, all deposits go to one wallet
+    which has that number of slots (see wallets.balances).
+    If `group_commit` (max size, max wait) is set, deposits and transfers
+    are applied by the group commit writer (see wallets.group_commit).
+    """
+    mix = mix or {'deposit': 30, 'withdrawal': 30, 'opposite': 10, 'history': 30}
+    prefix = f'loadtest {int(time.time() * 1000)}'
+    wallet_ids = seed(wallets, balance, prefix)
+    if hot_slots:
+        set_hot_mode(wallet_ids[0], hot_slots if hot_slots > 1 else 0)
+    token = get_token()
+    plan = build_plan(wallet_ids, requests, mix, amount, seed_, hot=hot_slots is not None)
+    connections.close_all()
+
+    if group_commit:
+        group_committer.max_size, group_committer.max_wait = group_commit
+    started = time.perf_counter()
+    with override_settings(WALLETS_GROUP_COMMIT=bool(group_commit)):
+        results = run_plan(plan, token, workers, host)
+    seconds = time.perf_counter() - started
+    group_committer.stop()
+
+    return {
+        'config': {
+            'wallets': wallets, 'requests': len(plan), 'workers': workers, 'mix': mix,
+            'hot_slots': hot_slots, 'group_commit': group_commit,
+            'vendor': connection.vendor, 'database': str(connection.settings_dict['NAME']),
+        },
+        'seconds': round(seconds, 3),
+        'results': summarize(results, seconds),
+        'balances': check_balances(wallet_ids, balance, results, amount),
+    }
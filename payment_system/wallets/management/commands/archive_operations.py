@@ -0,0 +1,34 @@
+import datetime
+import time
+
+from django.core.management.base import BaseCommand
+
+from wallets.archive import archive_operations, ARCHIVE_AFTER_DAYS, ARCHIVE_BATCH_SIZE, \
+    ARCHIVE_PAUSE
+
+
+class Command(BaseCommand):
+    help = 'Moves the old operations to the archive table in batches, ' \
+           'an interrupted run is completed by the next one'
+
+    def add_arguments(self, parser):
+        parser.add_argument('--days', type=int, default=ARCHIVE_AFTER_DAYS,
+                            help='archive the operations older than the number of days')
+        parser.add_argument('--batch-size', type=int, default=ARCHIVE_BATCH_SIZE,
+                            help='number of operations moved in one transaction')
+        parser.add_argument('--pause', type=float, default=ARCHIVE_PAUSE,
+                            help='seconds between the batches')
+
+    def handle(self, *args, **options):
+        cutoff = datetime.date.today() - datetime.timedelta(days=max(0, options['days']))
+        started = time.perf_counter()
+
+        def report(operations):
+            if options['verbosity'] > 1:
+                self.stdout.write(f'{operations} operations, '
+                                  f'{operations / (time.perf_counter() - started):.0f}/s')
+
+        moved = archive_operations(cutoff, max(1, options['batch_size']),
+                                   max(0.0, options['pause']), report)
+        self.stdout.write(f'{moved} operations dated before {cutoff} archived '
+                          f'in {time.perf_counter() - started:.1f}s')
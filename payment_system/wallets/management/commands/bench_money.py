@@ -0,0 +1,92 @@
+import json
+import random
+import sqlite3
+import time
+from decimal import Decimal
+
+from django.core.management.base import BaseCommand
+from django.db import models
+from django.db.backends.sqlite3.operations import DatabaseOperations
+from django.db.models.expressions import Col
+
+from wallets.money import Money
+from wallets.serializers import dumps_json
+
+
+def best(func, repeat: int) -> float:
+    """
+    Returns the shortest time of `repeat` calls in milliseconds.
+    """
+    times = []
+    for _ in range(repeat):
+        started = time.perf_counter()
+        func()
+        times.append(time.perf_counter() - started)
+    return round(min(times) * 1000, 2)
+
+
+class Command(BaseCommand):
+    help = 'Compares the cost of amounts stored as SQLite decimals (read as Decimal) ' \
+           'and as integer cents (read as Money) and reports milliseconds as JSON'
+
+    def add_arguments(self, parser):
+        parser.add_argument('--operations', type=int, default=200000)
+        parser.add_argument('--wallets', type=int, default=1000)
+        parser.add_argument('--page', type=int, default=1000)
+        parser.add_argument('--repeat', type=int, default=5)
+        parser.add_argument('--seed', type=int, default=1)
+
+    def handle(self, *args, **options):
+        rng = random.Random(options['seed'])
+        rows = [(rng.randrange(options['wallets']), rng.randrange(1, 10 ** 7))
+                for _ in range(options['operations'])]
+
+        # the column types and the converters of DecimalField(9, 2) and MoneyField,
+        # the internal arithmetic of the cents is done on the integers
+        database = sqlite3.connect(':memory:')
+        database.execute('CREATE TABLE decimal_amounts (wallet_id integer, amount decimal)')
+        database.execute('CREATE TABLE cents_amounts (wallet_id integer, amount bigint)')
+        database.executemany('INSERT INTO decimal_amounts VALUES (?, ?)',
+                             ((wallet_id, str(Money(cents))) for wallet_id, cents in rows))
+        database.executemany('INSERT INTO cents_amounts VALUES (?, ?)', rows)
+        field = models.DecimalField(max_digits=9, decimal_places=2)
+        column, total = Col('t', field), models.Sum('amount', output_field=field)
+        operations = DatabaseOperations(None)
+        read_column = operations.get_decimalfield_converter(column)
+        read_sum = operations.get_decimalfield_converter(total)
+        # (table, read, read sum, internal value, internal zero)
+        amount_types = {
+            'decimal': ('decimal_amounts',
+                        lambda value: read_column(value, column, None),
+                        lambda value: read_sum(value, total, None),
+                        lambda value: read_column(value, column, None), Decimal("0.00")),
+            'cents': ('cents_amounts', Money, Money, int, 0),
+        }
+
+        report = {}
+        for name, (table, convert, convert_sum, internal, zero) in amount_types.items():
+            def page():
+                cursor = database.execute(f'SELECT wallet_id, amount FROM {table} LIMIT ?',
+                                          [options['page']])
+                return dumps_json([{'wallet_id': wallet_id, 'amount': convert(amount)}
+                                   for wallet_id, amount in cursor])
+
+            def aggregate():
+                cursor = database.execute(f'SELECT wallet_id, SUM(amount) FROM {table} '
+                                          f'GROUP BY wallet_id')
+                return {wallet_id: convert_sum(total) for wallet_id, total in cursor}
+
+            amounts = [internal(amount) for _, amount in
+                       database.execute(f'SELECT wallet_id, amount FROM {table}')]
+            totals = aggregate()
+            exact = {}
+            for wallet_id, cents in rows:
+                exact[wallet_id] = exact.get(wallet_id, 0) + cents
+            report[name] = {
+                'page_read_and_encode_ms': best(page, options['repeat']),
+                'sql_sum_by_wallet_ms': best(aggregate, options['repeat']),
+                'python_sum_ms': best(lambda: sum(amounts, zero), options['repeat']),
+                'inexact_sums': sum(1 for wallet_id, total in totals.items()
+                                    if total != Money(exact[wallet_id])),
+            }
+        self.stdout.write(json.dumps(report, indent=2))
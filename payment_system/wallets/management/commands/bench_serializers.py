@@ -0,0 +1,54 @@
+import datetime
+import json
+import timeit
+
+from django.core.management.base import BaseCommand
+
+from wallets import serializers
+from wallets.money import Money
+
+
+def operation_page(rows: int, amount=Money) -> list:
+    """
+    Returns the page of operations as the operations view serializes it,
+    `amount` converts the cents to the amount type.
+    """
+    today = datetime.date.today()
+    return [{
+        'id': i,
+        'name': 'deposit' if i % 2 else 'withdrawal',
+        'date': today - datetime.timedelta(days=i % 365),
+        'amount': amount(i % 1000000),
+        'wallet_id': 1,
+    } for i in range(rows)]
+
+
+class Command(BaseCommand):
+    help = 'Measures encoding of operation pages by the response serializers ' \
+           'and reports microseconds per page as JSON'
+
+    def add_arguments(self, parser):
+        parser.add_argument('--rows', type=int, nargs='+', default=[25, 1000])
+        parser.add_argument('--repeat', type=int, default=5)
+
+    def handle(self, *args, **options):
+        encoders = {'json': lambda data: json.dumps(data, default=serializers._default).encode()}
+        if serializers.orjson is not None:
+            encoders['orjson'] = serializers.dumps_json
+        if serializers.msgpack is not None:
+            encoders['msgpack'] = serializers.dumps_msgpack
+
+        report = {}
+        for rows in options['rows']:
+            page = operation_page(rows)
+            number = max(1, 25000 // rows)
+            report[rows] = {
+                name: {
+                    'us_per_page': round(min(timeit.repeat(lambda: encode(page), number=number,
+                                                           repeat=options['repeat']))
+                                         / number * 1e6, 1),
+                    'bytes': len(encode(page)),
+                }
+                for name, encode in encoders.items()
+            }
+        self.stdout.write(json.dumps(report, indent=2))
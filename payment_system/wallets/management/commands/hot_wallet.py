@@ -0,0 +1,25 @@
+from django.core.management.base import BaseCommand, CommandError
+
+from wallets.models import Wallet
+from wallets.views import set_hot_mode
+
+
+class Command(BaseCommand):
+    help = 'Splits the wallet balance between slots to speed up concurrent deposits, ' \
+           '0 slots turns the hot mode off'
+
+    def add_arguments(self, parser):
+        parser.add_argument('wallet_id', type=int)
+        parser.add_argument('slots', type=int)
+
+    def handle(self, *args, **options):
+        if not 0 <= options['slots'] <= 256:
+            raise CommandError('The number of slots must be from 0 to 256')
+
+        try:
+            set_hot_mode(options['wallet_id'], options['slots'])
+        except Wallet.DoesNotExist:
+            raise CommandError(f"Wallet with id={options['wallet_id']} does not exist")
+
+        self.stdout.write(f"Wallet with id={options['wallet_id']} has "
+                          f"{options['slots']} slots")
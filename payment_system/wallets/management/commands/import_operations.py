@@ -0,0 +1,80 @@
+import os
+import time
+
+from django.core.management.base import BaseCommand, CommandError
+
+from wallets.importing import (
+    import_operations, create_operation_indexes, drop_operation_indexes, local_caches,
+    InvalidRecord, FORMATS, IMPORT_CHUNK_SIZE,
+)
+
+
+class Command(BaseCommand):
+    help = 'Imports historical operations from a CSV (wallet_id,name,amount,date) ' \
+           'or NDJSON file, an interrupted import resumes where it stopped'
+
+    def add_arguments(self, parser):
+        parser.add_argument('file', help='CSV or NDJSON file with the operations')
+        parser.add_argument('--format', choices=FORMATS, default=None,
+                            help='file format, NDJSON for the .ndjson and .jsonl files '
+                                 'and CSV otherwise by default')
+        parser.add_argument('--source', default=None,
+                            help='name of the saved import position, '
+                                 'the absolute path of the file by default')
+        parser.add_argument('--chunk-size', type=int, default=IMPORT_CHUNK_SIZE,
+                            help='number of operations imported in one transaction')
+        parser.add_argument('--dry-run', action='store_true',
+                            help='validate the file without importing it')
+        parser.add_argument('--defer-indexes', action='store_true',
+                            help='drop the operation indexes during the import '
+                                 'and create them at the end')
+
+    def handle(self, *args, **options):
+        path = options['file']
+        format = options['format'] or \
+            ('ndjson' if path.endswith(('.ndjson', '.jsonl')) else 'csv')
+        source = options['source'] or os.path.abspath(path)
+        started = time.perf_counter()
+
+        def report(operations, line):
+            if options['verbosity'] > 1:
+                self.stdout.write(f'{operations} operations, line {line}, '
+                                  f'{operations / (time.perf_counter() - started):.0f}/s')
+
+        defer_indexes = options['defer_indexes'] and not options['dry_run']
+        if defer_indexes:
+            drop_operation_indexes()
+        try:
+            with open(path, 'rb') as file:
+                result = import_operations(file, format, source, max(1, options['chunk_size']),
+                                           options['dry_run'], report)
+        except InvalidRecord as error:
+            raise CommandError(f'{error}, the import stopped at the chunk containing '
+                               f'the line and resumes there')
+        finally:
+            if defer_indexes:
+                create_operation_indexes()
+        elapsed = time.perf_counter() - started
+
+        if options['dry_run']:
+            for error in result['errors']:
+                self.stdout.write(error)
+            for wallet_id, balance in result['negative']:
+                self.stdout.write(f'wallet {wallet_id}: balance would be {balance}')
+            self.stdout.write(f'{result["operations"]} operations of {result["wallets"]} '
+                              f'wallets checked in {elapsed:.1f}s, '
+                              f'{result["error_count"]} invalid records, '
+                              f'{len(result["negative"])} negative balances')
+            if result['error_count'] or result['negative']:
+                raise CommandError('The file can not be imported')
+            return
+
+        self.stdout.write(f'{result["operations"]} operations of {result["wallets"]} wallets '
+                          f'imported in {elapsed:.1f}s '
+                          f'({result["operations"] / max(elapsed, 1e-9):.0f}/s), '
+                          f'{result["checkpoints"]} checkpoints rebuilt')
+        aliases = local_caches()
+        if aliases and result['operations']:
+            self.stderr.write(f'The {", ".join(aliases)} caches are local to this process, '
+                              f'restart the web workers to drop their cached responses '
+                              f'and summaries of the imported wallets')
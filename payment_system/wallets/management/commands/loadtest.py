@@ -0,0 +1,60 @@
+import json
+import os
+
+from django.core.management import call_command
+from django.core.management.base import BaseCommand, CommandError
+from django.db import connections
+
+from wallets.loadtest import run
+
+
+class Command(BaseCommand):
+    help = 'Drives concurrent deposits, withdrawals and history reads ' \
+           'and reports throughput, latency and consistency as JSON'
+
+    def add_arguments(self, parser):
+        parser.add_argument('--wallets', type=int, default=100)
+        parser.add_argument('--requests', type=int, default=1000)
+        parser.add_argument('--workers', type=int, default=8)
+        parser.add_argument('--mix', default='deposit=30,withdrawal=30,opposite=10,history=30',
+                            help='weights of the request kinds')
+        parser.add_argument('--seed', type=int, default=None)
+        parser.add_argument('--hot-slots', type=int, default=None,
+                            help='send all deposits to one wallet with this number of slots')
+        parser.add_argument('--group-commit', action='store_true',
+                            help='apply deposits and transfers by group commit')
+        parser.add_argument('--group-size', type=int, default=64,
+                            help='maximum number of transfers per group commit')
+        parser.add_argument('--group-wait', type=float, default=0.002,
+                            help='maximum seconds to wait for a group to fill')
+        parser.add_argument('--db-file', default=None,
+                            help='migrate and use this SQLite file instead of '
+                                 'the default database')
+        parser.add_argument('--output', default=None, help='write the report to the file')
+
+    def handle(self, *args, **options):
+        try:
+            mix = {kind: int(weight) for kind, weight in
+                   (item.split('=') for item in options['mix'].split(','))}
+            mix = {kind: mix.get(kind, 0) for kind in
+                   ('deposit', 'withdrawal', 'opposite', 'history')}
+        except ValueError:
+            raise CommandError('Invalid --mix')
+
+        if options['db_file']:
+            connections.close_all()
+            connections.databases['default']['NAME'] = os.path.abspath(options['db_file'])
+            call_command('migrate', verbosity=0)
+
+        report = run(wallets=options['wallets'], requests=options['requests'],
+                     workers=options['workers'], mix=mix, seed_=options['seed'],
+                     hot_slots=options['hot_slots'],
+                     group_commit=(options['group_size'], options['group_wait'])
+                     if options['group_commit'] else None)
+        output = json.dumps(report, indent=2)
+        if options['output']:
+            with open(options['output'], 'w') as file:
+                file.write(output)
+        self.stdout.write(output)
+        if not report['balances']['consistent']:
+            raise CommandError('The sum of balances does not match the deposits')
@@ -0,0 +1,38 @@
+import csv
+import sys
+
+from django.core.management.base import BaseCommand, CommandError
+
+from wallets.provisioning import clean_clients, create_wallets, PROVISION_CHUNK_SIZE
+
+
+class Command(BaseCommand):
+    help = 'Creates wallets for the clients listed in a CSV file ' \
+           '(client_firstname,client_surname per line)'
+
+    def add_arguments(self, parser):
+        parser.add_argument('file', help='CSV file with the clients, "-" for stdin')
+        parser.add_argument('--chunk-size', type=int, default=PROVISION_CHUNK_SIZE,
+                            help='number of wallets created in one transaction')
+        parser.add_argument('--output', default=None,
+                            help='write the ids of the created wallets to the file')
+
+    def handle(self, *args, **options):
+        file = sys.stdin if options['file'] == '-' else open(options['file'], newline='')
+        try:
+            items = [{'client_firstname': row[0].strip(), 'client_surname': row[1].strip()}
+                     if len(row) >= 2 else {} for row in csv.reader(file) if row]
+        finally:
+            if file is not sys.stdin:
+                file.close()
+
+        clients, invalid = clean_clients(items)
+        if invalid:
+            raise CommandError(f'Invalid clients on lines: '
+                               f'{", ".join(str(i + 1) for i in invalid[:20])}')
+
+        ids = create_wallets(clients, options['chunk_size'])
+        if options['output']:
+            with open(options['output'], 'w') as output:
+                output.writelines(f'{pk}\n' for pk in ids)
+        self.stdout.write(f'{len(ids)} wallets created')
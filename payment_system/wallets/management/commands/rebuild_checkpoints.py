@@ -0,0 +1,25 @@
+from django.core.management.base import BaseCommand
+
+from wallets.checkpoints import rebuild_checkpoints
+from wallets.models import Wallet
+
+
+class Command(BaseCommand):
+    help = 'Recreates the daily balance checkpoints from the operations history'
+
+    def add_arguments(self, parser):
+        parser.add_argument('wallet_ids', nargs='*', type=int,
+                            help='wallets to rebuild, all wallets by default')
+        parser.add_argument('--chunk-size', type=int, default=500,
+                            help='number of wallets rebuilt in one transaction')
+
+    def handle(self, *args, **options):
+        wallet_ids = options['wallet_ids'] or \
+            list(Wallet.objects.order_by('pk').values_list('pk', flat=True))
+        chunk_size = options['chunk_size']
+
+        created = 0
+        for i in range(0, len(wallet_ids), chunk_size):
+            created += rebuild_checkpoints(wallet_ids[i:i + chunk_size])
+
+        self.stdout.write(f'{created} checkpoints created')
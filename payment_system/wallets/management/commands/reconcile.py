@@ -0,0 +1,50 @@
+import csv
+import os
+import time
+
+from django.core.management.base import BaseCommand, CommandError
+
+from wallets.money import Money
+from wallets.reconciliation import reconcile, RANGE_SIZE
+
+
+class Command(BaseCommand):
+    help = 'Checks that the wallet balances match the deposits minus the withdrawals ' \
+           'and reports the mismatched wallets'
+
+    def add_arguments(self, parser):
+        parser.add_argument('--processes', type=int, default=os.cpu_count() or 1,
+                            help='number of the processes checking the wallet ranges')
+        parser.add_argument('--range-size', type=int, default=RANGE_SIZE,
+                            help='number of wallet ids checked by one query')
+        parser.add_argument('--corrections', default=None,
+                            help='write the operations that would make the history match '
+                                 'the balances to the CSV file (wallet_id,name,amount)')
+
+    def handle(self, *args, **options):
+        started = time.perf_counter()
+        wallets = operations = 0
+        mismatches = []
+        for checked, folded, range_mismatches in reconcile(options['range_size'],
+                                                           max(1, options['processes'])):
+            wallets += checked
+            operations += folded
+            mismatches.extend(range_mismatches)
+            for wallet_id, history, balance in range_mismatches:
+                self.stdout.write(f'wallet {wallet_id}: balance {Money(balance)}, '
+                                  f'operations {Money(history)}')
+
+        if options['corrections']:
+            with open(options['corrections'], 'w', newline='') as file:
+                writer = csv.writer(file)
+                writer.writerow(['wallet_id', 'name', 'amount'])
+                for wallet_id, history, balance in mismatches:
+                    difference = balance - history
+                    writer.writerow([wallet_id, 'deposit' if difference > 0 else 'withdrawal',
+                                     str(Money(abs(difference)))])
+
+        self.stdout.write(f'{wallets} wallets and {operations} operations checked '
+                          f'in {time.perf_counter() - started:.1f}s, '
+                          f'{len(mismatches)} mismatched')
+        if mismatches:
+            raise CommandError(f'{len(mismatches)} wallets do not match their operations')
@@ -0,0 +1,45 @@
+import json
+import os
+
+from django.core.management.base import BaseCommand, CommandError
+
+from wallets.startup import measure
+
+
+class Command(BaseCommand):
+    help = 'Starts new worker processes with the settings modules and reports ' \
+           'import times, django.setup() time and request latencies as JSON'
+
+    def add_arguments(self, parser):
+        parser.add_argument('--profiles', nargs='+',
+                            default=[os.environ.get('DJANGO_SETTINGS_MODULE',
+                                                    'payment_system.settings')],
+                            help='settings modules to compare')
+        parser.add_argument('--path', default='/wallets/', help='path of the requests')
+        parser.add_argument('--token', default=None, help='token of the requests')
+        parser.add_argument('--requests', type=int, default=20,
+                            help='number of the requests after the first one')
+        parser.add_argument('--runs', type=int, default=3,
+                            help='number of the processes per profile, '
+                                 'the run with the median process time is reported')
+        parser.add_argument('--top', type=int, default=15,
+                            help='number of the slowest packages and modules')
+        parser.add_argument('--output', default=None, help='write the report to the file')
+
+    def handle(self, *args, **options):
+        report = {}
+        for profile in options['profiles']:
+            try:
+                runs = sorted((measure(profile, options['path'], options['requests'],
+                                       options['token'], options['top'])
+                               for _ in range(max(1, options['runs']))),
+                              key=lambda run: run['process_seconds'])
+            except RuntimeError as error:
+                raise CommandError(f'{profile}: {error}')
+            report[profile] = runs[len(runs) // 2]
+
+        output = json.dumps(report, indent=2)
+        if options['output']:
+            with open(options['output'], 'w') as file:
+                file.write(output)
+        self.stdout.write(output)
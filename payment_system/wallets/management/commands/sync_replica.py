@@ -0,0 +1,54 @@
+import sqlite3
+import time
+
+from django.core.management.base import BaseCommand, CommandError
+from django.db import connections
+
+from wallets.models import ReplicaHeartbeat
+from wallets.replicas import REPLICA_DATABASE
+
+
+class Command(BaseCommand):
+    help = 'Writes the replica heartbeat and copies the SQLite primary database ' \
+           'to the SQLite replica'
+
+    def add_arguments(self, parser):
+        parser.add_argument('--interval', type=float, default=None,
+                            help='repeat every INTERVAL seconds until interrupted')
+        parser.add_argument('--heartbeat-only', action='store_true',
+                            help='only write the heartbeat, for replicas kept '
+                                 'in sync by the database replication')
+
+    def handle(self, *args, **options):
+        if REPLICA_DATABASE not in connections.databases:
+            raise CommandError(f'The "{REPLICA_DATABASE}" database is not configured')
+
+        primary = connections['default']
+        replica = connections[REPLICA_DATABASE]
+        if not options['heartbeat_only'] and \
+                (primary.vendor, replica.vendor) != ('sqlite', 'sqlite'):
+            raise CommandError('Only SQLite databases can be copied, '
+                               'use --heartbeat-only with the database replication')
+
+        while True:
+            started = time.time()
+            ReplicaHeartbeat.objects.update_or_create(pk=1, defaults={'timestamp': started})
+            if not options['heartbeat_only']:
+                self.copy(primary.settings_dict['NAME'], replica.settings_dict['NAME'])
+            self.stdout.write(f'Replica synced in {time.time() - started:.3f}s')
+
+            if options['interval'] is None:
+                break
+            time.sleep(max(options['interval'] - (time.time() - started), 0))
+
+    @staticmethod
+    def copy(source_name, target_name) -> None:
+        # the online backup copies a consistent snapshot of the primary,
+        # the names may be URIs like the ones Django connects to
+        source = sqlite3.connect(str(source_name), uri=True)
+        target = sqlite3.connect(str(target_name), uri=True)
+        try:
+            source.backup(target)
+        finally:
+            target.close()
+            source.close()
@@ -0,0 +1,268 @@
+"""
+Low-overhead per-view request metrics in the Prometheus text format.
+
+Every thread updates its own shard, so recording takes no locks.
+Shards are merged when the metrics are exported. If WALLETS_METRICS_DIR
+is set, each process periodically writes its merged snapshot there
+and /metrics sums the snapshots of all worker processes.
+"""
+import glob
+import json
+import os
+import threading
+import time
+import uuid
+
+from django.conf import settings
+
+from wallets.token_cache import token_cache
+
+LATENCY_BUCKETS = (0.001, 0.0025, 0.005, 0.01, 0.025, 0.05, 0.1, 0.25, 0.5, 1, 2.5, 5, 10)
+QUERY_BUCKETS = (0, 1, 2, 3, 4, 5, 8, 13, 21, 50, 100)
+SIZE_BUCKETS = (64, 256, 1024, 4096, 16384, 65536, 262144, 1048576)
+GROUP_BUCKETS = (1, 2, 4, 8, 16, 32, 64, 128, 256)
+
+HISTOGRAMS = {
+    'wallets_request_duration_seconds': ('Request latency by view', LATENCY_BUCKETS),
+    'wallets_db_duration_seconds': ('Time spent in SQL statements by view', LATENCY_BUCKETS),
+    'wallets_db_queries': ('Number of SQL statements per request by view', QUERY_BUCKETS),
+    'wallets_response_size_bytes': ('Response body size by view', SIZE_BUCKETS),
+    'wallets_group_commit_size': ('Transfers applied per group commit', GROUP_BUCKETS),
+}
+COUNTERS = {
+    'wallets_requests_total': 'Requests by view and status code',
+    'wallets_token_cache_hits_total': 'Token cache hits',
+    'wallets_token_cache_negative_hits_total': 'Token cache hits for invalid tokens',
+    'wallets_token_cache_misses_total': 'Token cache misses',
+    'wallets_idempotency_replays_total': 'Responses replayed for an Idempotency-Key',
+    'wallets_idempotency_conflicts_total': 'Idempotency-Key requests rejected as in progress or reused',
+    'wallets_response_cache_hits_total': 'Wallet and operations responses served from the cache',
+    'wallets_response_cache_misses_total': 'Wallet and operations responses not found in the cache',
+    'wallets_transaction_retries_total': 'Transactions run again after a lock conflict by function',
+    'wallets_transaction_aborts_total': 'Transactions given up after repeated lock conflicts by function',
+}
+# gauges computed from the counters as hits / (hits + misses)
+RATIOS = {
+    'wallets_response_cache_hit_ratio': ('Share of the wallet and operations responses '
+                                         'served from the cache',
+                                         'wallets_response_cache_hits_total',
+                                         'wallets_response_cache_misses_total'),
+}
+
+METRICS_DIR = getattr(settings, 'WALLETS_METRICS_DIR', None)
+FLUSH_INTERVAL = getattr(settings, 'WALLETS_METRICS_FLUSH_INTERVAL', 1.0)
+
+
+class Registry:
+    """
+    Histograms and counters sharded by thread.
+
+    A histogram value is [bucket counts..., +Inf count, sum],
+    a counter value is [count]. Keys are (metric name, labels).
+    """
+    def __init__(self):
+        self._local = threading.local()
+        self._shards = []
+        self._shards_lock = threading.Lock()
+        self._collectors = []
+        self._file = None
+        self._flushed = 0.0
+        self._flush_lock = threading.Lock()
+
+    def _shard(self) -> dict:
+        shard = getattr(self._local, 'shard', None)
+        if shard is None:
+            shard = self._local.shard = {}
+            with self._shards_lock:
+                self._shards.append(shard)
+        return shard
+
+    def observe(self, name: str, labels: tuple, value: float) -> None:
+        shard = self._shard()
+        key = (name, labels)
+        buckets = HISTOGRAMS[name][1]
+        values = shard.get(key)
+        if values is None:
+            values = shard[key] = [0] * (len(buckets) + 2)
+        for i, bound in enumerate(buckets):
+            if value <= bound:
+                values[i] += 1
+                break
+        else:
+            values[len(buckets)] += 1
+        values[-1] += value
+
+    def inc(self, name: str, labels: tuple, value: float = 1) -> None:
+        shard = self._shard()
+        key = (name, labels)
+        values = shard.get(key)
+        if values is None:
+            values = shard[key] = [0]
+        values[0] += value
+
+    def add_collector(self, collector) -> None:
+        """
+        Adds the function returning {(counter name, labels): value}
+        which is called on every export.
+        """
+        self._collectors.append(collector)
+
+    def snapshot(self) -> dict:
+        """
+        Returns the merged values of all threads of the process.
+        """
+        merged = {}
+        with self._shards_lock:
+            shards = list(self._shards)
+        for shard in shards:
+            for key, values in list(shard.items()):
+                _merge(merged, key, values)
+        for collector in self._collectors:
+            for key, value in collector().items():
+                _merge(merged, key, [value])
+        return merged
+
+    def flush(self, force: bool = False) -> None:
+        """
+        Writes the process snapshot to WALLETS_METRICS_DIR
+        at most once per WALLETS_METRICS_FLUSH_INTERVAL seconds.
+        A request thread does not wait for a flush in progress.
+        """
+        if not METRICS_DIR or not (force or time.monotonic() - self._flushed > FLUSH_INTERVAL):
+            return
+        if not self._flush_lock.acquire(blocking=force):
+            return
+
+        try:
+            self._flushed = time.monotonic()
+            if self._file is None:
+                os.makedirs(METRICS_DIR, exist_ok=True)
+                self._file = os.path.join(METRICS_DIR, f'{os.getpid()}-{uuid.uuid4().hex}.json')
+            data = [[name, [list(label) for label in labels], values]
+                    for (name, labels), values in self.snapshot().items()]
+            tmp = f'{self._file}.{uuid.uuid4().hex}.tmp'
+            with open(tmp, 'w') as file:
+                json.dump(data, file)
+            os.replace(tmp, self._file)
+        finally:
+            self._flush_lock.release()
+
+    def collect(self) -> dict:
+        """
+        Returns the values summed over all processes,
+        or over this process if WALLETS_METRICS_DIR is not set.
+        The snapshots of the exited processes are removed.
+        """
+        if not METRICS_DIR:
+            return self.snapshot()
+
+        self.flush(force=True)
+        merged = {}
+        for path in glob.glob(os.path.join(METRICS_DIR, '*-*')):
+            if not _process_exists(os.path.basename(path).split('-', 1)[0]):
+                try:
+                    os.remove(path)
+                except OSError:
+                    pass
+                continue
+            if not path.endswith('.json'):
+                continue
+            try:
+                with open(path) as file:
+                    data = json.load(file)
+            except (OSError, ValueError):
+                continue
+            for name, labels, values in data:
+                _merge(merged, (name, tuple(tuple(label) for label in labels)), values)
+        return merged
+
+
+def _process_exists(pid: str) -> bool:
+    """
+    Returns whether the process writing the snapshot is running.
+    WALLETS_METRICS_DIR is only shared by the processes of one host.
+    """
+    try:
+        os.kill(int(pid), 0)
+    except ValueError:
+        return True
+    except ProcessLookupError:
+        return False
+    except PermissionError:
+        pass
+    return True
+
+
+def _merge(merged: dict, key: tuple, values: list) -> None:
+    current = merged.get(key)
+    if current is None:
+        merged[key] = list(values)
+    else:
+        for i, value in enumerate(values):
+            current[i] += value
+
+
+def _format_labels(labels: tuple, extra: tuple = ()) -> str:
+    labels = labels + extra
+    if not labels:
+        return ''
+    items = ','.join('{}="{}"'.format(name, str(value).replace('\\', '\\\\')
+                                      .replace('"', '\\"')) for name, value in labels)
+    return f'{{{items}}}'
+
+
+def _format_number(value: float) -> str:
+    return repr(float(value)) if isinstance(value, float) else str(value)
+
+
+def render(values: dict) -> str:
+    """
+    Returns the values in the Prometheus text exposition format.
+    """
+    lines = []
+    for name, (help_, buckets) in HISTOGRAMS.items():
+        series = sorted((labels, v) for (n, labels), v in values.items() if n == name)
+        if not series:
+            continue
+        lines += [f'# HELP {name} {help_}', f'# TYPE {name} histogram']
+        for labels, v in series:
+            cumulative = 0
+            for bound, count in zip(buckets + ('+Inf',), v[:-1]):
+                cumulative += count
+                lines.append(f'{name}_bucket{_format_labels(labels, (("le", bound),))} '
+                             f'{cumulative}')
+            lines.append(f'{name}_sum{_format_labels(labels)} {_format_number(v[-1])}')
+            lines.append(f'{name}_count{_format_labels(labels)} {cumulative}')
+
+    for name, help_ in COUNTERS.items():
+        series = sorted((labels, v) for (n, labels), v in values.items() if n == name)
+        if not series:
+            continue
+        lines += [f'# HELP {name} {help_}', f'# TYPE {name} counter']
+        for labels, v in series:
+            lines.append(f'{name}{_format_labels(labels)} {_format_number(v[0])}')
+
+    for name, (help_, hits_name, misses_name) in RATIOS.items():
+        hits = values.get((hits_name, ()), [0])[0]
+        misses = values.get((misses_name, ()), [0])[0]
+        if not hits + misses:
+            continue
+        lines += [f'# HELP {name} {help_}', f'# TYPE {name} gauge',
+                  f'{name} {_format_number(hits / (hits + misses))}']
+
+    return '\n'.join(lines) + '\n'
+
+
+registry = Registry()
+
+
+def _token_cache_counters() -> dict:
+    stats = token_cache.stats()
+    return {
+        ('wallets_token_cache_hits_total', ()): stats['hits'],
+        ('wallets_token_cache_negative_hits_total', ()): stats['negative_hits'],
+        ('wallets_token_cache_misses_total', ()): stats['misses'],
+    }
+
+
+registry.add_collector(_token_cache_counters)
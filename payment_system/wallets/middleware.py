@@ -0,0 +1,107 @@
+import asyncio
+import threading
+import time
+from contextlib import ExitStack
+
+from django.db import connections
+
+from wallets.metrics import registry
+from wallets.serializers import negotiate, set_format, reset_format
+
+_local = threading.local()
+
+
+def _time_query(execute, sql, params, many, context):
+    started = time.perf_counter()
+    try:
+        return execute(sql, params, many, context)
+    finally:
+        _local.queries += 1
+        _local.db_time += time.perf_counter() - started
+
+
+class MetricsMiddleware:
+    """
+    Records the latency, the number and the time of SQL statements,
+    the response size and the status code of every request by view.
+
+    SQL statements are only counted in the request thread, so they are
+    not recorded for the async views and for streamed response bodies.
+    """
+    sync_capable = True
+    async_capable = True
+
+    def __init__(self, get_response):
+        self.get_response = get_response
+        if asyncio.iscoroutinefunction(get_response):
+            self._is_coroutine = asyncio.coroutines._is_coroutine
+
+    def __call__(self, request):
+        if asyncio.iscoroutinefunction(self.get_response):
+            return self.__acall__(request)
+
+        _local.queries = 0
+        _local.db_time = 0.0
+        started = time.perf_counter()
+        # the reads may be routed to the replica, see wallets.replicas
+        with ExitStack() as stack:
+            for alias_connection in connections.all():
+                stack.enter_context(alias_connection.execute_wrapper(_time_query))
+            response = self.get_response(request)
+        self.record(request, response, time.perf_counter() - started,
+                    _local.queries, _local.db_time)
+        return response
+
+    async def __acall__(self, request):
+        started = time.perf_counter()
+        response = await self.get_response(request)
+        self.record(request, response, time.perf_counter() - started)
+        return response
+
+    @staticmethod
+    def record(request, response, seconds: float, queries: int = None,
+               db_time: float = None) -> None:
+        match = request.resolver_match
+        view = (match.func.__name__ if match else 'unresolved',)
+        labels = (('view', view[0]),)
+
+        registry.inc('wallets_requests_total',
+                     labels + (('status', response.status_code),))
+        registry.observe('wallets_request_duration_seconds', labels, seconds)
+        if queries is not None:
+            registry.observe('wallets_db_queries', labels, queries)
+            registry.observe('wallets_db_duration_seconds', labels, db_time)
+        if not response.streaming:
+            registry.observe('wallets_response_size_bytes', labels, len(response.content))
+        registry.flush()
+
+
+class ContentNegotiationMiddleware:
+    """
+    Selects the format of the API responses by the Accept header
+    of the request (see wallets.serializers).
+    """
+    sync_capable = True
+    async_capable = True
+
+    def __init__(self, get_response):
+        self.get_response = get_response
+        if asyncio.iscoroutinefunction(get_response):
+            self._is_coroutine = asyncio.coroutines._is_coroutine
+
+    def __call__(self, request):
+        if asyncio.iscoroutinefunction(self.get_response):
+            return self.__acall__(request)
+
+        token = set_format(negotiate(request.META.get('HTTP_ACCEPT', '')))
+        try:
+            return self.get_response(request)
+        finally:
+            reset_format(token)
+
+    async def __acall__(self, request):
+        token = set_format(negotiate(request.META.get('HTTP_ACCEPT', '')))
+        try:
+            return await self.get_response(request)
+        finally:
+            reset_format(token)
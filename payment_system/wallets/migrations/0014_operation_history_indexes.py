@@ -0,0 +1,25 @@
+from django.db import migrations, models
+import django.db.models.deletion
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('wallets', '0013_auto_20210309_1423'),
+    ]
+
+    operations = [
+        migrations.AddIndex(
+            model_name='operation',
+            index=models.Index(fields=['wallet', 'name', 'date', 'id'], name='operation_wallet_name_date'),
+        ),
+        migrations.AddIndex(
+            model_name='operation',
+            index=models.Index(fields=['wallet', 'date', 'id'], name='operation_wallet_date'),
+        ),
+        migrations.AlterField(
+            model_name='operation',
+            name='wallet',
+            field=models.ForeignKey(db_index=False, on_delete=django.db.models.deletion.CASCADE, to='wallets.wallet'),
+        ),
+    ]
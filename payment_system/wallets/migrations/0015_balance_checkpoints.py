@@ -0,0 +1,70 @@
+# Generated by Django 3.1.7 on 2026-10-18 15:10
+
+import datetime
+from decimal import Decimal
+from django.db import migrations, models
+from django.db.models import Q, Sum
+import django.db.models.deletion
+
+BACKFILL_CHUNK = 500
+
+
+def backfill_checkpoints(apps, schema_editor):
+    """
+    Creates the checkpoints of the existing operations, the closing
+    balances are counted back from the current wallet balances.
+    """
+    Wallet = apps.get_model('wallets', 'Wallet')
+    Operation = apps.get_model('wallets', 'Operation')
+    BalanceCheckpoint = apps.get_model('wallets', 'BalanceCheckpoint')
+    zero = Decimal('0.00')
+
+    wallet_ids = list(Wallet.objects.order_by('pk').values_list('pk', flat=True))
+    for i in range(0, len(wallet_ids), BACKFILL_CHUNK):
+        chunk = wallet_ids[i:i + BACKFILL_CHUNK]
+        balances = dict(Wallet.objects.filter(pk__in=chunk).values_list('pk', 'balance'))
+        days = Operation.objects.filter(wallet__in=chunk) \
+            .values('wallet', 'date') \
+            .annotate(deposits=Sum('amount', filter=Q(name='deposit')),
+                      withdrawals=Sum('amount', filter=Q(name='withdrawal'))) \
+            .order_by('wallet', '-date')
+        checkpoints = []
+        for day in days:
+            deposits, withdrawals = day['deposits'] or zero, day['withdrawals'] or zero
+            checkpoints.append(BalanceCheckpoint(
+                wallet_id=day['wallet'], date=day['date'], balance=balances[day['wallet']],
+                deposits=deposits, withdrawals=withdrawals,
+            ))
+            balances[day['wallet']] -= deposits - withdrawals
+        BalanceCheckpoint.objects.bulk_create(checkpoints)
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('wallets', '0014_operation_history_indexes'),
+    ]
+
+    operations = [
+        migrations.AlterField(
+            model_name='operation',
+            name='date',
+            field=models.DateField(default=datetime.date.today),
+        ),
+        migrations.CreateModel(
+            name='BalanceCheckpoint',
+            fields=[
+                ('id', models.AutoField(auto_created=True, primary_key=True, serialize=False, verbose_name='ID')),
+                ('date', models.DateField()),
+                ('balance', models.DecimalField(decimal_places=2, max_digits=9)),
+                ('deposits', models.DecimalField(decimal_places=2, default=Decimal('0.00'), max_digits=12)),
+                ('withdrawals', models.DecimalField(decimal_places=2, default=Decimal('0.00'), max_digits=12)),
+                ('wallet', models.ForeignKey(db_index=False, on_delete=django.db.models.deletion.CASCADE, to='wallets.wallet')),
+            ],
+        ),
+        migrations.AddConstraint(
+            model_name='balancecheckpoint',
+            constraint=models.UniqueConstraint(fields=('wallet', 'date'), name='checkpoint_wallet_date'),
+        ),
+        migrations.RunPython(backfill_checkpoints, migrations.RunPython.noop),
+    ]
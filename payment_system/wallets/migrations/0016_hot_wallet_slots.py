@@ -0,0 +1,50 @@
+# Generated by Django 3.1.7 on 2026-10-18 15:23
+
+from decimal import Decimal
+from django.db import migrations, models
+import django.db.models.deletion
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('wallets', '0015_balance_checkpoints'),
+    ]
+
+    operations = [
+        migrations.CreateModel(
+            name='WalletSlot',
+            fields=[
+                ('id', models.AutoField(auto_created=True, primary_key=True, serialize=False, verbose_name='ID')),
+                ('slot', models.PositiveSmallIntegerField()),
+                ('balance', models.DecimalField(decimal_places=2, default=Decimal('0.00'), max_digits=9)),
+            ],
+        ),
+        migrations.RemoveConstraint(
+            model_name='balancecheckpoint',
+            name='checkpoint_wallet_date',
+        ),
+        migrations.AddField(
+            model_name='balancecheckpoint',
+            name='slot',
+            field=models.PositiveSmallIntegerField(default=0),
+        ),
+        migrations.AddField(
+            model_name='wallet',
+            name='slots',
+            field=models.PositiveSmallIntegerField(default=0),
+        ),
+        migrations.AddConstraint(
+            model_name='balancecheckpoint',
+            constraint=models.UniqueConstraint(fields=('wallet', 'slot', 'date'), name='checkpoint_wallet_slot_date'),
+        ),
+        migrations.AddField(
+            model_name='walletslot',
+            name='wallet',
+            field=models.ForeignKey(db_index=False, on_delete=django.db.models.deletion.CASCADE, to='wallets.wallet'),
+        ),
+        migrations.AddConstraint(
+            model_name='walletslot',
+            constraint=models.UniqueConstraint(fields=('wallet', 'slot'), name='slot_wallet_slot'),
+        ),
+    ]
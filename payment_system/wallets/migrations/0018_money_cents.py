@@ -0,0 +1,103 @@
+from decimal import Decimal
+
+from django.db import migrations, models
+from django.db.models import F
+from django.db.models.functions import Round
+
+import wallets.money
+
+MONEY_FIELDS = {
+    'wallet': ('balance',),
+    'walletslot': ('balance',),
+    'operation': ('amount',),
+    'balancecheckpoint': ('balance', 'deposits', 'withdrawals'),
+}
+
+
+def to_cents(apps, schema_editor):
+    for model, fields in MONEY_FIELDS.items():
+        apps.get_model('wallets', model).objects.update(
+            **{field: Round(F(field) * 100) for field in fields}
+        )
+
+
+def from_cents(apps, schema_editor):
+    for model, fields in MONEY_FIELDS.items():
+        apps.get_model('wallets', model).objects.update(
+            **{field: F(field) * Decimal("0.01") for field in fields}
+        )
+
+
+class Migration(migrations.Migration):
+    """
+    Stores the amounts as integer cents. The decimal columns are widened
+    to hold the amounts in cents first, then changed to bigint.
+    """
+
+    dependencies = [
+        ('wallets', '0017_replica_heartbeat'),
+    ]
+
+    operations = [
+        migrations.AlterField(
+            model_name='wallet',
+            name='balance',
+            field=models.DecimalField(decimal_places=2, default=Decimal('0.00'), max_digits=17),
+        ),
+        migrations.AlterField(
+            model_name='walletslot',
+            name='balance',
+            field=models.DecimalField(decimal_places=2, default=Decimal('0.00'), max_digits=17),
+        ),
+        migrations.AlterField(
+            model_name='operation',
+            name='amount',
+            field=models.DecimalField(decimal_places=2, max_digits=17),
+        ),
+        migrations.AlterField(
+            model_name='balancecheckpoint',
+            name='balance',
+            field=models.DecimalField(decimal_places=2, max_digits=17),
+        ),
+        migrations.AlterField(
+            model_name='balancecheckpoint',
+            name='deposits',
+            field=models.DecimalField(decimal_places=2, default=Decimal('0.00'), max_digits=17),
+        ),
+        migrations.AlterField(
+            model_name='balancecheckpoint',
+            name='withdrawals',
+            field=models.DecimalField(decimal_places=2, default=Decimal('0.00'), max_digits=17),
+        ),
+        migrations.RunPython(to_cents, from_cents),
+        migrations.AlterField(
+            model_name='wallet',
+            name='balance',
+            field=wallets.money.MoneyField(default=0),
+        ),
+        migrations.AlterField(
+            model_name='walletslot',
+            name='balance',
+            field=wallets.money.MoneyField(default=0),
+        ),
+        migrations.AlterField(
+            model_name='operation',
+            name='amount',
+            field=wallets.money.MoneyField(),
+        ),
+        migrations.AlterField(
+            model_name='balancecheckpoint',
+            name='balance',
+            field=wallets.money.MoneyField(),
+        ),
+        migrations.AlterField(
+            model_name='balancecheckpoint',
+            name='deposits',
+            field=wallets.money.MoneyField(default=0),
+        ),
+        migrations.AlterField(
+            model_name='balancecheckpoint',
+            name='withdrawals',
+            field=wallets.money.MoneyField(default=0),
+        ),
+    ]
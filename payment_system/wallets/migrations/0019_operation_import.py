@@ -0,0 +1,23 @@
+# Generated by Django 3.1.7 on 2026-10-18 16:24
+
+from django.db import migrations, models
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('wallets', '0018_money_cents'),
+    ]
+
+    operations = [
+        migrations.CreateModel(
+            name='OperationImport',
+            fields=[
+                ('id', models.AutoField(auto_created=True, primary_key=True, serialize=False, verbose_name='ID')),
+                ('source', models.CharField(max_length=255, unique=True)),
+                ('position', models.BigIntegerField(default=0)),
+                ('line', models.BigIntegerField(default=0)),
+                ('operations', models.BigIntegerField(default=0)),
+            ],
+        ),
+    ]
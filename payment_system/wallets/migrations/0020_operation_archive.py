@@ -0,0 +1,42 @@
+# Generated by Django 3.1.7 on 2026-10-18 16:49
+
+from django.db import migrations, models
+import django.db.models.deletion
+import wallets.money
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('wallets', '0019_operation_import'),
+    ]
+
+    operations = [
+        migrations.CreateModel(
+            name='OperationArchive',
+            fields=[
+                ('id', models.AutoField(auto_created=True, primary_key=True, serialize=False, verbose_name='ID')),
+                ('cutoff', models.DateField(null=True)),
+                ('complete', models.BooleanField(default=True)),
+                ('operations', models.BigIntegerField(default=0)),
+            ],
+        ),
+        migrations.CreateModel(
+            name='ArchivedOperation',
+            fields=[
+                ('id', models.IntegerField(primary_key=True, serialize=False)),
+                ('name', models.CharField(max_length=10)),
+                ('date', models.DateField()),
+                ('amount', wallets.money.MoneyField()),
+                ('wallet', models.ForeignKey(db_index=False, on_delete=django.db.models.deletion.CASCADE, to='wallets.wallet')),
+            ],
+        ),
+        migrations.AddIndex(
+            model_name='archivedoperation',
+            index=models.Index(fields=['wallet', 'name', 'date', 'id'], name='archived_wallet_name_date'),
+        ),
+        migrations.AddIndex(
+            model_name='archivedoperation',
+            index=models.Index(fields=['wallet', 'date', 'id'], name='archived_wallet_date'),
+        ),
+    ]
@@ -1,25 +1,146 @@
 import datetime
-from decimal import Decimal
 
 from django.db import models
 
+from wallets.money import MoneyField
+
 
 class Wallet(models.Model):
     name = models.CharField(max_length=255, unique=True)
     client_firstname = models.CharField(max_length=30)
     client_surname = models.CharField(max_length=30)
-    balance = models.DecimalField(max_digits=9, decimal_places=2,
-                                  default=Decimal("0.00"))
+    balance = MoneyField(default=0)
+    # number of WalletSlot rows sharing the balance of a hot wallet,
+    # 0 if the whole balance is kept in the wallet row
+    slots = models.PositiveSmallIntegerField(default=0)
 
     def __str__(self):
         return self.name
 
 
+class WalletSlot(models.Model):
+    """
+    Part of the balance of a hot wallet (see wallets.balances).
+    """
+    wallet = models.ForeignKey(Wallet, on_delete=models.CASCADE, db_index=False)
+    slot = models.PositiveSmallIntegerField()
+    balance = MoneyField(default=0)
+
+    class Meta:
+        constraints = [
+            models.UniqueConstraint(fields=['wallet', 'slot'], name='slot_wallet_slot'),
+        ]
+
+    def __str__(self):
+        return f'{self.wallet_id}/{self.slot}: balance={self.balance}'
+
+
 class Operation(models.Model):
     name = models.CharField(max_length=10)
-    wallet = models.ForeignKey(Wallet, on_delete=models.CASCADE)
-    date = models.DateField(default=datetime.date.today())
-    amount = models.DecimalField(max_digits=9, decimal_places=2)
+    wallet = models.ForeignKey(Wallet, on_delete=models.CASCADE, db_index=False)
+    date = models.DateField(default=datetime.date.today)
+    amount = MoneyField()
+
+    class Meta:
+        # the indexes match the history queries of the operations view,
+        # (wallet, date, id) also serves the wallet foreign key lookups
+        indexes = [
+            models.Index(fields=['wallet', 'name', 'date', 'id'],
+                         name='operation_wallet_name_date'),
+            models.Index(fields=['wallet', 'date', 'id'],
+                         name='operation_wallet_date'),
+        ]
+
+    def __str__(self):
+        return f'{self.date}: {self.name} - amount={self.amount}'
+
+
+class BalanceCheckpoint(models.Model):
+    """
+    Closing balance and totals of the wallet operations for the day.
+    Maintained by the money transfer functions in wallets.views.
+
+    Slot 0 is the balance kept in the wallet row, other slots are
+    the WalletSlot balances of a hot wallet.
+    """
+    wallet = models.ForeignKey(Wallet, on_delete=models.CASCADE, db_index=False)
+    slot = models.PositiveSmallIntegerField(default=0)
+    date = models.DateField()
+    balance = MoneyField()
+    deposits = MoneyField(default=0)
+    withdrawals = MoneyField(default=0)
+
+    class Meta:
+        constraints = [
+            models.UniqueConstraint(fields=['wallet', 'slot', 'date'],
+                                    name='checkpoint_wallet_slot_date'),
+        ]
+
+    def __str__(self):
+        return f'{self.date}: {self.wallet_id} - balance={self.balance}'
+
+
+class ReplicaHeartbeat(models.Model):
+    """
+    Time of the last write copied to the read replica,
+    written to the primary database by the sync_replica command.
+    Compared on the replica to measure its lag (see wallets.replicas).
+    """
+    timestamp = models.FloatField()
+
+    def __str__(self):
+        return f'heartbeat={self.timestamp}'
+
+
+class OperationImport(models.Model):
+    """
+    Progress of the import_operations command in a source file,
+    saved in the transaction of every imported chunk
+    (see wallets.importing).
+    """
+    source = models.CharField(max_length=255, unique=True)
+    # byte offset and line number after the last imported record
+    position = models.BigIntegerField(default=0)
+    line = models.BigIntegerField(default=0)
+    operations = models.BigIntegerField(default=0)
+
+    def __str__(self):
+        return f'{self.source}: {self.operations} operations imported'
+
+
+class ArchivedOperation(models.Model):
+    """
+    Operation moved from the Operation table by the archive_operations
+    command (see wallets.archive), keeps the id of the operation.
+    """
+    id = models.IntegerField(primary_key=True)
+    name = models.CharField(max_length=10)
+    wallet = models.ForeignKey(Wallet, on_delete=models.CASCADE, db_index=False)
+    date = models.DateField()
+    amount = MoneyField()
+
+    class Meta:
+        indexes = [
+            models.Index(fields=['wallet', 'name', 'date', 'id'],
+                         name='archived_wallet_name_date'),
+            models.Index(fields=['wallet', 'date', 'id'],
+                         name='archived_wallet_date'),
+        ]
 
     def __str__(self):
         return f'{self.date}: {self.name} - amount={self.amount}'
+
+
+class OperationArchive(models.Model):
+    """
+    State of the archival of the old operations, a single row
+    (see wallets.archive).
+    """
+    # the operations dated before the cutoff are archived,
+    # or being archived while `complete` is not set
+    cutoff = models.DateField(null=True)
+    complete = models.BooleanField(default=True)
+    operations = models.BigIntegerField(default=0)
+
+    def __str__(self):
+        return f'{self.operations} operations archived before {self.cutoff}'
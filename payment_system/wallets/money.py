@@ -0,0 +1,139 @@
+"""
+Amounts of money.
+
+Amounts are stored as integer cents by MoneyField and read as Money,
+an immutable amount with integer arithmetic and comparisons.
+The amounts entered by the users are parsed and rounded down to cents
+once by Money.parse, the responses print them as exact strings
+with two decimals.
+"""
+import functools
+from decimal import Decimal, InvalidOperation, ROUND_FLOOR
+
+from django.db import models
+
+CENTS = Decimal("1.00")
+# the fractional parts printed by Money.__str__
+_FRACTIONS = tuple(f'.{cents:02}' for cents in range(100))
+_set = object.__setattr__
+
+
+@functools.total_ordering
+class Money:
+    __slots__ = ('cents',)
+
+    def __init__(self, cents: int = 0):
+        _set(self, 'cents', cents)
+
+    @classmethod
+    def parse(cls, value) -> 'Money':
+        """
+        Returns the entered amount rounded down to cents.
+        Floats (JSON numbers) are read by their shortest decimal form,
+        so 0.29 is 0.29 and not the binary 0.28999...
+        Raises decimal.InvalidOperation if it is not a number.
+        """
+        if isinstance(value, float):
+            value = repr(value)
+        elif isinstance(value, bool) or not isinstance(value, (str, int, Decimal)):
+            raise InvalidOperation(f'Invalid amount: {value!r}')
+        amount = Decimal(value)
+        if not amount.is_finite():
+            raise InvalidOperation(f'Invalid amount: {value!r}')
+        return cls(int(amount.quantize(CENTS, ROUND_FLOOR).scaleb(2)))
+
+    def to_decimal(self) -> Decimal:
+        return Decimal(self.cents).scaleb(-2)
+
+    def __setattr__(self, name, value):
+        raise AttributeError('Money is immutable')
+
+    def __reduce__(self):
+        return Money, (self.cents,)
+
+    def __str__(self):
+        if self.cents < 0:
+            return f'-{-self}'
+        return str(self.cents // 100) + _FRACTIONS[self.cents % 100]
+
+    def __repr__(self):
+        return f"Money('{self}')"
+
+    def __eq__(self, other):
+        if isinstance(other, Money):
+            return self.cents == other.cents
+        if isinstance(other, Decimal):
+            return self.to_decimal() == other
+        return NotImplemented
+
+    def __hash__(self):
+        return hash(self.to_decimal())
+
+    def __lt__(self, other):
+        if isinstance(other, Money):
+            return self.cents < other.cents
+        return NotImplemented
+
+    def __add__(self, other):
+        if isinstance(other, Money):
+            return Money(self.cents + other.cents)
+        return NotImplemented
+
+    def __sub__(self, other):
+        if isinstance(other, Money):
+            return Money(self.cents - other.cents)
+        return NotImplemented
+
+    def __mul__(self, other):
+        if isinstance(other, int):
+            return Money(self.cents * other)
+        return NotImplemented
+
+    __rmul__ = __mul__
+
+    def __neg__(self):
+        return Money(-self.cents)
+
+    def __bool__(self):
+        return self.cents != 0
+
+
+ZERO = Money(0)
+# 15 digits, a balance can hold more than 9000 of the largest amounts
+MAX_AMOUNT = Money(10 ** 15 - 1)
+
+
+def valid_amount(amount: Money) -> bool:
+    return ZERO < amount <= MAX_AMOUNT
+
+
+def parse_cents(value) -> int:
+    """
+    Returns the amount in cents without rounding.
+    Raises ValueError if it is not a non-negative number
+    with at most two decimals.
+    """
+    whole, point, fraction = str(value).strip().partition('.')
+    if not (whole.isascii() and whole.isdigit() and len(fraction) <= 2
+            and (fraction.isascii() and fraction.isdigit() or not fraction)):
+        raise ValueError(f'Invalid amount: {value!r}')
+    return int(whole) * 100 + int(fraction.ljust(2, '0'))
+
+
+class MoneyField(models.BigIntegerField):
+    """
+    Amount of money stored as integer cents and read as Money.
+    Other values are parsed by Money.parse, so 100 is 100.00
+    as with a DecimalField.
+    """
+    def from_db_value(self, value, expression, connection):
+        return None if value is None else Money(int(value))
+
+    def to_python(self, value):
+        if value is None or isinstance(value, Money):
+            return value
+        return Money.parse(value)
+
+    def get_prep_value(self, value):
+        value = self.to_python(value)
+        return None if value is None else value.cents
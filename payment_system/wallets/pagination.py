@@ -0,0 +1,125 @@
+import base64
+import datetime
+import json
+
+from django.conf import settings
+from django.core.exceptions import ValidationError
+from django.db.models import Q, QuerySet
+from django.http import HttpRequest
+
+from wallets.serializers import ApiResponse
+
+PAGE_SIZE = 25
+MAX_PAGE_SIZE = getattr(settings, 'WALLETS_MAX_PAGE_SIZE', 1000)
+
+
+def encode_cursor(ordering: tuple, row: dict) -> str:
+    """
+    Returns the opaque cursor pointing after the row.
+    """
+    values = [ordering]
+    for field in ordering:
+        value = row[field.lstrip('-')]
+        values.append(value.isoformat() if isinstance(value, datetime.date)
+                      else value)
+    return base64.urlsafe_b64encode(json.dumps(values).encode()).decode()
+
+
+def decode_cursor(ordering: tuple, cursor: str) -> list:
+    """
+    Returns the values of the ordering fields stored in the cursor.
+    Raises ValueError if the cursor is broken or was issued
+    for another ordering.
+    """
+    try:
+        values = json.loads(base64.urlsafe_b64decode(cursor.encode()))
+    except (TypeError, ValueError, UnicodeError):
+        raise ValueError('Invalid cursor')
+
+    if not (isinstance(values, list) and values[:1] == [list(ordering)]
+            and len(values) == len(ordering) + 1):
+        raise ValueError('Invalid cursor')
+
+    return values[1:]
+
+
+def keyset_filter(ordering: tuple, values: list) -> Q:
+    """
+    Returns the condition selecting rows after the cursor values,
+    e.g. for ('date', 'id'): date > d OR (date = d AND id > i).
+    """
+    condition = Q()
+    for i in reversed(range(len(ordering))):
+        field = ordering[i].lstrip('-')
+        lookup = 'lt' if ordering[i].startswith('-') else 'gt'
+        equal = {ordering[j].lstrip('-'): values[j] for j in range(i)}
+        condition |= Q(**equal, **{f'{field}__{lookup}': values[i]})
+    return condition
+
+
+def get_page(request: HttpRequest, querysets, ordering: tuple) -> tuple:
+    """
+    Returns (rows, next cursor, total count) of the page requested
+    by the "cursor", "page_size" and "count" GET parameters.
+
+    The querysets (or a single queryset) must return dicts containing
+    the ordering fields, their rows must follow each other
+    in the ordering. A queryset is only read if the page
+    is not filled by the previous ones.
+    The page is selected by the ordering fields of the last row
+    of the previous page, so every page costs the same.
+    The legacy "page" parameter is still supported without COUNT(*).
+    The total count is only calculated if "count=true" is passed.
+    Raises ValueError if the parameters are invalid.
+    """
+    page_size = int(request.GET.get('page_size', PAGE_SIZE))
+    if not 0 < page_size <= MAX_PAGE_SIZE:
+        raise ValueError('Invalid page size')
+
+    if isinstance(querysets, QuerySet):
+        querysets = [querysets]
+    count = sum(queryset.count() for queryset in querysets) \
+        if request.GET.get('count') == 'true' else None
+
+    cursor = request.GET.get('cursor')
+    page = request.GET.get('page')
+    condition = Q()
+    offset = 0
+    if cursor:
+        condition = keyset_filter(ordering, decode_cursor(ordering, cursor))
+    elif page:
+        offset = (max(int(page), 1) - 1) * page_size
+
+    rows = []
+    for queryset in querysets:
+        try:
+            queryset = queryset.order_by(*ordering).filter(condition)
+        except (TypeError, ValidationError):
+            raise ValueError('Invalid cursor')
+        fetched = list(queryset[offset:offset + page_size + 1 - len(rows)])
+        # the offset of the legacy page continues in the next queryset
+        offset = max(offset - queryset.count(), 0) if offset and not fetched else 0
+        rows += fetched
+        if len(rows) > page_size:
+            break
+
+    next_cursor = None
+    if len(rows) > page_size:
+        rows = rows[:page_size]
+        next_cursor = encode_cursor(ordering, rows[-1])
+
+    return rows, next_cursor, count
+
+
+def page_response(rows: list, next_cursor: str, count: int) -> ApiResponse:
+    """
+    Returns the page rows in JSON format.
+    The next page cursor is passed in the X-Next-Cursor header
+    and the total count in the X-Total-Count header.
+    """
+    response = ApiResponse(rows, safe=False)
+    if next_cursor:
+        response['X-Next-Cursor'] = next_cursor
+    if count is not None:
+        response['X-Total-Count'] = count
+    return response
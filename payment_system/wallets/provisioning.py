@@ -0,0 +1,75 @@
+"""
+Creation of wallets in bulk.
+
+A wallet is named "wallet <id>". The ids are assigned by the database,
+so the wallets are inserted with temporary names unique to the batch
+and renamed by one UPDATE per chunk, the table is never read
+to find the next name and concurrent batches do not collide.
+"""
+import uuid
+
+from django.core.exceptions import ValidationError
+from django.db import transaction
+from django.db.models import CharField, Value
+from django.db.models.functions import Cast, Concat
+
+from wallets.models import Wallet
+
+PROVISION_CHUNK_SIZE = 500
+
+
+def clean_clients(items: list) -> tuple:
+    """
+    Returns the list of (client_firstname, client_surname)
+    and the list of the indexes of the invalid items.
+    """
+    firstname_field = Wallet._meta.get_field('client_firstname')
+    surname_field = Wallet._meta.get_field('client_surname')
+    clients = []
+    invalid = []
+    for i, item in enumerate(items):
+        try:
+            if not (item.get('client_firstname') and item.get('client_surname')):
+                raise ValidationError('Enter the correct data')
+            clients.append((firstname_field.clean(item['client_firstname'], None),
+                            surname_field.clean(item['client_surname'], None)))
+        except (AttributeError, ValidationError):
+            invalid.append(i)
+    return clients, invalid
+
+
+@transaction.atomic
+def create_wallet_chunk(clients: list) -> list:
+    """
+    Creates the wallets for the (client_firstname, client_surname) list
+    and returns their ids in the same order.
+    """
+    batch = uuid.uuid4().hex
+    wallets = Wallet.objects.bulk_create([
+        Wallet(name=f'new {batch} {i}', client_firstname=firstname, client_surname=surname)
+        for i, (firstname, surname) in enumerate(clients)
+    ])
+    if wallets and wallets[0].pk is not None:
+        ids = [wallet.pk for wallet in wallets]
+    else:
+        # the backend does not return the ids of the inserted rows
+        names = dict(Wallet.objects.filter(name__in=[wallet.name for wallet in wallets])
+                     .values_list('name', 'pk'))
+        ids = [names[wallet.name] for wallet in wallets]
+
+    Wallet.objects.filter(pk__in=ids).update(
+        name=Concat(Value('wallet '), Cast('pk', output_field=CharField()))
+    )
+    return ids
+
+
+def create_wallets(clients: list, chunk_size: int = PROVISION_CHUNK_SIZE) -> list:
+    """
+    Creates the wallets in chunks of `chunk_size`, each chunk
+    in its own transaction unless called in a transaction.
+    Returns the ids of the created wallets in the same order.
+    """
+    ids = []
+    for i in range(0, len(clients), chunk_size):
+        ids.extend(create_wallet_chunk(clients[i:i + chunk_size]))
+    return ids
@@ -0,0 +1,106 @@
+"""
+Reconciliation of the wallet balances with the operations history.
+
+The balance of a wallet must equal its deposits minus its withdrawals,
+the archived operations included.
+The wallets are split into ranges of ids, the operations of a range
+are streamed by one query and folded into an array of net totals
+in cents indexed by the wallet id, so the memory is bounded
+by the size of the range and not by the number of operations.
+The ranges are checked in parallel by a process pool.
+
+Each range is read in one transaction, the operations and the balances
+are the same snapshot on SQLite in the WAL mode and on PostgreSQL
+with the REPEATABLE READ isolation.
+"""
+from array import array
+from concurrent.futures import ProcessPoolExecutor
+
+from django.db import connection, connections, transaction
+from django.db.models import Max, Min
+
+from wallets.balances import total_balance
+from wallets.models import Wallet, Operation, ArchivedOperation
+
+RANGE_SIZE = 10000
+FETCH_SIZE = 10000
+
+
+def wallet_ranges(range_size: int = RANGE_SIZE) -> list:
+    """
+    Returns [(first id, last id + 1)] covering all wallets.
+    """
+    bounds = Wallet.objects.aggregate(first=Min('pk'), last=Max('pk'))
+    if bounds['first'] is None:
+        return []
+    return [(start, min(start + range_size, bounds['last'] + 1))
+            for start in range(bounds['first'], bounds['last'] + 1, range_size)]
+
+
+def fold_operations(start: int, stop: int) -> tuple:
+    """
+    Returns the net totals in cents of the wallets start..stop - 1
+    as an array indexed by (wallet id - start), and the number
+    of the operations, archived ones included.
+    """
+    totals = array('q', bytes(8 * (stop - start)))
+    operations = 0
+    with connection.chunked_cursor() as cursor:
+        cursor.execute(
+            ' UNION ALL '.join(
+                f"SELECT wallet_id, CASE WHEN name = 'deposit' THEN amount ELSE -amount END "
+                f"FROM {model._meta.db_table} WHERE wallet_id >= %s AND wallet_id < %s"
+                for model in (Operation, ArchivedOperation)
+            ),
+            [start, stop] * 2,
+        )
+        while True:
+            rows = cursor.fetchmany(FETCH_SIZE)
+            if not rows:
+                break
+            operations += len(rows)
+            for wallet_id, cents in rows:
+                totals[wallet_id - start] += cents
+    return totals, operations
+
+
+def reconcile_range(bounds: tuple) -> tuple:
+    """
+    Returns the number of wallets and operations in the range
+    and the list of (wallet id, history cents, balance cents)
+    of the wallets with a balance not matching the operations.
+    """
+    start, stop = bounds
+    with transaction.atomic():
+        if connection.vendor == 'postgresql':
+            with connection.cursor() as cursor:
+                cursor.execute('SET TRANSACTION ISOLATION LEVEL REPEATABLE READ')
+        balances = Wallet.objects.filter(pk__gte=start, pk__lt=stop) \
+            .annotate(total=total_balance()).values_list('pk', 'total')
+        balances = [(wallet_id, balance.cents) for wallet_id, balance in balances]
+        totals, operations = fold_operations(start, stop)
+
+    mismatches = [(wallet_id, totals[wallet_id - start], balance)
+                  for wallet_id, balance in balances if totals[wallet_id - start] != balance]
+    return len(balances), operations, mismatches
+
+
+def _init_worker() -> None:
+    import django
+    django.setup()
+
+
+def reconcile(range_size: int = RANGE_SIZE, processes: int = 1):
+    """
+    Yields the results of reconcile_range for all wallets,
+    in order of the ranges if `processes` is 1.
+    """
+    ranges = wallet_ranges(range_size)
+    if processes == 1 or len(ranges) < 2:
+        yield from map(reconcile_range, ranges)
+        return
+
+    # the connections of the parent must not be shared by the workers
+    connections.close_all()
+    with ProcessPoolExecutor(processes, initializer=_init_worker) as executor:
+        yield from executor.map(reconcile_range, ranges)
@@ -0,0 +1,204 @@
+"""
+Routing of the read-only requests to the read replica.
+
+Views decorated by `replica_reads` run their GET requests
+with the queries routed to the WALLETS_REPLICA_DATABASE alias
+by ReplicaRouter, writes always go to the primary database.
+The primary is used instead if:
+- the token wrote something less than WALLETS_REPLICA_STICKY_SECONDS ago,
+  so clients read their own writes;
+- the replica is unavailable or lags more than WALLETS_REPLICA_MAX_LAG
+  seconds behind the primary (see ReplicaHeartbeat), the replica state
+  is checked at most once per WALLETS_REPLICA_CHECK_INTERVAL seconds;
+- a replica query fails, then the view is run again on the primary.
+"""
+import asyncio
+import contextvars
+import functools
+import hashlib
+import threading
+import time
+
+from django.conf import settings
+from django.core.cache import caches
+from django.db import connections, DatabaseError, DEFAULT_DB_ALIAS
+
+from wallets.decorators import get_token_key
+
+REPLICA_DATABASE = getattr(settings, 'WALLETS_REPLICA_DATABASE', 'replica')
+STICKY_CACHE = getattr(settings, 'WALLETS_REPLICA_STICKY_CACHE', 'default')
+STICKY_SECONDS = getattr(settings, 'WALLETS_REPLICA_STICKY_SECONDS', 5)
+MAX_LAG = getattr(settings, 'WALLETS_REPLICA_MAX_LAG', 5)
+CHECK_INTERVAL = getattr(settings, 'WALLETS_REPLICA_CHECK_INTERVAL', 1)
+
+SAFE_METHODS = ('GET', 'HEAD')
+
+_read_database = contextvars.ContextVar('wallets_read_database', default=None)
+
+
+class ReplicaRouter:
+    """
+    Sends the reads of the replica_reads views to the replica.
+    """
+    def db_for_read(self, model, **hints):
+        return _read_database.get()
+
+    def db_for_write(self, model, **hints):
+        return DEFAULT_DB_ALIAS
+
+    def allow_relation(self, obj1, obj2, **hints):
+        return True
+
+    def allow_migrate(self, db, app_label, model_name=None, **hints):
+        # the replica is a copy of the primary
+        return db != REPLICA_DATABASE
+
+
+class ReplicaState:
+    """
+    Cached result of the replica health and lag check.
+    """
+    def __init__(self, check_interval: float, max_lag: float):
+        self.check_interval = check_interval
+        self.max_lag = max_lag
+        self._lock = threading.Lock()
+        self._checked = None
+        self._usable = False
+
+    def lag(self):
+        """
+        Returns the replica lag in seconds
+        or None if the replica is not usable.
+        """
+        try:
+            with connections[REPLICA_DATABASE].cursor() as cursor:
+                cursor.execute('SELECT MAX(timestamp) FROM wallets_replicaheartbeat')
+                timestamp = cursor.fetchone()[0]
+        except DatabaseError:
+            connections[REPLICA_DATABASE].close()
+            return None
+
+        return None if timestamp is None else max(time.time() - timestamp, 0.0)
+
+    def is_usable(self) -> bool:
+        if REPLICA_DATABASE not in connections.databases:
+            return False
+
+        now = time.monotonic()
+        with self._lock:
+            if self._checked is not None and now - self._checked < self.check_interval:
+                return self._usable
+
+        lag = self.lag()
+        with self._lock:
+            self._checked = now
+            self._usable = lag is not None and lag <= self.max_lag
+            return self._usable
+
+    def mark_unusable(self) -> None:
+        with self._lock:
+            self._checked = time.monotonic()
+            self._usable = False
+
+    def reset(self) -> None:
+        with self._lock:
+            self._checked = None
+
+
+replica_state = ReplicaState(CHECK_INTERVAL, MAX_LAG)
+
+
+def _sticky_key(token: str) -> str:
+    return f'wallets:replica:sticky:{hashlib.sha256(token.encode()).hexdigest()}'
+
+
+def mark_written(request) -> None:
+    """
+    Sends the reads of the request token to the primary
+    for the next WALLETS_REPLICA_STICKY_SECONDS.
+    """
+    token = get_token_key(request)
+    if token:
+        caches[STICKY_CACHE].set(_sticky_key(token), True, STICKY_SECONDS)
+
+
+def read_database(request):
+    """
+    Returns the database alias for the reads of the request.
+    """
+    if request.method not in SAFE_METHODS:
+        return DEFAULT_DB_ALIAS
+
+    token = get_token_key(request)
+    if token and caches[STICKY_CACHE].get(_sticky_key(token)):
+        return DEFAULT_DB_ALIAS
+
+    return REPLICA_DATABASE if replica_state.is_usable() else DEFAULT_DB_ALIAS
+
+
+def reads_from_replica() -> bool:
+    return _read_database.get() == REPLICA_DATABASE
+
+
+def _stream_from(database: str, content):
+    # the body is streamed after the view returned
+    previous = _read_database.get()
+    _read_database.set(database)
+    try:
+        yield from content
+    finally:
+        _read_database.set(previous)
+
+
+def replica_reads(func):
+    """
+    Runs the GET requests of the view on the replica if possible,
+    successful requests with other methods make the token sticky
+    to the primary (see the module docstring).
+    """
+    if asyncio.iscoroutinefunction(func):
+        @functools.wraps(func)
+        async def async_wrapper_routing_reads(request, *args, **kwargs):
+            database = read_database(request)
+            if database == DEFAULT_DB_ALIAS:
+                response = await func(request, *args, **kwargs)
+                if request.method not in SAFE_METHODS and response.status_code < 400:
+                    mark_written(request)
+                return response
+
+            context = _read_database.set(database)
+            try:
+                return await func(request, *args, **kwargs)
+            except DatabaseError:
+                replica_state.mark_unusable()
+            finally:
+                _read_database.reset(context)
+            return await func(request, *args, **kwargs)
+
+        return async_wrapper_routing_reads
+
+    @functools.wraps(func)
+    def wrapper_routing_reads(request, *args, **kwargs):
+        database = read_database(request)
+        if database == DEFAULT_DB_ALIAS:
+            response = func(request, *args, **kwargs)
+            if request.method not in SAFE_METHODS and response.status_code < 400:
+                mark_written(request)
+            return response
+
+        context = _read_database.set(database)
+        try:
+            response = func(request, *args, **kwargs)
+        except DatabaseError:
+            replica_state.mark_unusable()
+            response = None
+        finally:
+            _read_database.reset(context)
+
+        if response is None:
+            return func(request, *args, **kwargs)
+        if response.streaming:
+            response.streaming_content = _stream_from(database, response.streaming_content)
+        return response
+
+    return wrapper_routing_reads
@@ -0,0 +1,109 @@
+"""
+Cache of the wallet and operations GET responses.
+
+The responses are stored in the WALLETS_RESPONSE_CACHE cache under keys
+containing the version of the wallet. Writes bump the version after
+the commit, so the old responses are not used anymore and expire
+by themselves. A missing version starts from a random number,
+so a version dropped by the cache never repeats an old one.
+Responses read from the replica are not stored, they may be stale.
+
+The versions must be seen by all the worker processes, so the cache
+must be shared (e.g. memcached): a bump in a process-local cache
+only invalidates the worker making the write. The responses are
+not cached if WALLETS_RESPONSE_CACHE_TTL is 0, the default unless
+WALLETS_RESPONSE_CACHE_BACKEND is configured.
+"""
+import functools
+import hashlib
+import random
+
+from django.conf import settings
+from django.core.cache import caches
+from django.db import transaction
+from django.http import HttpResponse
+
+from wallets.metrics import registry
+from wallets.replicas import reads_from_replica
+from wallets.serializers import current_format
+
+RESPONSE_CACHE = getattr(settings, 'WALLETS_RESPONSE_CACHE', 'default')
+RESPONSE_CACHE_TTL = getattr(settings, 'WALLETS_RESPONSE_CACHE_TTL', 0)
+# Vary: Accept tells the shared caches the response depends on the format
+CACHED_HEADERS = ('Vary', 'X-Next-Cursor', 'X-Total-Count')
+
+
+def _version_key(wallet_id: int) -> str:
+    return f'wallets:version:{wallet_id}'
+
+
+def get_version(wallet_id: int) -> int:
+    cache = caches[RESPONSE_CACHE]
+    version = cache.get(_version_key(wallet_id))
+    if version is None:
+        cache.add(_version_key(wallet_id), random.getrandbits(48), None)
+        version = cache.get(_version_key(wallet_id))
+    return version
+
+
+def bump_versions(wallet_ids) -> None:
+    """
+    Invalidates the cached responses of the wallets now
+    and once more when the current transaction is committed,
+    since the responses cached in between may have been read
+    before the commit.
+    """
+    wallet_ids = set(wallet_ids)
+
+    def bump():
+        cache = caches[RESPONSE_CACHE]
+        for wallet_id in wallet_ids:
+            try:
+                cache.incr(_version_key(wallet_id))
+            except ValueError:
+                # not cached, the next version is random
+                pass
+
+    bump()
+    transaction.on_commit(bump)
+
+
+def cached_response(key):
+    """
+    Caches the successful responses of the function
+    if WALLETS_RESPONSE_CACHE_TTL is set.
+    `key` takes the arguments of the function and returns
+    (wallet id, key of the response within the wallet).
+    """
+    def decorator(func):
+        @functools.wraps(func)
+        def wrapper_caching_response(*args, **kwargs):
+            if RESPONSE_CACHE_TTL <= 0:
+                return func(*args, **kwargs)
+            wallet_id, name = key(*args, **kwargs)
+            digest = hashlib.sha256(f'{current_format()}:{name}'.encode()).hexdigest()[:32]
+            cache_key = f'wallets:response:{wallet_id}:{get_version(wallet_id)}:{digest}'
+            cache = caches[RESPONSE_CACHE]
+
+            stored = cache.get(cache_key)
+            if stored is not None:
+                registry.inc('wallets_response_cache_hits_total', ())
+                content, content_type, headers = stored
+                response = HttpResponse(content, content_type=content_type)
+                for header, value in headers:
+                    response[header] = value
+                return response
+
+            registry.inc('wallets_response_cache_misses_total', ())
+            response = func(*args, **kwargs)
+            if response.status_code == 200 and not response.streaming \
+                    and not reads_from_replica():
+                headers = [(header, response[header]) for header in CACHED_HEADERS
+                           if response.has_header(header)]
+                cache.set(cache_key, (response.content, response['Content-Type'], headers),
+                          RESPONSE_CACHE_TTL)
+            return response
+
+        return wrapper_caching_response
+
+    return decorator
@@ -0,0 +1,77 @@
+"""
+Retries of the transactions failed by lock conflicts.
+
+Concurrent transactions may be aborted by a deadlock or a serialization
+failure on PostgreSQL and by "database is locked" on SQLite
+(after busy_timeout, or at once in the shared cache of the test database).
+Nothing is written by such a transaction, so it is run again
+after a jittered exponential backoff until the attempts
+or the time budget run out.
+"""
+import functools
+import random
+import time
+
+from django.conf import settings
+from django.db import connection, OperationalError
+
+from wallets.metrics import registry
+
+# deadlock_detected, serialization_failure and lock_not_available
+LOCK_ERROR_CODES = ('40P01', '40001', '55P03')
+LOCK_ERROR_MESSAGES = ('database is locked', 'database table is locked')
+
+MAX_ATTEMPTS = getattr(settings, 'WALLETS_TRANSACTION_ATTEMPTS', 10)
+RETRY_BUDGET = getattr(settings, 'WALLETS_TRANSACTION_RETRY_BUDGET', 2.0)
+BACKOFF = getattr(settings, 'WALLETS_TRANSACTION_BACKOFF', 0.005)
+MAX_BACKOFF = 0.1
+
+
+class TransactionAborted(Exception):
+    """
+    Raised when the transaction still fails by lock conflicts
+    after all attempts.
+    """
+
+
+def is_lock_error(error: OperationalError) -> bool:
+    if getattr(error.__cause__, 'pgcode', None) in LOCK_ERROR_CODES:
+        return True
+    return str(error) in LOCK_ERROR_MESSAGES
+
+
+def retry_on_lock_errors(func):
+    """
+    Runs the atomic function again if it fails by a lock conflict.
+    Raises TransactionAborted if the attempts or the time budget run out.
+
+    A function called inside an outer transaction is not retried,
+    the outer transaction is aborted as a whole.
+    """
+    @functools.wraps(func)
+    def wrapper_retrying(*args, **kwargs):
+        if connection.in_atomic_block:
+            return func(*args, **kwargs)
+
+        labels = (('function', func.__name__),)
+        deadline = time.monotonic() + RETRY_BUDGET
+        attempt = 0
+        while True:
+            try:
+                return func(*args, **kwargs)
+            except OperationalError as error:
+                if not is_lock_error(error):
+                    raise
+                attempt += 1
+                # half of the backoff is random, so the conflicting
+                # transactions do not run again at the same time
+                backoff = min(MAX_BACKOFF, BACKOFF * 2 ** attempt)
+                delay = backoff / 2 + random.uniform(0, backoff / 2)
+                if attempt >= MAX_ATTEMPTS or time.monotonic() + delay > deadline:
+                    registry.inc('wallets_transaction_aborts_total', labels)
+                    raise TransactionAborted(func.__name__) from error
+
+                registry.inc('wallets_transaction_retries_total', labels)
+                time.sleep(delay)
+
+    return wrapper_retrying
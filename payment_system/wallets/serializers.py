@@ -0,0 +1,114 @@
+"""
+Serialization of the API request and response bodies.
+
+Responses are JSON, or MessagePack if the request accepts
+"application/msgpack" (see ContentNegotiationMiddleware).
+Amounts (Money) are exact strings and dates are ISO 8601 strings
+in both formats. orjson and msgpack are optional, without orjson
+the standard json module is used and without msgpack
+all responses are JSON.
+"""
+import contextvars
+import datetime
+import json
+from decimal import Decimal
+
+from django.http import HttpResponse
+
+from wallets.money import Money
+
+try:
+    import orjson
+except ImportError:
+    orjson = None
+
+try:
+    import msgpack
+except ImportError:
+    msgpack = None
+
+JSON = 'application/json'
+MSGPACK = 'application/msgpack'
+
+_response_format = contextvars.ContextVar('wallets_response_format', default=JSON)
+
+
+def _default(value):
+    if type(value) is Money or isinstance(value, Decimal):
+        return str(value)
+    if isinstance(value, datetime.date):
+        return value.isoformat()
+    raise TypeError(f'{type(value).__name__} is not serializable')
+
+
+def dumps_json(data) -> bytes:
+    if orjson is not None:
+        return orjson.dumps(data, default=_default, option=orjson.OPT_NON_STR_KEYS)
+    return json.dumps(data, default=_default).encode()
+
+
+def dumps_msgpack(data) -> bytes:
+    return msgpack.packb(data, default=_default, datetime=False)
+
+
+def loads(body: bytes, content_type: str = JSON):
+    """
+    Returns the parsed request body.
+    Raises ValueError if the body is invalid.
+    """
+    if content_type == MSGPACK and msgpack is not None:
+        try:
+            return msgpack.unpackb(body)
+        except Exception as error:
+            raise ValueError(f'Invalid MessagePack body: {error}')
+
+    if orjson is not None:
+        return orjson.loads(body)
+    return json.loads(body)
+
+
+def parse_body(request):
+    return loads(request.body, request.content_type)
+
+
+def negotiate(accept: str) -> str:
+    """
+    Returns the response format for the Accept header.
+    """
+    if msgpack is not None and MSGPACK in accept:
+        return MSGPACK
+    return JSON
+
+
+def current_format() -> str:
+    return _response_format.get()
+
+
+def set_format(response_format: str):
+    return _response_format.set(response_format)
+
+
+def reset_format(token) -> None:
+    _response_format.reset(token)
+
+
+SERIALIZERS = {
+    JSON: dumps_json,
+    MSGPACK: dumps_msgpack,
+}
+
+
+class ApiResponse(HttpResponse):
+    """
+    HttpResponse with the data serialized to the format
+    accepted by the current request, a drop-in replacement
+    for JsonResponse.
+    """
+    def __init__(self, data, safe: bool = True, **kwargs):
+        if safe and not isinstance(data, dict):
+            raise TypeError('In order to allow non-dict objects to be serialized '
+                            'set the safe parameter to False.')
+        response_format = current_format()
+        kwargs.setdefault('content_type', response_format)
+        super().__init__(content=SERIALIZERS[response_format](data), **kwargs)
+        self['Vary'] = 'Accept'
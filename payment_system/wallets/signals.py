@@ -0,0 +1,45 @@
+from django.conf import settings
+from django.core.signals import request_started
+from django.db import connections
+from django.db.backends.signals import connection_created
+from django.db.models.signals import post_save, post_delete
+from django.dispatch import receiver
+from rest_framework.authtoken.models import Token
+
+from wallets.token_cache import token_cache
+
+
+@receiver(post_save, sender=Token)
+@receiver(post_delete, sender=Token)
+def invalidate_token(sender, instance: Token, **kwargs) -> None:
+    """
+    Drops the cached result for the created, rotated or deleted token.
+    """
+    token_cache.invalidate(instance.key)
+
+
+@receiver(connection_created)
+def configure_connection(sender, connection, **kwargs) -> None:
+    """
+    Applies WALLETS_SQLITE_PRAGMAS to the new SQLite connection.
+    """
+    if connection.vendor != 'sqlite':
+        return
+
+    with connection.cursor() as cursor:
+        for name, value in getattr(settings, 'WALLETS_SQLITE_PRAGMAS', {}).items():
+            cursor.execute(f'PRAGMA {name} = {value}')
+
+
+@receiver(request_started)
+def check_connections(**kwargs) -> None:
+    """
+    Closes the persistent connections which are not usable anymore
+    (e.g. closed by the database server), so the request reconnects.
+    """
+    if not getattr(settings, 'WALLETS_DB_HEALTH_CHECKS', False):
+        return
+
+    for connection in connections.all():
+        if connection.connection is not None and not connection.is_usable():
+            connection.close()
@@ -0,0 +1,119 @@
+"""
+Measurement of the startup of a worker.
+
+measure() starts a new interpreter with "-X importtime" for the settings
+module and reports the time of the process start, the imports by module,
+django.setup(), the creation of the WSGI handler, the first request
+and the median of the next requests. The interpreter runs this module,
+which only imports Django when the clock is started.
+"""
+import json
+import os
+import statistics
+import subprocess
+import sys
+import time
+from collections import defaultdict
+
+IMPORT_TIME_PREFIX = 'import time:'
+
+
+def parse_import_times(stderr: str) -> list:
+    """
+    Returns (module, self microseconds, cumulative microseconds)
+    of every module imported, as reported by "-X importtime".
+    """
+    modules = []
+    for line in stderr.splitlines():
+        if not line.startswith(IMPORT_TIME_PREFIX):
+            continue
+        self_us, cumulative_us, name = line[len(IMPORT_TIME_PREFIX):].split('|')
+        if not self_us.strip().isdigit():
+            # the header
+            continue
+        modules.append((name.strip(), int(self_us), int(cumulative_us)))
+    return modules
+
+
+def import_report(modules: list, top: int) -> dict:
+    """
+    Returns the import time in milliseconds by top-level package
+    and the `top` slowest modules including their imports.
+    """
+    packages = defaultdict(int)
+    for name, self_us, _ in modules:
+        packages[name.partition('.')[0]] += self_us
+    slowest = sorted(modules, key=lambda module: module[2], reverse=True)[:top]
+    return {
+        'total_ms': round(sum(packages.values()) / 1000, 1),
+        'packages_ms': {
+            name: round(us / 1000, 1)
+            for name, us in sorted(packages.items(), key=lambda item: item[1], reverse=True)[:top]
+        },
+        'modules_cumulative_ms': {name: round(cumulative_us / 1000, 1)
+                                  for name, _, cumulative_us in slowest},
+    }
+
+
+def measure(settings_module: str, path: str, requests: int = 20, token: str = None,
+            top: int = 15) -> dict:
+    """
+    Returns the startup report of a new worker process
+    with the settings module.
+    """
+    environ = dict(os.environ, DJANGO_SETTINGS_MODULE=settings_module)
+    command = [sys.executable, '-X', 'importtime', '-m', 'wallets.startup',
+               path, str(requests), token or '']
+    started = time.perf_counter()
+    result = subprocess.run(command, env=environ, capture_output=True, text=True,
+                            cwd=os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
+    process_seconds = time.perf_counter() - started
+    if result.returncode:
+        raise RuntimeError(result.stderr.strip().splitlines()[-1])
+
+    report = json.loads(result.stdout)
+    report['process_seconds'] = round(process_seconds, 4)
+    report['imports'] = import_report(parse_import_times(result.stderr), top)
+    return report
+
+
+def _run_worker(path: str, requests: int, token: str) -> dict:
+    started = time.perf_counter()
+    import django
+    from django.conf import settings
+    settings.INSTALLED_APPS  # loads the settings module
+    settings_seconds = time.perf_counter() - started
+
+    started = time.perf_counter()
+    django.setup()
+    setup_seconds = time.perf_counter() - started
+
+    started = time.perf_counter()
+    from django.test import Client
+    client = Client(HTTP_HOST=settings.ALLOWED_HOSTS[0])
+    # the same handler as get_wsgi_application() builds
+    client.handler.load_middleware()
+    handler_seconds = time.perf_counter() - started
+
+    headers = {'HTTP_AUTHORIZATION': f'Token {token}'} if token else {}
+    latencies = []
+    for _ in range(requests + 1):
+        started = time.perf_counter()
+        response = client.get(path, **headers)
+        latencies.append(time.perf_counter() - started)
+
+    return {
+        'settings_seconds': round(settings_seconds, 4),
+        'setup_seconds': round(setup_seconds, 4),
+        'handler_seconds': round(handler_seconds, 4),
+        'apps': len(settings.INSTALLED_APPS),
+        'middleware': len(settings.MIDDLEWARE),
+        'status': response.status_code,
+        'first_request_seconds': round(latencies[0], 4),
+        'request_median_seconds': round(statistics.median(latencies[1:]), 5)
+        if requests else None,
+    }
+
+
+if __name__ == '__main__':
+    print(json.dumps(_run_worker(sys.argv[1], int(sys.argv[2]), sys.argv[3] or None)))
@@ -0,0 +1,171 @@
+"""
+Operation summaries of a wallet by day, week or month.
+
+The counts and totals are aggregated by the database. Periods closed
+before yesterday never change, so they are cached for
+WALLETS_SUMMARY_CACHE_TTL seconds, yesterday is left out because
+a transfer started before midnight may still be committing.
+Only the periods missing in the cache and the ones partly
+in the requested range are queried, by one query.
+
+The keys contain the summary generation of the wallet, which is
+bumped when operations are written into closed periods (imports),
+so the old summaries are not used anymore and expire by themselves.
+A missing generation starts from a random number.
+"""
+import datetime
+import random
+
+from django.conf import settings
+from django.core.cache import caches
+from django.db import transaction
+from django.db.models import Count, Sum, Q
+from django.db.models.functions import Trunc
+
+from wallets.models import Operation, ArchivedOperation
+from wallets.money import ZERO
+
+SUMMARY_CACHE = getattr(settings, 'WALLETS_SUMMARY_CACHE', 'default')
+SUMMARY_CACHE_TTL = getattr(settings, 'WALLETS_SUMMARY_CACHE_TTL', 24 * 60 * 60)
+SUMMARY_MAX_PERIODS = getattr(settings, 'WALLETS_SUMMARY_MAX_PERIODS', 1000)
+
+PERIODS = ('day', 'week', 'month')
+EMPTY = (0, ZERO, 0, ZERO)
+
+
+def period_start(date: datetime.date, period: str) -> datetime.date:
+    if period == 'week':
+        return date - datetime.timedelta(days=date.weekday())
+    if period == 'month':
+        return date.replace(day=1)
+    return date
+
+
+def next_period(start: datetime.date, period: str) -> datetime.date:
+    if period == 'week':
+        return start + datetime.timedelta(days=7)
+    if period == 'month':
+        return (start + datetime.timedelta(days=32)).replace(day=1)
+    return start + datetime.timedelta(days=1)
+
+
+def periods(date_from: datetime.date, date_to: datetime.date, period: str) -> list:
+    """
+    Returns the starts of the periods overlapping the range.
+    Raises ValueError if there are more than WALLETS_SUMMARY_MAX_PERIODS.
+    """
+    starts = []
+    start = period_start(date_from, period)
+    while start <= date_to:
+        if len(starts) == SUMMARY_MAX_PERIODS:
+            raise ValueError('Too many periods')
+        starts.append(start)
+        start = next_period(start, period)
+    return starts
+
+
+def _generation_key(wallet_id: int) -> str:
+    return f'wallets:summary-generation:{wallet_id}'
+
+
+def _cache_key(wallet_id: int, generation: int, period: str, start: datetime.date) -> str:
+    return f'wallets:summary:{wallet_id}:{generation}:{period}:{start.isoformat()}'
+
+
+def get_generation(wallet_id: int) -> int:
+    cache = caches[SUMMARY_CACHE]
+    generation = cache.get(_generation_key(wallet_id))
+    if generation is None:
+        cache.add(_generation_key(wallet_id), random.getrandbits(48), None)
+        generation = cache.get(_generation_key(wallet_id))
+    return generation
+
+
+def forget_summaries(wallet_ids) -> None:
+    """
+    Bumps the summary generations of the wallets when the current
+    transaction is committed, for operations written into closed periods.
+    """
+    wallet_ids = set(wallet_ids)
+
+    def bump():
+        cache = caches[SUMMARY_CACHE]
+        for wallet_id in wallet_ids:
+            try:
+                cache.incr(_generation_key(wallet_id))
+            except ValueError:
+                # not cached, the next generation is random
+                pass
+
+    transaction.on_commit(bump)
+
+
+def aggregate(wallet_id: int, period: str, date_from: datetime.date,
+              date_to: datetime.date) -> dict:
+    """
+    Returns {period start: (deposits, deposits total, withdrawals,
+    withdrawals total)} of the periods having operations in the range,
+    archived ones included.
+    """
+    totals = {}
+    for model in (ArchivedOperation, Operation):
+        rows = model.objects \
+            .filter(wallet_id=wallet_id, date__gte=date_from, date__lte=date_to) \
+            .annotate(start=Trunc('date', period)) \
+            .values('start') \
+            .annotate(deposits=Count('id', filter=Q(name='deposit')),
+                      deposits_total=Sum('amount', filter=Q(name='deposit')),
+                      withdrawals=Count('id', filter=Q(name='withdrawal')),
+                      withdrawals_total=Sum('amount', filter=Q(name='withdrawal'))) \
+            .order_by('start')
+        for row in rows:
+            deposits, deposits_total, withdrawals, withdrawals_total = \
+                totals.get(row['start'], EMPTY)
+            totals[row['start']] = (
+                deposits + row['deposits'],
+                deposits_total + (row['deposits_total'] or ZERO),
+                withdrawals + row['withdrawals'],
+                withdrawals_total + (row['withdrawals_total'] or ZERO),
+            )
+    return totals
+
+
+def summary(wallet_id: int, period: str, date_from: datetime.date,
+            date_to: datetime.date) -> list:
+    """
+    Returns the counts and totals of deposits and withdrawals
+    of every period overlapping the range, both days included.
+    The first and the last periods only count the days in the range.
+    """
+    starts = periods(date_from, date_to, period)
+    yesterday = datetime.date.today() - datetime.timedelta(days=1)
+    generation = get_generation(wallet_id)
+    cacheable = {}
+    for start in starts:
+        last = next_period(start, period) - datetime.timedelta(days=1)
+        if start >= date_from and last <= date_to and last < yesterday:
+            cacheable[_cache_key(wallet_id, generation, period, start)] = start
+    cache = caches[SUMMARY_CACHE]
+    cached = {cacheable[key]: value for key, value in cache.get_many(list(cacheable)).items()}
+
+    missing = [start for start in starts if start not in cached]
+    if missing:
+        computed = aggregate(
+            wallet_id, period, max(missing[0], date_from),
+            min(next_period(missing[-1], period) - datetime.timedelta(days=1), date_to),
+        )
+        cache.set_many({
+            key: computed.get(start, EMPTY) for key, start in cacheable.items()
+            if start not in cached
+        }, SUMMARY_CACHE_TTL)
+        cached.update((start, computed.get(start, EMPTY)) for start in missing)
+
+    result = []
+    for start in starts:
+        deposits, deposits_total, withdrawals, withdrawals_total = cached[start]
+        result.append({
+            'period_start': start,
+            'deposits': {'count': deposits, 'total': deposits_total},
+            'withdrawals': {'count': withdrawals, 'total': withdrawals_total},
+        })
+    return result
@@ -0,0 +1,138 @@
+import datetime
+import io
+import json
+
+from django.contrib.auth.models import User
+from django.core.cache import caches
+from django.core.management import call_command
+from django.db import connection
+from django.test import TestCase
+from django.test.utils import CaptureQueriesContext
+from rest_framework import status
+from rest_framework.authtoken.models import Token
+
+from wallets.archive import archive_operations
+from wallets.checkpoints import rebuild_checkpoints
+from wallets.importing import import_operations
+from wallets.models import Wallet, Operation, ArchivedOperation, OperationArchive
+from wallets.money import Money
+from wallets.reconciliation import reconcile
+from wallets.response_cache import RESPONSE_CACHE
+from wallets.summaries import aggregate
+
+
+class ArchiveTestCase(TestCase):
+    def setUp(self):
+        self.user = User.objects.create_user(username='test', password='test')
+        self.token = Token.objects.create(user=self.user)
+        self.today = datetime.date.today()
+        self.wallets = [Wallet.objects.create(name=f'wallet {i}', client_firstname='firstname',
+                                              client_surname='surname') for i in range(2)]
+        for wallet in self.wallets:
+            for days in (400, 400, 300, 200, 10, 0):
+                Operation.objects.create(name='deposit', wallet=wallet, amount=Money(100),
+                                         date=self.today - datetime.timedelta(days=days))
+            Operation.objects.create(name='withdrawal', wallet=wallet, amount=Money(50),
+                                     date=self.today - datetime.timedelta(days=300))
+        Wallet.objects.update(balance=Money(550))
+        self.cutoff = self.today - datetime.timedelta(days=100)
+
+    def get(self, url: str, params: dict):
+        response = self.client.get(url, params, HTTP_AUTHORIZATION=f'Token {self.token}')
+        self.assertEqual(status.HTTP_200_OK, response.status_code)
+        return response
+
+    def read_history(self, wallet_id: int, operation: str = '', **params) -> list:
+        """
+        Returns the ids of the operations read page by page.
+        """
+        ids = []
+        params['page_size'] = 2
+        while True:
+            response = self.get(f'/operations/{wallet_id}/{operation}', params)
+            ids += [row['id'] for row in response.json()]
+            if not response.has_header('X-Next-Cursor'):
+                return ids
+            params['cursor'] = response['X-Next-Cursor']
+
+    def test_archive_operations(self):
+        wallet_id = self.wallets[0].id
+        expected = {filter_: self.read_history(wallet_id, filter=filter_)
+                    for filter_ in ('date', '-date')}
+
+        self.assertEqual(10, archive_operations(self.cutoff, batch_size=3, pause=0))
+        self.assertEqual(4, Operation.objects.count())
+        self.assertFalse(Operation.objects.filter(date__lt=self.cutoff).exists())
+        state = OperationArchive.objects.get()
+        self.assertEqual((self.cutoff, True, 10), (state.cutoff, state.complete, state.operations))
+
+        # the pages cross from one table to the other in the same order
+        for filter_, ids in expected.items():
+            with self.subTest(filter=filter_):
+                self.assertEqual(ids, self.read_history(wallet_id, filter=filter_))
+        # the archive is not read by the pages filled by the recent operations,
+        # the query of the next page row included
+        caches[RESPONSE_CACHE].clear()
+        with CaptureQueriesContext(connection) as queries:
+            response = self.get(f'/operations/{wallet_id}/', {'filter': '-date', 'page_size': 1})
+        self.assertEqual([operation.id for operation in Operation.objects.filter(wallet=wallet_id)
+                          .order_by('-date', '-id')[:1]], [row['id'] for row in response.json()])
+        self.assertFalse([query for query in queries.captured_queries
+                          if ArchivedOperation._meta.db_table in query['sql']])
+        response = self.get(f'/operations/{wallet_id}/withdrawal/', {'count': 'true'})
+        self.assertEqual('1', response['X-Total-Count'])
+        self.assertEqual(['0.50'], [row['amount'] for row in response.json()])
+        # the legacy page continues in the second table
+        self.assertEqual(expected['-date'][4:6], [row['id'] for row in self.get(
+            f'/operations/{wallet_id}/', {'filter': '-date', 'page_size': 2, 'page': 3}
+        ).json()])
+
+        response = self.get(f'/operations/{wallet_id}/export/', {'filter': '-date'})
+        self.assertEqual(expected['-date'], [json.loads(line)['id'] for line in
+                                             b''.join(response.streaming_content).splitlines()])
+
+        # the cutoff does not move back
+        self.assertEqual(0, archive_operations(self.cutoff - datetime.timedelta(days=1)))
+        self.assertEqual(self.cutoff, OperationArchive.objects.get().cutoff)
+
+    def test_archived_history(self):
+        wallet_id = self.wallets[1].id
+        month = aggregate(wallet_id, 'month', self.today - datetime.timedelta(days=500),
+                          self.today)
+        archive_operations(self.cutoff, pause=0)
+
+        self.assertEqual(month, aggregate(wallet_id, 'month',
+                                          self.today - datetime.timedelta(days=500), self.today))
+        self.assertEqual([], [mismatch for _, _, mismatches in reconcile()
+                              for mismatch in mismatches])
+        self.assertEqual(10, rebuild_checkpoints([wallet.id for wallet in self.wallets]))
+
+        Wallet.objects.get(pk=wallet_id).delete()
+        self.assertFalse(ArchivedOperation.objects.filter(wallet=wallet_id).exists())
+
+    def test_import_before_cutoff(self):
+        first, second = (wallet.id for wallet in self.wallets)
+        archive_operations(self.cutoff, pause=0)
+        old = self.today - datetime.timedelta(days=365)
+        lines = ['wallet_id,name,amount,date',
+                 f'{first},deposit,1.00,{old}',
+                 f'{first},deposit,2.00,{self.today}']
+        import_operations(io.BytesIO('\n'.join(lines).encode()), 'csv', 'ledger')
+        self.assertEqual([Money(100)], list(ArchivedOperation.objects.filter(
+            wallet=first, date=old).values_list('amount', flat=True)))
+        self.assertEqual(3, Operation.objects.filter(wallet=first).count())
+
+        # an interrupted run is completed for the wallets of the import
+        Operation.objects.create(name='deposit', wallet_id=second, amount=Money(100), date=old)
+        OperationArchive.objects.update(complete=False)
+        lines[1] = f'{second},deposit,1.00,{old}'
+        import_operations(io.BytesIO('\n'.join(lines[:2]).encode()), 'csv', 'second')
+        self.assertFalse(Operation.objects.filter(wallet=second, date__lt=self.cutoff).exists())
+        self.assertEqual(7, ArchivedOperation.objects.filter(wallet=second).count())
+        self.assertEqual(13, OperationArchive.objects.get().operations)
+
+    def test_command(self):
+        out = io.StringIO()
+        call_command('archive_operations', days=100, batch_size=5, stdout=out)
+        self.assertIn(f'10 operations dated before {self.cutoff} archived', out.getvalue())
+        self.assertEqual(10, ArchivedOperation.objects.count())
@@ -0,0 +1,67 @@
+import json
+from decimal import Decimal
+
+from asgiref.sync import async_to_sync
+from django.contrib.auth.models import User
+from django.test import TransactionTestCase, AsyncRequestFactory
+from rest_framework import status
+from rest_framework.authtoken.models import Token
+
+from wallets.async_views import see_wallets_or_create_async, crud_for_the_wallet_async, \
+    operations_async
+from wallets.models import Wallet, Operation
+
+
+class AsyncViewsTestCase(TransactionTestCase):
+    def setUp(self):
+        self.factory = AsyncRequestFactory()
+        self.user = User.objects.create_user(username='test', password='test')
+        self.token = Token.objects.create(user=self.user)
+        self.wallet = Wallet.objects.create(name='wallet 1',
+                                            client_firstname='firstname 1',
+                                            client_surname='surname 1',
+                                            balance=Decimal("500.00"))
+        Operation.objects.create(name='deposit', wallet=self.wallet,
+                                 amount=Decimal("500.00"))
+        self.invalid_id = 300
+
+    def get(self, view, url: str, *args, token: str = None):
+        request = self.factory.get(url, AUTHORIZATION=f'Token {token or self.token}')
+        return async_to_sync(view)(request, *args)
+
+    def test_read_without_token(self):
+        response = self.get(see_wallets_or_create_async, '/wallets/', token='invalid')
+        self.assertEqual(status.HTTP_401_UNAUTHORIZED, response.status_code)
+
+    def test_read_wallets(self):
+        response = self.get(see_wallets_or_create_async, '/wallets/')
+        self.assertEqual(status.HTTP_200_OK, response.status_code)
+        self.assertEqual(1, len(json.loads(response.content)))
+
+    def test_read_the_wallet(self):
+        test_cases = (
+            (self.wallet.id, status.HTTP_200_OK),
+            (self.invalid_id, status.HTTP_400_BAD_REQUEST),
+        )
+        for wallet_id, expected in test_cases:
+            with self.subTest(i=wallet_id):
+                response = self.get(crud_for_the_wallet_async, f'/wallets/{wallet_id}/',
+                                    str(wallet_id))
+                self.assertEqual(expected, response.status_code)
+
+    def test_get_transactions(self):
+        response = self.get(operations_async, f'/operations/{self.wallet.id}/',
+                            str(self.wallet.id), 'deposit')
+        self.assertEqual(status.HTTP_200_OK, response.status_code)
+        self.assertEqual(["500.00"], [op['amount'] for op in json.loads(response.content)])
+
+    def test_update_the_wallet(self):
+        request = self.factory.post(f'/wallets/{self.wallet.id}/',
+                                    data={'client_firstname': 'new firstname',
+                                          'client_surname': 'new surname'},
+                                    content_type='application/json',
+                                    AUTHORIZATION=f'Token {self.token}')
+        response = async_to_sync(crud_for_the_wallet_async)(request, str(self.wallet.id))
+        self.assertEqual(status.HTTP_200_OK, response.status_code)
+        self.wallet.refresh_from_db()
+        self.assertEqual('new surname', self.wallet.client_surname)
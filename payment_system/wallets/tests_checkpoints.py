@@ -0,0 +1,131 @@
+import datetime
+import io
+from decimal import Decimal
+
+from django.contrib.auth.models import User
+from django.core.management import call_command
+from django.db import connection
+from django.db.migrations.executor import MigrationExecutor
+from django.test import TestCase, TransactionTestCase
+from rest_framework import status
+from rest_framework.authtoken.models import Token
+
+from wallets.checkpoints import balance_as_of
+from wallets.models import Wallet, Operation, BalanceCheckpoint
+from wallets.money import Money
+from wallets.views import transfer_money, deposit_money
+
+
+class CheckpointsTestCase(TestCase):
+    def setUp(self):
+        self.user = User.objects.create_user(username='test', password='test')
+        self.token = Token.objects.create(user=self.user)
+        self.wallet1 = Wallet.objects.create(name='wallet 1',
+                                             client_firstname='firstname 1',
+                                             client_surname='surname 1',
+                                             balance=Decimal("500.00"))
+        self.wallet2 = Wallet.objects.create(name='wallet 2',
+                                             client_firstname='firstname 2',
+                                             client_surname='surname 2')
+        self.today = datetime.date.today()
+        self.yesterday = self.today - datetime.timedelta(days=1)
+
+    def get_checkpoints(self) -> list:
+        return list(BalanceCheckpoint.objects.order_by('wallet', 'date')
+                    .values_list('wallet', 'date', 'balance', 'deposits', 'withdrawals'))
+
+    def test_checkpoints_are_maintained(self):
+        deposit_money(self.wallet2.id, Money.parse("50.00"))
+        transfer_money(self.wallet1.id, self.wallet2.id, Money.parse("100.00"))
+        self.assertEqual([
+            (self.wallet1.id, self.today, Decimal("400.00"), Decimal("0.00"), Decimal("100.00")),
+            (self.wallet2.id, self.today, Decimal("150.00"), Decimal("150.00"), Decimal("0.00")),
+        ], self.get_checkpoints())
+
+    def test_rebuild_checkpoints(self):
+        deposit_money(self.wallet2.id, Money.parse("50.00"))
+        transfer_money(self.wallet1.id, self.wallet2.id, Money.parse("100.00"))
+        transfer_money(self.wallet2.id, self.wallet1.id, Money.parse("30.00"))
+        Operation.objects.filter(wallet=self.wallet2, name='deposit') \
+            .filter(amount=Decimal("50.00")).update(date=self.yesterday)
+
+        BalanceCheckpoint.objects.all().delete()
+        call_command('rebuild_checkpoints', stdout=io.StringIO())
+        self.assertEqual([
+            (self.wallet1.id, self.today, Decimal("430.00"), Decimal("30.00"), Decimal("100.00")),
+            (self.wallet2.id, self.yesterday, Decimal("50.00"), Decimal("50.00"), Decimal("0.00")),
+            (self.wallet2.id, self.today, Decimal("120.00"), Decimal("100.00"), Decimal("30.00")),
+        ], self.get_checkpoints())
+
+    def test_balance(self):
+        transfer_money(self.wallet1.id, self.wallet2.id, Money.parse("100.00"))
+        test_cases = (
+            (self.yesterday, "500.00"),
+            (self.today, "400.00"),
+        )
+        url = f"/wallets/{self.wallet1.id}/balance/"
+        for date, expected in test_cases:
+            with self.subTest(i=date):
+                response = self.client.get(url, {'date': date.isoformat()},
+                                           HTTP_AUTHORIZATION=f'Token {self.token}')
+                self.assertEqual(status.HTTP_200_OK, response.status_code)
+                self.assertEqual(expected, response.json()['balance'])
+
+    def test_statement(self):
+        transfer_money(self.wallet1.id, self.wallet2.id, Money.parse("100.00"))
+        deposit_money(self.wallet1.id, Money.parse("20.00"))
+        url = f"/wallets/{self.wallet1.id}/statement/"
+        response = self.client.get(url, {'from': self.yesterday.isoformat(),
+                                         'to': self.today.isoformat()},
+                                   HTTP_AUTHORIZATION=f'Token {self.token}')
+        self.assertEqual(status.HTTP_200_OK, response.status_code)
+        data = response.json()
+        self.assertEqual("500.00", data['opening_balance'])
+        self.assertEqual("420.00", data['closing_balance'])
+        self.assertEqual("20.00", data['deposits'])
+        self.assertEqual("100.00", data['withdrawals'])
+
+    def test_invalid_statement(self):
+        test_cases = (
+            (f"/wallets/{self.wallet1.id}/statement/", {'from': 'yesterday'}),
+            (f"/wallets/{self.wallet1.id}/statement/", {'from': self.today.isoformat(),
+                                                        'to': self.yesterday.isoformat()}),
+            ("/wallets/300/statement/", {}),
+        )
+        for url, params in test_cases:
+            with self.subTest(i=(url, params)):
+                response = self.client.get(url, params,
+                                           HTTP_AUTHORIZATION=f'Token {self.token}')
+                self.assertEqual(status.HTTP_400_BAD_REQUEST, response.status_code)
+
+
+class CheckpointsMigrationTestCase(TransactionTestCase):
+    def test_existing_operations_are_backfilled(self):
+        executor = MigrationExecutor(connection)
+        executor.migrate([('wallets', '0014_operation_history_indexes')])
+        apps = executor.loader.project_state(
+            [('wallets', '0014_operation_history_indexes')]).apps
+        wallet = apps.get_model('wallets', 'Wallet').objects.create(
+            name='wallet', client_firstname='firstname', client_surname='surname',
+            balance=Decimal('70.00'))
+        Operation = apps.get_model('wallets', 'Operation')
+        today = datetime.date.today()
+        yesterday = today - datetime.timedelta(days=1)
+        Operation.objects.bulk_create([
+            Operation(name='deposit', wallet=wallet, amount=Decimal('100.00'), date=yesterday),
+            Operation(name='withdrawal', wallet=wallet, amount=Decimal('40.00'), date=today),
+            Operation(name='deposit', wallet=wallet, amount=Decimal('10.00'), date=today),
+        ])
+
+        executor = MigrationExecutor(connection)
+        executor.migrate([('wallets', '0015_balance_checkpoints')])
+        apps = executor.loader.project_state([('wallets', '0015_balance_checkpoints')]).apps
+        self.assertEqual([
+            (yesterday, Decimal('100.00'), Decimal('100.00'), Decimal('0.00')),
+            (today, Decimal('70.00'), Decimal('10.00'), Decimal('40.00')),
+        ], list(apps.get_model('wallets', 'BalanceCheckpoint').objects.order_by('date')
+                .values_list('date', 'balance', 'deposits', 'withdrawals')))
+
+        executor = MigrationExecutor(connection)
+        executor.migrate(executor.loader.graph.leaf_nodes())
+        self.assertEqual(Money(10000), balance_as_of(Wallet.objects.get(), yesterday))
@@ -61,6 +61,19 @@ class WalletCRUDTestCase(TestCase):
                                    content_type='application/json')
         self.assertEqual(status.HTTP_200_OK, response.status_code)
 
+    def test_read_wallets_pages(self):
+        url = '/wallets/'
+        response = self.client.get(url, {'page_size': 1},
+                                   HTTP_AUTHORIZATION=f'Token {self.token}')
+        self.assertEqual([self.wallet_1.id], [w['id'] for w in response.json()])
+        self.assertFalse(response.has_header('X-Total-Count'))
+
+        response = self.client.get(url, {'page_size': 1,
+                                         'cursor': response['X-Next-Cursor']},
+                                   HTTP_AUTHORIZATION=f'Token {self.token}')
+        self.assertEqual([self.wallet_2.id], [w['id'] for w in response.json()])
+        self.assertFalse(response.has_header('X-Next-Cursor'))
+
     def test_read_the_wallet(self):
         url = f"/wallets/{self.wallet_1.id}/"
         response = self.client.get(url,
@@ -0,0 +1,52 @@
+from pathlib import Path
+from unittest import mock
+
+from django.db import connection
+from django.test import TestCase, override_settings
+
+from payment_system.db_profile import databases, sqlite_pragmas
+from wallets.signals import check_connections
+
+
+class DatabaseProfileTestCase(TestCase):
+    def test_pragmas_are_applied(self):
+        with connection.cursor() as cursor:
+            cursor.execute('PRAGMA busy_timeout')
+            self.assertEqual(5000, cursor.fetchone()[0])
+            cursor.execute('PRAGMA cache_size')
+            self.assertEqual(-64 * 1024, cursor.fetchone()[0])
+
+    def test_sqlite_pragmas(self):
+        self.assertEqual('WAL', sqlite_pragmas({})['journal_mode'])
+        self.assertEqual({'synchronous': 'FULL', 'cache_size': '-2000'},
+                         sqlite_pragmas({'WALLETS_SQLITE_PRAGMAS': 'synchronous=FULL, cache_size=-2000'}))
+        self.assertEqual({}, sqlite_pragmas({'WALLETS_SQLITE_PRAGMAS': ''}))
+        with self.assertRaises(ValueError):
+            sqlite_pragmas({'WALLETS_SQLITE_PRAGMAS': 'synchronous=OFF; DROP TABLE wallets_wallet'})
+
+    def test_databases(self):
+        database = databases(Path('/app'), {})['default']
+        self.assertEqual('django.db.backends.sqlite3', database['ENGINE'])
+        self.assertEqual(Path('/app/db.sqlite3'), database['NAME'])
+        self.assertTrue(database['ATOMIC_REQUESTS'])
+        self.assertEqual(60, database['CONN_MAX_AGE'])
+
+        database = databases(Path('/app'), {
+            'WALLETS_DB_ENGINE': 'postgresql', 'WALLETS_DB_HOST': 'db',
+            'WALLETS_DB_CONN_MAX_AGE': '0',
+        })['default']
+        self.assertEqual('django.db.backends.postgresql', database['ENGINE'])
+        self.assertEqual('db', database['HOST'])
+        self.assertEqual(0, database['CONN_MAX_AGE'])
+
+        with self.assertRaises(ValueError):
+            databases(Path('/app'), {'WALLETS_DB_ENGINE': 'oracle'})
+
+    @override_settings(WALLETS_DB_HEALTH_CHECKS=True)
+    def test_broken_connection_is_closed(self):
+        broken = mock.Mock(connection=object())
+        broken.is_usable.return_value = False
+        with mock.patch('wallets.signals.connections') as connections:
+            connections.all.return_value = [broken]
+            check_connections()
+        broken.close.assert_called_once_with()
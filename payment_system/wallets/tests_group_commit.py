@@ -0,0 +1,175 @@
+import threading
+from concurrent.futures import Future
+from decimal import Decimal
+
+from django.contrib.auth.models import User
+from django.db import connection
+from django.test import TransactionTestCase, override_settings
+from rest_framework import status
+from rest_framework.authtoken.models import Token
+
+from wallets.group_commit import GroupCommitter
+from wallets.models import Wallet, Operation
+from wallets.money import Money
+from wallets.retries import TransactionAborted
+from wallets.views import transfer_money_batch, group_committer
+
+
+class GroupCommitTestCase(TransactionTestCase):
+    def setUp(self):
+        self.wallet_1 = Wallet.objects.create(name='wallet 1', client_firstname='firstname 1',
+                                              client_surname='surname 1', balance=100)
+        self.wallet_2 = Wallet.objects.create(name='wallet 2', client_firstname='firstname 2',
+                                              client_surname='surname 2')
+
+    def submit_concurrently(self, committer, transfers: list) -> list:
+        results = [None] * len(transfers)
+        barrier = threading.Barrier(len(transfers))
+
+        def submit(i):
+            barrier.wait()
+            try:
+                results[i] = committer.submit(*transfers[i])
+            except ValueError as error:
+                results[i] = error
+            finally:
+                connection.close()
+
+        threads = [threading.Thread(target=submit, args=(i,)) for i in range(len(transfers))]
+        for thread in threads:
+            thread.start()
+        for thread in threads:
+            thread.join()
+        committer.stop()
+        return results
+
+    def test_transfers_are_grouped(self):
+        groups = []
+
+        def apply(transfers):
+            groups.append(len(transfers))
+            return transfer_money_batch(transfers)
+
+        committer = GroupCommitter(apply, max_size=64, max_wait=0.5)
+        transfers = [(self.wallet_1.id, self.wallet_2.id, Money.parse("30.00"))] * 4 + \
+            [(None, self.wallet_2.id, Money.parse("5.00"))] * 2
+        results = self.submit_concurrently(committer, transfers)
+
+        self.assertEqual(len(transfers), sum(groups))
+        self.assertLess(len(groups), len(transfers))
+        self.assertEqual(3, results[:4].count(status.HTTP_200_OK))
+        self.assertEqual(1, results[:4].count(status.HTTP_400_BAD_REQUEST))
+        self.assertEqual([status.HTTP_200_OK] * 2, results[4:])
+        self.wallet_1.refresh_from_db()
+        self.wallet_2.refresh_from_db()
+        self.assertEqual(Decimal("10.00"), self.wallet_1.balance)
+        self.assertEqual(Decimal("100.00"), self.wallet_2.balance)
+        self.assertEqual(3, Operation.objects.filter(name='withdrawal').count())
+
+    def test_failed_group_is_applied_one_by_one(self):
+        def apply(transfers):
+            if any(amount.cents < 0 for _, _, amount in transfers):
+                raise ValueError
+            return transfer_money_batch(transfers)
+
+        committer = GroupCommitter(apply, max_size=64, max_wait=0.5)
+        transfers = [(None, self.wallet_2.id, Money.parse("5.00")),
+                     (None, self.wallet_2.id, Money.parse("-5.00"))]
+        results = self.submit_concurrently(committer, transfers)
+        self.assertEqual(status.HTTP_200_OK, results[0])
+        self.assertIsInstance(results[1], ValueError)
+        self.wallet_2.refresh_from_db()
+        self.assertEqual(Decimal("5.00"), self.wallet_2.balance)
+
+    def test_aborted_transfer_fails_the_rest_of_the_group(self):
+        applied = []
+
+        def apply(transfers):
+            applied.append(len(transfers))
+            if all(amount.cents == 200 for _, _, amount in transfers):
+                raise TransactionAborted('transfer_money_batch')
+            if len(transfers) > 1:
+                raise ValueError
+            return transfer_money_batch(transfers)
+
+        group = [((None, self.wallet_2.id, Money.parse(amount)), Future())
+                 for amount in ("1.00", "2.00", "3.00")]
+        GroupCommitter(apply, max_size=64, max_wait=0)._commit(group)
+        # the transfer after the aborted one is not applied one by one
+        self.assertEqual([3, 1, 1], applied)
+        self.assertEqual(status.HTTP_200_OK, group[0][1].result())
+        for _, future in group[1:]:
+            self.assertIsInstance(future.exception(), TransactionAborted)
+
+        # a group aborted by lock conflicts is not applied one by one
+        applied.clear()
+        group = [((None, self.wallet_2.id, Money.parse("2.00")), Future()) for _ in range(3)]
+        GroupCommitter(apply, max_size=64, max_wait=0)._commit(group)
+        self.assertEqual([3], applied)
+        for _, future in group:
+            self.assertIsInstance(future.exception(), TransactionAborted)
+
+    def test_timeout(self):
+        started, release = threading.Event(), threading.Event()
+
+        def apply(transfers):
+            started.set()
+            release.wait()
+            return transfer_money_batch(transfers)
+
+        def submit():
+            try:
+                committer.submit(None, self.wallet_2.id, Money.parse("1.00"))
+            finally:
+                connection.close()
+
+        committer = GroupCommitter(apply, max_size=1, max_wait=0, timeout=0.1)
+        first = threading.Thread(target=submit)
+        first.start()
+        started.wait()
+        # the writer is busy, the queued transfer is dropped
+        with self.assertRaises(TransactionAborted):
+            committer.submit(None, self.wallet_2.id, Money.parse("2.00"))
+        release.set()
+        first.join()
+        committer.stop()
+        self.wallet_2.refresh_from_db()
+        self.assertEqual(Decimal("1.00"), self.wallet_2.balance)
+
+    def test_dead_writer_is_restarted(self):
+        applied = []
+
+        def apply(transfers):
+            if not applied:
+                applied.append(transfers)
+                raise SystemExit
+            return transfer_money_batch(transfers)
+
+        committer = GroupCommitter(apply, max_size=64, max_wait=0, timeout=5)
+        with self.assertRaises(TransactionAborted):
+            committer.submit(None, self.wallet_2.id, Money.parse("1.00"))
+        committer._thread.join()
+        self.assertEqual(status.HTTP_200_OK,
+                         committer.submit(None, self.wallet_2.id, Money.parse("2.00")))
+        committer.stop()
+        self.wallet_2.refresh_from_db()
+        self.assertEqual(Decimal("2.00"), self.wallet_2.balance)
+
+    @override_settings(WALLETS_GROUP_COMMIT=True)
+    def test_views(self):
+        token = Token.objects.create(user=User.objects.create_user(username='test'))
+        response = self.client.post(f'/wallets/{self.wallet_1.id}/withdrawals/{self.wallet_2.id}/',
+                                    data={"amount": 60}, HTTP_AUTHORIZATION=f'Token {token}',
+                                    content_type='application/json')
+        self.assertEqual(status.HTTP_200_OK, response.status_code)
+        response = self.client.post(f'/wallets/{self.wallet_1.id}/withdrawals/{self.wallet_2.id}/',
+                                    data={"amount": 60}, HTTP_AUTHORIZATION=f'Token {token}',
+                                    content_type='application/json')
+        self.assertEqual(status.HTTP_400_BAD_REQUEST, response.status_code)
+        response = self.client.post(f'/wallets/{self.wallet_1.id}/deposits/',
+                                    data={"amount": 5}, HTTP_AUTHORIZATION=f'Token {token}',
+                                    content_type='application/json')
+        self.assertEqual(status.HTTP_200_OK, response.status_code)
+        group_committer.stop()
+        self.wallet_1.refresh_from_db()
+        self.assertEqual(Decimal("45.00"), self.wallet_1.balance)
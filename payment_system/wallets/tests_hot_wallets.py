@@ -0,0 +1,103 @@
+import datetime
+from decimal import Decimal
+from unittest import mock
+
+from django.contrib.auth.models import User
+from django.db.models import F
+from django.test import TestCase
+from rest_framework import status
+from rest_framework.authtoken.models import Token
+
+from wallets.balances import credit, sweep
+from wallets.checkpoints import balance_as_of
+from wallets.models import Wallet, WalletSlot
+from wallets.money import Money
+from wallets.views import set_hot_mode, deposit_money, transfer_money, transfer_money_batch
+
+
+class HotWalletTestCase(TestCase):
+    def setUp(self):
+        self.user = User.objects.create_user(username='test', password='test')
+        self.token = Token.objects.create(user=self.user)
+        self.hot = Wallet.objects.create(name='wallet 1', client_firstname='firstname 1',
+                                         client_surname='surname 1',
+                                         balance=Decimal("100.00"))
+        self.wallet = Wallet.objects.create(name='wallet 2', client_firstname='firstname 2',
+                                            client_surname='surname 2',
+                                            balance=Decimal("100.00"))
+        set_hot_mode(self.hot.id, 4)
+
+    def get_balance(self) -> Decimal:
+        response = self.client.get(f'/wallets/{self.hot.id}/',
+                                   HTTP_AUTHORIZATION=f'Token {self.token}')
+        return Decimal(response.json()[0]['balance'])
+
+    def test_deposits_go_to_slots(self):
+        for _ in range(10):
+            deposit_money(self.hot.id, Money.parse("10.00"))
+        self.hot.refresh_from_db()
+        self.assertEqual(Decimal("100.00"), self.hot.balance)
+        self.assertEqual(4, WalletSlot.objects.filter(wallet=self.hot).count())
+        self.assertEqual(Decimal("200.00"), self.get_balance())
+
+    def test_withdrawal_uses_all_slots(self):
+        for _ in range(10):
+            deposit_money(self.hot.id, Money.parse("10.00"))
+        transfer_money(self.hot.id, self.wallet.id, Money.parse("150.00"))
+        transfer_money(self.hot.id, self.wallet.id, Money.parse("50.00"))
+        self.assertEqual(Decimal("0.00"), self.get_balance())
+        with self.assertRaises(ValueError):
+            transfer_money(self.hot.id, self.wallet.id, Money.parse("0.01"))
+
+    def test_batch_withdrawal(self):
+        for _ in range(10):
+            deposit_money(self.hot.id, Money.parse("10.00"))
+        results = transfer_money_batch([
+            (self.hot.id, self.wallet.id, Money.parse("200.00")),
+            (self.hot.id, self.wallet.id, Money.parse("0.01")),
+        ])
+        self.assertEqual([status.HTTP_200_OK, status.HTTP_400_BAD_REQUEST], results)
+        self.assertEqual(Decimal("0.00"), self.get_balance())
+
+    def test_balance_as_of(self):
+        for _ in range(10):
+            deposit_money(self.hot.id, Money.parse("10.00"))
+        transfer_money(self.hot.id, self.wallet.id, Money.parse("150.00"))
+        self.hot.refresh_from_db()
+        today = datetime.date.today()
+        self.assertEqual(Decimal("50.00"), balance_as_of(self.hot, today))
+        self.assertEqual(Decimal("100.00"),
+                         balance_as_of(self.hot, today - datetime.timedelta(days=1)))
+
+    def test_hot_mode_off(self):
+        for _ in range(10):
+            deposit_money(self.hot.id, Money.parse("10.00"))
+        set_hot_mode(self.hot.id, 0)
+        self.hot.refresh_from_db()
+        self.assertEqual(Decimal("200.00"), self.hot.balance)
+        self.assertFalse(WalletSlot.objects.filter(wallet=self.hot).exists())
+
+    def test_credit_to_removed_slot(self):
+        # the slots removed by set_hot_mode after credit read the slot count
+        WalletSlot.objects.filter(wallet=self.hot).delete()
+        self.assertEqual(0, credit(self.hot.id, Money.parse("10.00")))
+        self.hot.refresh_from_db()
+        self.assertEqual(Decimal("110.00"), self.hot.balance)
+
+    def test_credit_between_sweep_and_delete(self):
+        def sweep_and_credit(wallet_ids, checkpoints):
+            moved = sweep(wallet_ids, checkpoints)
+            WalletSlot.objects.filter(wallet=self.hot, slot=4) \
+                .update(balance=F('balance') + 1000)
+            return moved
+
+        deposit_money(self.hot.id, Money.parse("10.00"))
+        with mock.patch('wallets.views.sweep', sweep_and_credit):
+            set_hot_mode(self.hot.id, 2)
+        # the slot holding the credit is kept until the next sweep
+        self.assertEqual(Decimal("120.00"), self.get_balance())
+        self.assertEqual([1, 2, 4], list(WalletSlot.objects.filter(wallet=self.hot)
+                                         .order_by('slot').values_list('slot', flat=True)))
+        set_hot_mode(self.hot.id, 4)
+        self.assertEqual(Decimal("120.00"), self.get_balance())
+        self.assertEqual(4, WalletSlot.objects.filter(wallet=self.hot).count())
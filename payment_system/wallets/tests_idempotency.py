@@ -0,0 +1,89 @@
+from decimal import Decimal
+
+from django.contrib.auth.models import User
+from django.core.cache import caches
+from django.test import TestCase
+from rest_framework import status
+from rest_framework.authtoken.models import Token
+
+from wallets.idempotency import IDEMPOTENCY_CACHE, cache_key, request_hash
+from wallets.models import Wallet, Operation
+
+
+class IdempotencyTestCase(TestCase):
+    def setUp(self):
+        caches[IDEMPOTENCY_CACHE].clear()
+        self.user = User.objects.create_user(username='test', password='test')
+        self.token = Token.objects.create(user=self.user)
+        self.wallet_1 = Wallet.objects.create(name='wallet 1', client_firstname='firstname 1',
+                                              client_surname='surname 1', balance=100)
+        self.wallet_2 = Wallet.objects.create(name='wallet 2', client_firstname='firstname 2',
+                                              client_surname='surname 2')
+
+    def post(self, url, amount, key, token=None):
+        return self.client.post(url, data={"amount": amount},
+                                HTTP_AUTHORIZATION=f'Token {token or self.token}',
+                                HTTP_IDEMPOTENCY_KEY=key, content_type='application/json')
+
+    def test_deposit_is_replayed(self):
+        url = f"/wallets/{self.wallet_2.id}/deposits/"
+        response = self.post(url, 10, 'key-1')
+        self.assertEqual(status.HTTP_200_OK, response.status_code)
+        with self.assertNumQueries(0):
+            response = self.post(url, 10, 'key-1')
+        self.assertEqual(status.HTTP_200_OK, response.status_code)
+        self.assertEqual('true', response['Idempotent-Replayed'])
+        self.assertEqual('Accept', response['Vary'])
+        self.wallet_2.refresh_from_db()
+        self.assertEqual(Decimal('10'), self.wallet_2.balance)
+        self.assertEqual(1, Operation.objects.filter(wallet=self.wallet_2).count())
+
+    def test_withdrawal_is_replayed(self):
+        url = f"/wallets/{self.wallet_1.id}/withdrawals/{self.wallet_2.id}/"
+        self.post(url, 60, 'key-1')
+        response = self.post(url, 60, 'key-1')
+        self.assertEqual(status.HTTP_200_OK, response.status_code)
+        self.wallet_1.refresh_from_db()
+        self.assertEqual(Decimal('40'), self.wallet_1.balance)
+
+    def test_failed_request_is_replayed(self):
+        url = f"/wallets/{self.wallet_1.id}/withdrawals/{self.wallet_2.id}/"
+        self.post(url, 200, 'key-1')
+        Wallet.objects.filter(id=self.wallet_1.id).update(balance=1000)
+        response = self.post(url, 200, 'key-1')
+        self.assertEqual(status.HTTP_400_BAD_REQUEST, response.status_code)
+        self.assertEqual('true', response['Idempotent-Replayed'])
+
+    def test_key_reused_for_another_request(self):
+        url = f"/wallets/{self.wallet_2.id}/deposits/"
+        self.post(url, 10, 'key-1')
+        response = self.post(url, 20, 'key-1')
+        self.assertEqual(status.HTTP_422_UNPROCESSABLE_ENTITY, response.status_code)
+        self.wallet_2.refresh_from_db()
+        self.assertEqual(Decimal('10'), self.wallet_2.balance)
+
+    def test_request_in_progress(self):
+        url = f"/wallets/{self.wallet_2.id}/deposits/"
+        request = self.client.post(url, data={"amount": 10}, content_type='application/json',
+                                   HTTP_AUTHORIZATION=f'Token {self.token}',
+                                   HTTP_IDEMPOTENCY_KEY='key-1').wsgi_request
+        caches[IDEMPOTENCY_CACHE].set(cache_key(self.token.key, 'key-2'),
+                                      (request_hash(request), None, None))
+        response = self.post(url, 10, 'key-2')
+        self.assertEqual(status.HTTP_409_CONFLICT, response.status_code)
+
+    def test_keys_are_scoped_by_token(self):
+        other_token = Token.objects.create(user=User.objects.create_user(username='other'))
+        url = f"/wallets/{self.wallet_2.id}/deposits/"
+        self.post(url, 10, 'key-1')
+        response = self.post(url, 10, 'key-1', token=other_token)
+        self.assertFalse(response.has_header('Idempotent-Replayed'))
+        self.wallet_2.refresh_from_db()
+        self.assertEqual(Decimal('20'), self.wallet_2.balance)
+
+    def test_invalid_key(self):
+        url = f"/wallets/{self.wallet_2.id}/deposits/"
+        response = self.post(url, 10, 'k' * 256)
+        self.assertEqual(status.HTTP_400_BAD_REQUEST, response.status_code)
+        self.wallet_2.refresh_from_db()
+        self.assertEqual(Decimal('0'), self.wallet_2.balance)
@@ -0,0 +1,161 @@
+import datetime
+import io
+import os
+import tempfile
+from unittest import mock
+
+from django.conf import settings
+from django.core.cache import caches
+from django.core.management import call_command
+from django.core.management.base import CommandError
+from django.db import connection
+from django.test import TestCase, TransactionTestCase, override_settings
+
+from wallets.checkpoints import balance_as_of
+from wallets.importing import import_operations, local_caches, InvalidRecord
+from wallets.models import Wallet, Operation, OperationImport, BalanceCheckpoint
+from wallets.money import Money, parse_cents
+from wallets.response_cache import RESPONSE_CACHE
+from wallets.summaries import summary, SUMMARY_CACHE
+
+
+class ImportOperationsTestCase(TestCase):
+    def setUp(self):
+        self.wallets = [Wallet.objects.create(name=f'wallet {i}', client_firstname='firstname',
+                                              client_surname='surname') for i in range(2)]
+        first, second = (wallet.id for wallet in self.wallets)
+        self.lines = [
+            'wallet_id,name,amount,date',
+            f'{first},deposit,100.10,2021-01-04',
+            f'{second},deposit,50,2021-01-04',
+            '',
+            f'{first},withdrawal,0.10,2021-01-05',
+            f'{second},withdrawal,20.5,2021-01-06',
+            f'{first},deposit,1.00,2021-01-06',
+        ]
+
+    def csv(self, lines: list) -> io.BytesIO:
+        return io.BytesIO(''.join(f'{line}\n' for line in lines).encode())
+
+    def test_import(self):
+        result = import_operations(self.csv(self.lines), 'csv', 'ledger', chunk_size=2)
+        self.assertEqual((5, 2, 5), (result['operations'], result['wallets'],
+                                     result['checkpoints']))
+        first, second = Wallet.objects.order_by('pk')
+        self.assertEqual((Money(10100), Money(2950)), (first.balance, second.balance))
+        self.assertEqual(Money(10010), balance_as_of(first, datetime.date(2021, 1, 4)))
+        self.assertEqual(Money(10000), balance_as_of(first, datetime.date(2021, 1, 5)))
+        self.assertEqual(Money(5000), balance_as_of(second, datetime.date(2021, 1, 5)))
+        self.assertEqual(5, OperationImport.objects.get(source='ledger').operations)
+
+        # the imported file is not imported again
+        result = import_operations(self.csv(self.lines), 'csv', 'ledger')
+        self.assertEqual(0, result['operations'])
+        self.assertEqual(5, Operation.objects.count())
+
+    def test_resume_after_invalid_record(self):
+        lines = list(self.lines)
+        lines[5] = lines[5].replace('20.5', '20.555')
+        with self.assertRaisesMessage(InvalidRecord, "line 6: Invalid amount: '20.555'"):
+            import_operations(self.csv(lines), 'csv', 'ledger', chunk_size=2)
+        # the chunks before the invalid record are imported
+        self.assertEqual(3, Operation.objects.count())
+        self.assertEqual(5, OperationImport.objects.get(source='ledger').line)
+
+        result = import_operations(self.csv(self.lines), 'csv', 'ledger', chunk_size=2)
+        self.assertEqual(2, result['operations'])
+        self.assertEqual(5, Operation.objects.count())
+        self.assertEqual([Money(10100), Money(2950)],
+                         [wallet.balance for wallet in Wallet.objects.order_by('pk')])
+        # the checkpoints of the wallets imported by the first run are rebuilt too
+        self.assertEqual(5, BalanceCheckpoint.objects.count())
+
+    def test_dry_run(self):
+        first, second = (wallet.id for wallet in self.wallets)
+        tomorrow = datetime.date.today() + datetime.timedelta(days=1)
+        ndjson = io.BytesIO(b'\n'.join([
+            b'{"wallet_id": %d, "name": "deposit", "amount": "10.00"}' % first,
+            b'{"wallet_id": %d, "name": "withdrawal", "amount": 10.5}' % second,
+            b'{"wallet_id": 999999, "name": "deposit", "amount": "1"}',
+            b'{"wallet_id": %d, "name": "deposit", "amount": "1", "date": "%s"}'
+            % (first, tomorrow.isoformat().encode()),
+            b'{"wallet_id": %d, "name": "transfer", "amount": "1"}' % first,
+            b'[1, 2]',
+        ]))
+        result = import_operations(ndjson, 'ndjson', 'ledger.ndjson', dry_run=True)
+        self.assertEqual([
+            f'line 4: date {tomorrow} is in the future',
+            "line 5: unknown operation 'transfer'",
+            'line 6: invalid JSON object',
+            'line 3: wallet 999999 does not exist',
+        ], result['errors'])
+        self.assertEqual([(second, Money(-1050))], result['negative'])
+        self.assertFalse(Operation.objects.exists())
+        self.assertFalse(OperationImport.objects.exists())
+
+    def test_missing_columns(self):
+        with self.assertRaisesMessage(InvalidRecord, 'line 1: missing columns: amount'):
+            import_operations(self.csv(['wallet_id,name', '1,deposit']), 'csv', 'ledger')
+
+    def test_local_caches(self):
+        self.assertEqual([SUMMARY_CACHE], local_caches())
+        with tempfile.TemporaryDirectory() as directory, override_settings(CACHES={
+            **settings.CACHES,
+            SUMMARY_CACHE: {
+                'BACKEND': 'django.core.cache.backends.filebased.FileBasedCache',
+                'LOCATION': directory,
+            },
+        }):
+            self.assertEqual([], local_caches())
+        with mock.patch('wallets.importing.RESPONSE_CACHE_TTL', 300):
+            self.assertEqual([SUMMARY_CACHE, RESPONSE_CACHE], local_caches())
+
+    def test_parse_cents(self):
+        self.assertEqual([1000, 1050, 1055, 5], [parse_cents(value) for value in
+                                                 ('10', '10.5', ' 10.55', '0.05')])
+        for value in ('10.555', '-1', '1e3', '', '.5', 'NaN', '١٠'):
+            with self.subTest(value=value), self.assertRaises(ValueError):
+                parse_cents(value)
+
+
+class ImportOperationsCommandTestCase(TransactionTestCase):
+    def setUp(self):
+        caches[SUMMARY_CACHE].clear()
+        self.wallet = Wallet.objects.create(name='wallet', client_firstname='firstname',
+                                            client_surname='surname')
+
+    def test_command(self):
+        january = (datetime.date(2021, 1, 1), datetime.date(2021, 1, 31))
+        self.assertEqual(0, summary(self.wallet.id, 'month', *january)[0]['deposits']['count'])
+
+        with tempfile.TemporaryDirectory() as directory:
+            path = os.path.join(directory, 'ledger.csv')
+            with open(path, 'w') as file:
+                file.write(f'wallet_id,name,amount,date\n'
+                           f'{self.wallet.id},deposit,5.00,2021-01-10\n')
+            out = io.StringIO()
+            call_command('import_operations', path, dry_run=True, stdout=out)
+            self.assertIn('1 operations of 1 wallets checked', out.getvalue())
+            self.assertFalse(Operation.objects.exists())
+
+            err = io.StringIO()
+            call_command('import_operations', path, defer_indexes=True, stdout=out, stderr=err)
+            self.assertIn('1 operations of 1 wallets imported', out.getvalue())
+            # the summaries cached by the web workers are not dropped
+            self.assertIn('The summaries caches are local to this process, '
+                          'restart the web workers', err.getvalue())
+
+            with open(path, 'a') as file:
+                file.write(f'{self.wallet.id},withdrawal,9.00,2021-01-11\n')
+            with self.assertRaises(CommandError):
+                call_command('import_operations', path, dry_run=True, stdout=out)
+            self.assertIn(f'wallet {self.wallet.id}: balance would be -4.00', out.getvalue())
+
+        # the cached summary of the closed period is dropped
+        self.assertEqual({'count': 1, 'total': Money(500)},
+                         summary(self.wallet.id, 'month', *january)[0]['deposits'])
+        with connection.cursor() as cursor:
+            indexes = connection.introspection.get_constraints(cursor,
+                                                               Operation._meta.db_table)
+        self.assertIn('operation_wallet_date', indexes)
+        self.assertIn('operation_wallet_name_date', indexes)
@@ -0,0 +1,15 @@
+import io
+import json
+
+from django.core.management import call_command
+from django.test import TransactionTestCase
+
+
+class LoadTestTestCase(TransactionTestCase):
+    def test_loadtest(self):
+        out = io.StringIO()
+        call_command('loadtest', wallets=5, requests=40, workers=1, seed=1, stdout=out)
+        report = json.loads(out.getvalue())
+        self.assertTrue(report['balances']['consistent'])
+        self.assertEqual(report['config']['requests'], report['results']['total']['requests'])
+        self.assertEqual({'200'}, set(report['results']['total']['status']))
@@ -0,0 +1,96 @@
+import json
+import os
+import subprocess
+import sys
+import tempfile
+import threading
+from unittest import mock
+
+from django.contrib.auth.models import User
+from django.test import TestCase
+from rest_framework import status
+from rest_framework.authtoken.models import Token
+
+from wallets.metrics import Registry, render
+from wallets.models import Wallet
+
+
+class MetricsTestCase(TestCase):
+    def setUp(self):
+        self.user = User.objects.create_user(username='test', password='test')
+        self.token = Token.objects.create(user=self.user)
+        self.wallet = Wallet.objects.create(name='wallet 1', client_firstname='firstname 1',
+                                            client_surname='surname 1')
+
+    def test_metrics(self):
+        url = f"/wallets/{self.wallet.id}/deposits/"
+        self.client.post(url, data={"amount": 100}, HTTP_AUTHORIZATION=f'Token {self.token}',
+                         content_type='application/json')
+        response = self.client.get('/metrics')
+        self.assertEqual(status.HTTP_200_OK, response.status_code)
+        lines = response.content.decode().splitlines()
+        self.assertIn('# TYPE wallets_request_duration_seconds histogram', lines)
+        self.assertTrue([line for line in lines
+                         if line.startswith('wallets_requests_total{view="deposits",status="200"}')])
+        self.assertTrue([line for line in lines
+                         if line.startswith('wallets_db_queries_count{view="deposits"}')])
+        self.assertTrue([line for line in lines
+                         if line.startswith('wallets_token_cache_misses_total')])
+
+    def test_render(self):
+        registry = Registry()
+        registry.inc('wallets_requests_total', (('view', 'deposits'), ('status', 200)))
+        registry.observe('wallets_db_queries', (('view', 'deposits'),), 3)
+        registry.observe('wallets_db_queries', (('view', 'deposits'),), 1000)
+        lines = render(registry.snapshot()).splitlines()
+        self.assertIn('wallets_requests_total{view="deposits",status="200"} 1', lines)
+        self.assertIn('wallets_db_queries_bucket{view="deposits",le="2"} 0', lines)
+        self.assertIn('wallets_db_queries_bucket{view="deposits",le="3"} 1', lines)
+        self.assertIn('wallets_db_queries_bucket{view="deposits",le="+Inf"} 2', lines)
+        self.assertIn('wallets_db_queries_sum{view="deposits"} 1003', lines)
+        self.assertIn('wallets_db_queries_count{view="deposits"} 2', lines)
+
+    def test_processes_are_aggregated(self):
+        with tempfile.TemporaryDirectory() as directory, \
+                mock.patch('wallets.metrics.METRICS_DIR', directory):
+            first, second = Registry(), Registry()
+            first.inc('wallets_requests_total', (('view', 'deposits'), ('status', 200)), 2)
+            second.inc('wallets_requests_total', (('view', 'deposits'), ('status', 200)), 3)
+            second.observe('wallets_request_duration_seconds', (('view', 'deposits'),),
+                           0.5)
+            first.flush(force=True)
+            lines = render(second.collect()).splitlines()
+        self.assertIn('wallets_requests_total{view="deposits",status="200"} 5', lines)
+        self.assertIn('wallets_request_duration_seconds_count{view="deposits"} 1', lines)
+
+    def test_concurrent_flushes(self):
+        with tempfile.TemporaryDirectory() as directory, \
+                mock.patch('wallets.metrics.METRICS_DIR', directory):
+            registry = Registry()
+            registry.inc('wallets_requests_total', (('view', 'deposits'), ('status', 200)))
+            barrier = threading.Barrier(8)
+
+            def flush():
+                barrier.wait()
+                registry.flush(force=True)
+
+            threads = [threading.Thread(target=flush) for _ in range(8)]
+            for thread in threads:
+                thread.start()
+            for thread in threads:
+                thread.join()
+            self.assertEqual(1, len(os.listdir(directory)))
+
+    def test_exited_processes_are_removed(self):
+        process = subprocess.Popen([sys.executable, '-c', ''])
+        process.wait()
+        with tempfile.TemporaryDirectory() as directory, \
+                mock.patch('wallets.metrics.METRICS_DIR', directory):
+            path = os.path.join(directory, f'{process.pid}-exited.json')
+            with open(path, 'w') as file:
+                json.dump([['wallets_requests_total', [['view', 'deposits']], [2]]], file)
+            registry = Registry()
+            registry.inc('wallets_requests_total', (('view', 'deposits'),))
+            lines = render(registry.collect()).splitlines()
+            self.assertFalse(os.path.exists(path))
+        self.assertIn('wallets_requests_total{view="deposits"} 1', lines)
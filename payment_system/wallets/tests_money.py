@@ -0,0 +1,78 @@
+import pickle
+from decimal import Decimal, InvalidOperation
+
+from django.contrib.auth.models import User
+from django.db import connection
+from django.test import TestCase
+from rest_framework import status
+from rest_framework.authtoken.models import Token
+
+from wallets.models import Wallet, Operation
+from wallets.money import Money, MAX_AMOUNT, valid_amount
+
+
+class MoneyTestCase(TestCase):
+    def test_parse(self):
+        self.assertEqual(Money(1099), Money.parse('10.999'))
+        self.assertEqual(Money(10000), Money.parse(100))
+        self.assertEqual(Money(-11), Money.parse('-0.101'))
+        self.assertEqual([Money(29), Money(115), Money(1)],
+                         [Money.parse(value) for value in (0.29, 1.15, 0.019)])
+        for value in ('ten', 'NaN', None, True, [1], {}, float('inf')):
+            with self.subTest(value=value), self.assertRaises(InvalidOperation):
+                Money.parse(value)
+
+    def test_str(self):
+        self.assertEqual(['0.00', '0.05', '12.30', '-0.05', '-12.30'],
+                         [str(Money(cents)) for cents in (0, 5, 1230, -5, -1230)])
+
+    def test_arithmetic(self):
+        self.assertEqual(Money(150), Money(100) + Money(50))
+        self.assertEqual(Money(-50), Money(50) - Money(100))
+        self.assertEqual(Money(300), 3 * Money(100))
+        self.assertEqual(Decimal('1.50'), Money(150))
+        self.assertEqual(hash(Decimal('1.50')), hash(Money(150)))
+        self.assertLess(Money(1), Money(2))
+        self.assertEqual(Money(150), pickle.loads(pickle.dumps(Money(150))))
+        with self.assertRaises(AttributeError):
+            Money(1).cents = 2
+
+    def test_valid_amount(self):
+        self.assertEqual([False, True, True, False],
+                         [valid_amount(amount) for amount in
+                          (Money(0), Money(1), MAX_AMOUNT, MAX_AMOUNT + Money(1))])
+
+    def test_field(self):
+        wallet = Wallet.objects.create(name='wallet', client_firstname='firstname',
+                                       client_surname='surname', balance=Decimal('12.34'))
+        self.assertEqual(Money(1234), Wallet.objects.get(pk=wallet.pk).balance)
+        self.assertEqual(wallet, Wallet.objects.get(balance__gt=Money(1233)))
+        with connection.cursor() as cursor:
+            cursor.execute('SELECT balance FROM wallets_wallet')
+            self.assertEqual([(1234,)], cursor.fetchall())
+
+    def test_json_amounts(self):
+        token = Token.objects.create(user=User.objects.create_user(username='test',
+                                                                   password='test'))
+        wallet = Wallet.objects.create(name='wallet', client_firstname='firstname',
+                                       client_surname='surname')
+        for amount, code in ((0.29, status.HTTP_200_OK), (None, status.HTTP_400_BAD_REQUEST),
+                             ([1], status.HTTP_400_BAD_REQUEST)):
+            response = self.client.post(f'/wallets/{wallet.id}/deposits/', {'amount': amount},
+                                        content_type='application/json',
+                                        HTTP_AUTHORIZATION=f'Token {token}')
+            self.assertEqual(code, response.status_code)
+        self.assertEqual(Money(29), Wallet.objects.get(pk=wallet.pk).balance)
+
+    def test_large_deposit(self):
+        token = Token.objects.create(user=User.objects.create_user(username='test',
+                                                                   password='test'))
+        wallet = Wallet.objects.create(name='wallet', client_firstname='firstname',
+                                       client_surname='surname')
+        response = self.client.post(f'/wallets/{wallet.id}/deposits/',
+                                    {'amount': '9999999999999.99'},
+                                    content_type='application/json',
+                                    HTTP_AUTHORIZATION=f'Token {token}')
+        self.assertEqual(status.HTTP_200_OK, response.status_code)
+        self.assertEqual(Money(10 ** 15 - 1), Wallet.objects.get(pk=wallet.pk).balance)
+        self.assertEqual(Money(10 ** 15 - 1), Operation.objects.get().amount)
@@ -1,11 +1,18 @@
+import csv
+import io
+import json
 from decimal import Decimal
 
 from django.contrib.auth.models import User
+from django.db import connection
 from django.test import TestCase
+from django.test.utils import CaptureQueriesContext
 from rest_framework import status
 from rest_framework.authtoken.models import Token
 
 from wallets.models import Wallet, Operation
+from wallets.money import Money
+from wallets.views import transfer_money, deposit_money
 
 
 class OperationsTestCase(TestCase):
@@ -65,7 +72,7 @@ class OperationsTestCase(TestCase):
         test_cases = (
             0,
             -200,
-            2000000000,
+            10000000000000,
         )
         url = f"/wallets/{self.wallet1.id}/deposits/"
         for amount in test_cases:
@@ -137,3 +144,157 @@ class OperationsTestCase(TestCase):
                                    content_type='application/json')
         self.assertEqual(status.HTTP_400_BAD_REQUEST, response.status_code)
 
+    def test_batch_withdrawal_without_token(self):
+        url = "/wallets/withdrawals/"
+        data = {
+            "transfers": [
+                {"sender": self.wallet1.id, "receiver": self.wallet2.id, "amount": 100},
+            ]
+        }
+        response = self.client.post(url, data=data, content_type='application/json')
+        self.assertEqual(status.HTTP_401_UNAUTHORIZED, response.status_code)
+        self.wallet1.refresh_from_db()
+        self.assertEqual(Decimal("500.00"), self.wallet1.balance)
+
+    def test_batch_withdrawal(self):
+        url = "/wallets/withdrawals/"
+        data = {
+            "transfers": [
+                {"sender": self.wallet1.id, "receiver": self.wallet2.id, "amount": 300},
+                {"sender": self.wallet1.id, "receiver": self.wallet2.id, "amount": 300},
+                {"sender": self.wallet2.id, "receiver": self.wallet1.id, "amount": 50},
+                {"sender": self.wallet1.id, "receiver": self.invalid_id, "amount": 10},
+                {"sender": self.wallet1.id, "receiver": self.wallet2.id, "amount": -10},
+            ]
+        }
+        response = self.client.post(url, data=data,
+                                    HTTP_AUTHORIZATION=f'Token {self.token}',
+                                    content_type='application/json')
+        self.assertEqual(status.HTTP_200_OK, response.status_code)
+        self.assertEqual([200, 400, 200, 400, 400],
+                         [item['status'] for item in response.json()])
+        self.wallet1.refresh_from_db()
+        self.wallet2.refresh_from_db()
+        self.assertEqual(Decimal("250.00"), self.wallet1.balance)
+        self.assertEqual(Decimal("250.00"), self.wallet2.balance)
+        self.assertEqual(2, Operation.objects.filter(wallet=self.wallet2).count())
+
+    def test_invalid_batch_withdrawal(self):
+        test_cases = (
+            {},
+            {"transfers": []},
+            {"transfers": [{"sender": self.wallet1.id, "amount": 100}]},
+        )
+        url = "/wallets/withdrawals/"
+        for data in test_cases:
+            with self.subTest(i=data):
+                response = self.client.post(url, data=data,
+                                            HTTP_AUTHORIZATION=f'Token {self.token}',
+                                            content_type='application/json')
+                self.assertEqual(status.HTTP_400_BAD_REQUEST, response.status_code)
+                self.wallet1.refresh_from_db()
+                self.assertEqual(Decimal("500.00"), self.wallet1.balance)
+
+    def test_money_path_queries(self):
+        test_cases = (
+            (transfer_money, (self.wallet1.id, self.wallet2.id, Money.parse("100.00")), 4),
+            (transfer_money, (self.wallet1.id, self.wallet2.id, Money.parse("900.00")), 2),
+            (deposit_money, (self.wallet1.id, Money.parse("100.00")), 3),
+        )
+        for func, args, expected in test_cases:
+            with self.subTest(i=(func.__name__, args)):
+                with CaptureQueriesContext(connection) as queries:
+                    try:
+                        func(*args)
+                    except ValueError:
+                        pass
+                statements = [query for query in queries.captured_queries
+                              if 'SAVEPOINT' not in query['sql']]
+                self.assertEqual(expected, len(statements))
+
+    def test_withdrawal_to_invalid_wallet(self):
+        url = f"/wallets/{self.wallet1.id}/withdrawals/{self.invalid_id}/"
+        data = {
+            "amount": 100
+        }
+        response = self.client.post(url, data=data,
+                                    HTTP_AUTHORIZATION=f'Token {self.token}',
+                                    content_type='application/json')
+        self.assertEqual(status.HTTP_400_BAD_REQUEST, response.status_code)
+        self.wallet1.refresh_from_db()
+        self.assertEqual(Decimal("500.00"), self.wallet1.balance)
+
+    def test_get_transactions_pages(self):
+        for _ in range(4):
+            Operation.objects.create(name='withdrawal', wallet=self.wallet1,
+                                     amount=Decimal("10.00"))
+        url = f"/operations/{self.wallet1.id}/"
+        ids = []
+        params = {'page_size': 2, 'filter': '-date', 'count': 'true'}
+        while True:
+            response = self.client.get(url, params,
+                                       HTTP_AUTHORIZATION=f'Token {self.token}')
+            self.assertEqual(status.HTTP_200_OK, response.status_code)
+            self.assertEqual('5', response['X-Total-Count'])
+            ids += [operation['id'] for operation in response.json()]
+            if not response.has_header('X-Next-Cursor'):
+                break
+            params['cursor'] = response['X-Next-Cursor']
+
+        expected = Operation.objects.filter(wallet=self.wallet1) \
+            .order_by('-date', '-id').values_list('id', flat=True)
+        self.assertEqual(list(expected), ids)
+
+    def test_get_transactions_invalid_page(self):
+        test_cases = (
+            {'page_size': 0},
+            {'page_size': 'abc'},
+            {'cursor': 'abc'},
+        )
+        url = f"/operations/{self.wallet1.id}/"
+        for params in test_cases:
+            with self.subTest(i=params):
+                response = self.client.get(url, params,
+                                           HTTP_AUTHORIZATION=f'Token {self.token}')
+                self.assertEqual(status.HTTP_400_BAD_REQUEST, response.status_code)
+
+    def test_export_transactions(self):
+        Operation.objects.create(name='withdrawal', wallet=self.wallet1,
+                                 amount=Decimal("10.50"))
+        test_cases = (
+            (f"/operations/{self.wallet1.id}/export/", {}, 2),
+            (f"/operations/{self.wallet1.id}/withdrawal/export/", {'filter': '-date'}, 1),
+        )
+        for url, params, expected in test_cases:
+            with self.subTest(i=url):
+                response = self.client.get(url, params,
+                                           HTTP_AUTHORIZATION=f'Token {self.token}')
+                self.assertEqual(status.HTTP_200_OK, response.status_code)
+                lines = b''.join(response.streaming_content).decode().splitlines()
+                self.assertEqual(expected, len(lines))
+                self.assertEqual(Decimal(json.loads(lines[-1])['amount']),
+                                 Operation.objects.filter(wallet=self.wallet1)
+                                 .order_by('-id').first().amount)
+
+    def test_export_transactions_csv(self):
+        url = f"/operations/{self.wallet1.id}/export/"
+        response = self.client.get(url, {'format': 'csv'},
+                                   HTTP_AUTHORIZATION=f'Token {self.token}')
+        self.assertEqual(status.HTTP_200_OK, response.status_code)
+        rows = list(csv.reader(io.StringIO(
+            b''.join(response.streaming_content).decode())))
+        self.assertEqual(['id', 'name', 'wallet_id', 'date', 'amount'], rows[0])
+        self.assertEqual([str(self.operation.id), 'deposit', str(self.wallet1.id),
+                          self.operation.date.isoformat(), '500.00'], rows[1])
+
+    def test_export_invalid_transactions(self):
+        test_cases = (
+            (f"/operations/{self.invalid_id}/export/", {}),
+            (f"/operations/{self.wallet1.id}/export/", {'format': 'xml'}),
+            (f"/operations/{self.wallet1.id}/export/", {'filter': 'amount'}),
+        )
+        for url, params in test_cases:
+            with self.subTest(i=(url, params)):
+                response = self.client.get(url, params,
+                                           HTTP_AUTHORIZATION=f'Token {self.token}')
+                self.assertEqual(status.HTTP_400_BAD_REQUEST, response.status_code)
@@ -0,0 +1,88 @@
+import io
+import os
+import tempfile
+
+from django.contrib.auth.models import User
+from django.core.management import call_command, CommandError
+from django.test import TestCase
+from django.test.utils import CaptureQueriesContext
+from django.db import connection
+from rest_framework import status
+from rest_framework.authtoken.models import Token
+
+from wallets.models import Wallet
+from wallets.provisioning import create_wallets
+
+
+class ProvisioningTestCase(TestCase):
+    def setUp(self):
+        self.token = Token.objects.create(user=User.objects.create_user(username='test'))
+        self.url = '/wallets/bulk/'
+
+    def test_create_wallets(self):
+        clients = [(f'firstname {i}', f'surname {i}') for i in range(7)]
+        with CaptureQueriesContext(connection) as queries:
+            ids = create_wallets(clients, chunk_size=3)
+        self.assertFalse([query for query in queries.captured_queries
+                          if 'MAX(' in query['sql'] or 'ORDER BY' in query['sql']])
+        self.assertEqual(7, len(set(ids)))
+        wallets = Wallet.objects.in_bulk(ids)
+        for pk, (firstname, surname) in zip(ids, clients):
+            self.assertEqual(f'wallet {pk}', wallets[pk].name)
+            self.assertEqual(firstname, wallets[pk].client_firstname)
+            self.assertEqual(surname, wallets[pk].client_surname)
+
+    def test_create_wallets_in_empty_table(self):
+        response = self.client.post('/wallets/', data={'client_firstname': 'firstname',
+                                                       'client_surname': 'surname'},
+                                    HTTP_AUTHORIZATION=f'Token {self.token}',
+                                    content_type='application/json')
+        self.assertEqual(status.HTTP_201_CREATED, response.status_code)
+        wallet = Wallet.objects.get()
+        self.assertEqual([f'The wallet with id={wallet.pk} created'], response.json())
+        self.assertEqual(f'wallet {wallet.pk}', wallet.name)
+
+    def test_provision_wallets(self):
+        data = {'wallets': [{'client_firstname': f'firstname {i}',
+                             'client_surname': f'surname {i}'} for i in range(3)]}
+        response = self.client.post(self.url, data=data, HTTP_AUTHORIZATION=f'Token {self.token}',
+                                    content_type='application/json')
+        self.assertEqual(status.HTTP_201_CREATED, response.status_code)
+        ids = response.json()['ids']
+        self.assertEqual(['firstname 0', 'firstname 1', 'firstname 2'],
+                         [Wallet.objects.get(pk=pk).client_firstname for pk in ids])
+
+    def test_provision_invalid_wallets(self):
+        data = {'wallets': [{'client_firstname': 'firstname', 'client_surname': 'surname'},
+                            {'client_firstname': 'firstname'},
+                            {'client_firstname': 'f' * 31, 'client_surname': 'surname'}]}
+        response = self.client.post(self.url, data=data, HTTP_AUTHORIZATION=f'Token {self.token}',
+                                    content_type='application/json')
+        self.assertEqual(status.HTTP_400_BAD_REQUEST, response.status_code)
+        self.assertEqual({'invalid': [1, 2]}, response.json())
+        self.assertFalse(Wallet.objects.exists())
+
+        response = self.client.post(self.url, data={'wallets': []},
+                                    HTTP_AUTHORIZATION=f'Token {self.token}',
+                                    content_type='application/json')
+        self.assertEqual(status.HTTP_400_BAD_REQUEST, response.status_code)
+
+    def test_command(self):
+        with tempfile.TemporaryDirectory() as directory:
+            path = os.path.join(directory, 'clients.csv')
+            output = os.path.join(directory, 'ids.txt')
+            with open(path, 'w') as file:
+                file.write('firstname 1,surname 1\nfirstname 2, surname 2\n')
+            out = io.StringIO()
+            call_command('provision_wallets', path, output=output, stdout=out)
+            with open(output) as file:
+                ids = [int(line) for line in file]
+
+            self.assertEqual('2 wallets created\n', out.getvalue())
+            self.assertEqual(['surname 1', 'surname 2'],
+                             [Wallet.objects.get(pk=pk).client_surname for pk in ids])
+
+            with open(path, 'w') as file:
+                file.write('firstname 3\n')
+            with self.assertRaises(CommandError):
+                call_command('provision_wallets', path, stdout=out)
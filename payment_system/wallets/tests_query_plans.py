@@ -0,0 +1,82 @@
+from decimal import Decimal
+
+from django.contrib.auth.models import User
+from django.db import connection
+from django.test import TestCase
+from django.test.utils import CaptureQueriesContext
+from rest_framework import status
+from rest_framework.authtoken.models import Token
+
+from wallets.models import Wallet, Operation
+
+
+class QueryPlanTestCase(TestCase):
+    """
+    Runs EXPLAIN QUERY PLAN for every SELECT issued by the read views
+    and fails if a query scans a table or sorts in a temp B-tree.
+    """
+    def setUp(self):
+        self.user = User.objects.create_user(username='test', password='test')
+        self.token = Token.objects.create(user=self.user)
+        self.wallets = [
+            Wallet.objects.create(name=f'wallet {i}', client_firstname=f'firstname {i}',
+                                  client_surname=f'surname {i}')
+            for i in range(3)
+        ]
+        Operation.objects.bulk_create([
+            Operation(name=name, wallet=wallet, amount=Decimal("10.00"))
+            for wallet in self.wallets
+            for name in ('deposit', 'withdrawal') * 5
+        ])
+        connection.cursor().execute('ANALYZE')
+
+    def get_plans(self, url: str, params: dict = None) -> list:
+        with CaptureQueriesContext(connection) as queries:
+            response = self.client.get(url, params or {},
+                                       HTTP_AUTHORIZATION=f'Token {self.token}')
+        self.assertEqual(status.HTTP_200_OK, response.status_code)
+
+        plans = []
+        with connection.cursor() as cursor:
+            for query in queries.captured_queries:
+                if not query['sql'].startswith('SELECT'):
+                    continue
+                cursor.execute(f"EXPLAIN QUERY PLAN {query['sql']}")
+                plans.append((query['sql'], [row[-1] for row in cursor.fetchall()]))
+        return plans
+
+    def assertIndexedPlans(self, url: str, params: dict = None,
+                           allowed_scans: tuple = ()):
+        for sql, plan in self.get_plans(url, params):
+            for step in plan:
+                with self.subTest(sql=sql, step=step):
+                    self.assertNotIn('TEMP B-TREE', step)
+                    if step.startswith('SCAN') and step not in allowed_scans:
+                        self.fail(f'{step} in {sql}')
+
+    def test_operations_plans(self):
+        wallet_id = self.wallets[1].id
+        test_cases = (
+            (f'/operations/{wallet_id}/', {}),
+            (f'/operations/{wallet_id}/', {'filter': 'date'}),
+            (f'/operations/{wallet_id}/', {'filter': '-date', 'count': 'true'}),
+            (f'/operations/{wallet_id}/deposit/', {}),
+            (f'/operations/{wallet_id}/withdrawal/', {'filter': '-date'}),
+        )
+        for url, params in test_cases:
+            params['page_size'] = 2
+            response = self.client.get(url, params,
+                                       HTTP_AUTHORIZATION=f'Token {self.token}')
+            for page_params in (params, {**params, 'cursor': response['X-Next-Cursor']}):
+                with self.subTest(url=url, params=page_params):
+                    self.assertIndexedPlans(url, page_params)
+
+    def test_wallets_plans(self):
+        # the first page reads the head of the primary key
+        allowed_scans = ('SCAN wallets_wallet', 'SCAN TABLE wallets_wallet')
+        response = self.client.get('/wallets/', {'page_size': 1},
+                                   HTTP_AUTHORIZATION=f'Token {self.token}')
+        self.assertIndexedPlans('/wallets/', {'page_size': 1}, allowed_scans)
+        self.assertIndexedPlans('/wallets/', {'page_size': 1,
+                                              'cursor': response['X-Next-Cursor']})
+        self.assertIndexedPlans(f'/wallets/{self.wallets[1].id}/')
@@ -0,0 +1,70 @@
+import csv
+import io
+import os
+import tempfile
+from decimal import Decimal
+
+from django.core.management import call_command
+from django.core.management.base import CommandError
+from django.test import TestCase
+
+from wallets.models import Wallet, WalletSlot, Operation
+from wallets.money import Money
+from wallets.reconciliation import reconcile, wallet_ranges
+from wallets.views import deposit_money, transfer_money, set_hot_mode
+
+
+class ReconciliationTestCase(TestCase):
+    def setUp(self):
+        self.wallets = [Wallet.objects.create(name=f'wallet {i}', client_firstname='firstname',
+                                              client_surname='surname') for i in range(3)]
+        deposit_money(self.wallets[0].id, Money.parse('100.10'))
+        transfer_money(self.wallets[0].id, self.wallets[1].id, Money.parse('40.05'))
+        set_hot_mode(self.wallets[2].id, 2)
+        deposit_money(self.wallets[2].id, Money.parse('0.01'))
+        deposit_money(self.wallets[2].id, Money.parse('0.02'))
+
+    def test_consistent_wallets(self):
+        results = list(reconcile(range_size=2))
+        self.assertEqual(2, len(results))
+        self.assertEqual(3, sum(wallets for wallets, _, _ in results))
+        self.assertEqual(5, sum(operations for _, operations, _ in results))
+        self.assertEqual([], [mismatch for _, _, mismatches in results for mismatch in mismatches])
+
+        out = io.StringIO()
+        call_command('reconcile', processes=1, stdout=out)
+        self.assertIn('3 wallets and 5 operations checked', out.getvalue())
+
+    def test_mismatched_wallets(self):
+        Wallet.objects.filter(pk=self.wallets[0].id).update(balance=Decimal('70.00'))
+        WalletSlot.objects.filter(wallet=self.wallets[2]).update(balance=Decimal('0.00'))
+        Operation.objects.create(name='withdrawal', wallet=self.wallets[1], amount=Decimal('1'))
+
+        self.assertEqual(
+            [(self.wallets[0].id, 6005, 7000), (self.wallets[1].id, 3905, 4005),
+             (self.wallets[2].id, 3, 0)],
+            [mismatch for _, _, mismatches in reconcile(range_size=1)
+             for mismatch in mismatches],
+        )
+
+        with tempfile.TemporaryDirectory() as directory:
+            path = os.path.join(directory, 'corrections.csv')
+            out = io.StringIO()
+            with self.assertRaises(CommandError):
+                call_command('reconcile', processes=1, corrections=path, stdout=out)
+            self.assertIn(f'wallet {self.wallets[0].id}: balance 70.00, operations 60.05',
+                          out.getvalue())
+            with open(path, newline='') as file:
+                rows = list(csv.reader(file))
+        self.assertEqual([
+            ['wallet_id', 'name', 'amount'],
+            [str(self.wallets[0].id), 'deposit', '9.95'],
+            [str(self.wallets[1].id), 'deposit', '1.00'],
+            [str(self.wallets[2].id), 'withdrawal', '0.03'],
+        ], rows)
+
+    def test_wallet_ranges(self):
+        first = self.wallets[0].id
+        self.assertEqual([(first, first + 2), (first + 2, first + 3)], wallet_ranges(2))
+        Wallet.objects.all().delete()
+        self.assertEqual([], wallet_ranges(2))
@@ -0,0 +1,97 @@
+import io
+import os
+import tempfile
+from decimal import Decimal
+from unittest import mock
+
+from django.contrib.auth.models import User
+from django.core.cache import caches
+from django.core.management import call_command
+from django.db import connections
+from django.test import TransactionTestCase
+from django.test.utils import CaptureQueriesContext
+from rest_framework import status
+from rest_framework.authtoken.models import Token
+
+from wallets.middleware import MetricsMiddleware
+from wallets.models import Wallet, ReplicaHeartbeat
+from wallets.replicas import replica_state, REPLICA_DATABASE, STICKY_CACHE
+from wallets.response_cache import RESPONSE_CACHE
+
+
+class ReplicaTestCase(TransactionTestCase):
+    @classmethod
+    def setUpClass(cls):
+        super().setUpClass()
+        # the replica is a temporary SQLite file synced by sync_replica
+        cls.directory = tempfile.TemporaryDirectory()
+        connections.databases[REPLICA_DATABASE] = dict(
+            connections.databases['default'], ATOMIC_REQUESTS=False,
+            NAME=os.path.join(cls.directory.name, 'replica.sqlite3'),
+        )
+
+    @classmethod
+    def tearDownClass(cls):
+        connections[REPLICA_DATABASE].close()
+        del connections.databases[REPLICA_DATABASE]
+        delattr(connections._connections, REPLICA_DATABASE)
+        cls.directory.cleanup()
+        super().tearDownClass()
+
+    def setUp(self):
+        caches[STICKY_CACHE].clear()
+        caches[RESPONSE_CACHE].clear()
+        replica_state.reset()
+        self.token = Token.objects.create(user=User.objects.create_user(username='test'))
+        self.wallet = Wallet.objects.create(name='wallet 1', client_firstname='firstname 1',
+                                            client_surname='surname 1')
+        self.sync()
+
+    def sync(self):
+        call_command('sync_replica', stdout=io.StringIO())
+        replica_state.reset()
+
+    def get_wallet(self, token=None):
+        return self.client.get(f'/wallets/{self.wallet.id}/',
+                               HTTP_AUTHORIZATION=f'Token {token or self.token}').json()[0]
+
+    def test_reads_go_to_the_replica(self):
+        Wallet.objects.filter(pk=self.wallet.pk).update(name='renamed')
+        self.assertEqual('wallet 1', self.get_wallet()['name'])
+        self.sync()
+        self.assertEqual('renamed', self.get_wallet()['name'])
+
+    def test_replica_queries_are_recorded(self):
+        with mock.patch.object(MetricsMiddleware, 'record') as record, \
+                CaptureQueriesContext(connections['default']) as primary, \
+                CaptureQueriesContext(connections[REPLICA_DATABASE]) as replica:
+            self.get_wallet()
+        self.assertTrue(replica.captured_queries)
+        queries = record.call_args[0][3]
+        self.assertEqual(len(primary.captured_queries) + len(replica.captured_queries), queries)
+
+    def test_read_your_writes(self):
+        response = self.client.post(f'/wallets/{self.wallet.id}/deposits/', data={"amount": 10},
+                                    HTTP_AUTHORIZATION=f'Token {self.token}',
+                                    content_type='application/json')
+        self.assertEqual(status.HTTP_200_OK, response.status_code)
+        self.assertEqual(Decimal('10'), Decimal(self.get_wallet()['balance']))
+
+        other = Token.objects.create(user=User.objects.create_user(username='other'))
+        # the response read from the primary would be served from the cache
+        caches[RESPONSE_CACHE].clear()
+        self.assertEqual(Decimal('0'), Decimal(self.get_wallet(other)['balance']))
+
+    def test_lagging_replica(self):
+        Wallet.objects.filter(pk=self.wallet.pk).update(balance=Decimal("5.00"))
+        ReplicaHeartbeat.objects.using(REPLICA_DATABASE).update(timestamp=0)
+        replica_state.reset()
+        self.assertEqual(Decimal('5'), Decimal(self.get_wallet()['balance']))
+
+    def test_unavailable_replica(self):
+        Wallet.objects.filter(pk=self.wallet.pk).update(name='renamed')
+        with connections[REPLICA_DATABASE].cursor() as cursor:
+            cursor.execute('DROP TABLE wallets_wallet')
+        self.assertEqual('renamed', self.get_wallet()['name'])
+        self.assertFalse(replica_state.is_usable())
+        self.sync()
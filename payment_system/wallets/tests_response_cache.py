@@ -0,0 +1,101 @@
+import tempfile
+from decimal import Decimal
+from unittest import mock
+
+from django.conf import settings
+from django.contrib.auth.models import User
+from django.core.cache import caches
+from django.core.cache.backends.filebased import FileBasedCache
+from django.test import TestCase, override_settings
+from rest_framework import status
+from rest_framework.authtoken.models import Token
+
+from wallets.metrics import Registry, render
+from wallets.models import Wallet
+from wallets.response_cache import RESPONSE_CACHE, _version_key
+
+
+@mock.patch('wallets.response_cache.RESPONSE_CACHE_TTL', 300)
+class ResponseCacheTestCase(TestCase):
+    def setUp(self):
+        caches[RESPONSE_CACHE].clear()
+        self.token = Token.objects.create(user=User.objects.create_user(username='test'))
+        self.wallet_1 = Wallet.objects.create(name='wallet 1', client_firstname='firstname 1',
+                                              client_surname='surname 1', balance=100)
+        self.wallet_2 = Wallet.objects.create(name='wallet 2', client_firstname='firstname 2',
+                                              client_surname='surname 2')
+
+    def get(self, url):
+        return self.client.get(url, HTTP_AUTHORIZATION=f'Token {self.token}')
+
+    def post(self, url, data):
+        return self.client.post(url, data=data, HTTP_AUTHORIZATION=f'Token {self.token}',
+                                content_type='application/json')
+
+    def test_wallet_is_cached(self):
+        url = f'/wallets/{self.wallet_1.id}/'
+        first = self.get(url)
+        with self.assertNumQueries(0):
+            second = self.get(url)
+        self.assertEqual(first.content, second.content)
+        self.assertEqual('application/json', second['Content-Type'])
+        self.assertEqual('Accept', second['Vary'])
+
+    def test_writes_invalidate_the_wallet(self):
+        url = f'/wallets/{self.wallet_2.id}/'
+        self.get(url)
+        self.post(f'/wallets/{self.wallet_2.id}/deposits/', {'amount': 10})
+        self.assertEqual(Decimal('10'), Decimal(self.get(url).json()[0]['balance']))
+
+        self.post(f'/wallets/{self.wallet_1.id}/withdrawals/{self.wallet_2.id}/', {'amount': 5})
+        self.assertEqual(Decimal('15'), Decimal(self.get(url).json()[0]['balance']))
+
+        self.post(url, {'client_firstname': 'new', 'client_surname': 'name'})
+        self.assertEqual('new', self.get(url).json()[0]['client_firstname'])
+
+        self.client.delete(url, HTTP_AUTHORIZATION=f'Token {self.token}')
+        self.assertEqual(status.HTTP_400_BAD_REQUEST, self.get(url).status_code)
+
+    def test_operations_are_cached_per_query(self):
+        self.post(f'/wallets/{self.wallet_1.id}/withdrawals/{self.wallet_2.id}/', {'amount': 5})
+        url = f'/operations/{self.wallet_2.id}/?filter=-date&page_size=1'
+        first = self.get(url)
+        with self.assertNumQueries(0):
+            self.assertEqual(first.content, self.get(url).content)
+        self.assertFalse(first.has_header('X-Next-Cursor'))
+        self.assertEqual(1, len(self.get(f'/operations/{self.wallet_2.id}/').json()))
+
+        self.post(f'/wallets/{self.wallet_2.id}/deposits/', {'amount': 10})
+        response = self.get(url)
+        self.assertEqual(Decimal('10'), Decimal(response.json()[0]['amount']))
+        self.assertTrue(response.has_header('X-Next-Cursor'))
+        with self.assertNumQueries(0):
+            self.assertEqual(response['X-Next-Cursor'], self.get(url)['X-Next-Cursor'])
+
+    def test_hit_ratio(self):
+        registry = Registry()
+        registry.inc('wallets_response_cache_hits_total', (), 3)
+        registry.inc('wallets_response_cache_misses_total', ())
+        self.assertIn('wallets_response_cache_hit_ratio 0.75', render(registry.snapshot()))
+
+    def test_versions_are_shared(self):
+        url = f'/wallets/{self.wallet_1.id}/'
+        with tempfile.TemporaryDirectory() as directory, override_settings(CACHES={
+            **settings.CACHES,
+            RESPONSE_CACHE: {
+                'BACKEND': 'django.core.cache.backends.filebased.FileBasedCache',
+                'LOCATION': directory,
+            },
+        }):
+            self.assertEqual(Decimal('100.00'), Decimal(self.get(url).json()[0]['balance']))
+            # a write in another worker process bumps the version in its cache instance
+            Wallet.objects.filter(pk=self.wallet_1.id).update(balance=500)
+            FileBasedCache(directory, {}).incr(_version_key(self.wallet_1.id))
+            self.assertEqual(Decimal('500.00'), Decimal(self.get(url).json()[0]['balance']))
+
+    def test_disabled_without_ttl(self):
+        url = f'/wallets/{self.wallet_1.id}/'
+        with mock.patch('wallets.response_cache.RESPONSE_CACHE_TTL', 0):
+            self.get(url)
+            Wallet.objects.filter(pk=self.wallet_1.id).update(balance=500)
+            self.assertEqual(Decimal('500.00'), Decimal(self.get(url).json()[0]['balance']))
@@ -0,0 +1,98 @@
+import threading
+from unittest import mock
+
+from django.contrib.auth.models import User
+from django.db import connection, transaction, OperationalError
+from django.test import TestCase, TransactionTestCase
+from rest_framework import status
+from rest_framework.authtoken.models import Token
+
+from wallets import retries
+from wallets.metrics import registry
+from wallets.models import Wallet, Operation
+from wallets.money import Money
+
+
+def counter(name: str, function: str) -> float:
+    return registry.snapshot().get((name, (('function', function),)), [0])[0]
+
+
+class RetryTestCase(TestCase):
+    def failing(self, errors: list):
+        @retries.retry_on_lock_errors
+        def flaky_transaction():
+            if errors:
+                raise errors.pop(0)
+            return 'done'
+        return flaky_transaction
+
+    def test_lock_errors_are_retried(self):
+        func = self.failing([OperationalError('database is locked')] * 2)
+        retried = counter('wallets_transaction_retries_total', 'flaky_transaction')
+        with transaction.atomic():
+            # not retried inside an outer transaction
+            with self.assertRaises(OperationalError):
+                func()
+        # the test case runs in a transaction
+        with mock.patch.object(connection, 'in_atomic_block', False), \
+                mock.patch('time.sleep') as sleep:
+            self.assertEqual('done', func())
+        self.assertEqual(1, sleep.call_count)
+        self.assertEqual(retried + 1,
+                         counter('wallets_transaction_retries_total', 'flaky_transaction'))
+
+    def test_retries_are_bounded(self):
+        errors = [OperationalError('database table is locked')] * 5
+        func = self.failing(errors)
+        aborted = counter('wallets_transaction_aborts_total', 'flaky_transaction')
+        with mock.patch.object(connection, 'in_atomic_block', False), \
+                mock.patch('time.sleep'), mock.patch.object(retries, 'MAX_ATTEMPTS', 3):
+            with self.assertRaises(retries.TransactionAborted):
+                func()
+        self.assertEqual(2, len(errors))
+        self.assertEqual(aborted + 1,
+                         counter('wallets_transaction_aborts_total', 'flaky_transaction'))
+
+        func = self.failing([OperationalError('no such table: wallets_wallet')])
+        with mock.patch.object(connection, 'in_atomic_block', False):
+            with self.assertRaises(OperationalError):
+                func()
+
+
+class OpposingTransfersTestCase(TransactionTestCase):
+    def setUp(self):
+        self.token = Token.objects.create(user=User.objects.create_user(username='test',
+                                                                         password='test'))
+        self.wallets = [Wallet.objects.create(name=f'wallet {i}', client_firstname='firstname',
+                                              client_surname='surname', balance=1000)
+                        for i in range(2)]
+
+    def test_opposing_transfers(self):
+        threads_count, transfers = 8, 25
+        statuses = []
+        barrier = threading.Barrier(threads_count)
+
+        def transfer(i):
+            sender, receiver = self.wallets[i % 2].id, self.wallets[1 - i % 2].id
+            barrier.wait()
+            try:
+                for _ in range(transfers):
+                    statuses.append(self.client_class().post(
+                        f'/wallets/{sender}/withdrawals/{receiver}/', {'amount': '1.00'},
+                        content_type='application/json',
+                        HTTP_AUTHORIZATION=f'Token {self.token}',
+                    ).status_code)
+            finally:
+                connection.close()
+
+        threads = [threading.Thread(target=transfer, args=(i,)) for i in range(threads_count)]
+        for thread in threads:
+            thread.start()
+        for thread in threads:
+            thread.join()
+
+        self.assertEqual([status.HTTP_200_OK] * threads_count * transfers, statuses)
+        self.assertEqual(2 * threads_count * transfers, Operation.objects.count())
+        self.assertEqual([Money.parse(1000)] * 2,
+                         [wallet.balance for wallet in Wallet.objects.order_by('pk')])
+
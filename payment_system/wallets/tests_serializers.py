@@ -0,0 +1,89 @@
+import datetime
+import json
+from decimal import Decimal
+from unittest import mock
+
+import msgpack
+from django.contrib.auth.models import User
+from django.core.cache import caches
+from django.test import TestCase
+from rest_framework import status
+from rest_framework.authtoken.models import Token
+
+from wallets import serializers
+from wallets.models import Wallet, Operation
+from wallets.response_cache import RESPONSE_CACHE
+
+
+class SerializersTestCase(TestCase):
+    def setUp(self):
+        caches[RESPONSE_CACHE].clear()
+        self.user = User.objects.create_user(username='test', password='test')
+        self.token = Token.objects.create(user=self.user)
+        self.wallet = Wallet.objects.create(name='wallet 1', client_firstname='firstname 1',
+                                            client_surname='surname 1', balance=Decimal('10.10'))
+        Operation.objects.create(name='deposit', wallet=self.wallet, amount=Decimal('10.10'),
+                                 date=datetime.date(2021, 3, 1))
+
+    def tearDown(self):
+        # the operation was created without bumping the version of the wallet
+        caches[RESPONSE_CACHE].clear()
+
+    def get(self, url, **extra):
+        return self.client.get(url, HTTP_AUTHORIZATION=f'Token {self.token}', **extra)
+
+    def test_amounts_are_exact_strings(self):
+        data = {'amount': Decimal('0.10'), 'date': datetime.date(2021, 3, 1)}
+        expected = {'amount': '0.10', 'date': '2021-03-01'}
+        self.assertEqual(expected, json.loads(serializers.dumps_json(data)))
+        self.assertEqual(expected, msgpack.unpackb(serializers.dumps_msgpack(data)))
+        with mock.patch.object(serializers, 'orjson', None):
+            self.assertEqual(expected, json.loads(serializers.dumps_json(data)))
+
+    def test_json_response(self):
+        response = self.get(f'/operations/{self.wallet.id}/deposit/')
+        self.assertEqual(status.HTTP_200_OK, response.status_code)
+        self.assertEqual('application/json', response['Content-Type'])
+        self.assertEqual('Accept', response['Vary'])
+        self.assertEqual('10.10', response.json()[0]['amount'])
+        self.assertEqual('2021-03-01', response.json()[0]['date'])
+
+    def test_msgpack_response(self):
+        response = self.get(f'/operations/{self.wallet.id}/deposit/',
+                            HTTP_ACCEPT='application/msgpack')
+        self.assertEqual(status.HTTP_200_OK, response.status_code)
+        self.assertEqual('application/msgpack', response['Content-Type'])
+        operation = msgpack.unpackb(response.content)[0]
+        self.assertEqual('10.10', operation['amount'])
+        self.assertEqual('2021-03-01', operation['date'])
+
+        # the cached JSON response is not served for MessagePack
+        response = self.get(f'/operations/{self.wallet.id}/deposit/')
+        self.assertEqual('10.10', response.json()[0]['amount'])
+        response = self.get(f'/operations/{self.wallet.id}/deposit/',
+                            HTTP_ACCEPT='application/msgpack')
+        self.assertEqual('application/msgpack', response['Content-Type'])
+
+    def test_msgpack_request(self):
+        wallet = Wallet.objects.create(name='wallet 2', client_firstname='firstname 2',
+                                       client_surname='surname 2')
+        response = self.client.post(f'/wallets/{wallet.id}/deposits/',
+                                    data=msgpack.packb({'amount': '5.25'}),
+                                    content_type='application/msgpack',
+                                    HTTP_AUTHORIZATION=f'Token {self.token}')
+        self.assertEqual(status.HTTP_200_OK, response.status_code)
+        wallet.refresh_from_db()
+        self.assertEqual(Decimal('5.25'), wallet.balance)
+
+        response = self.client.post(f'/wallets/{wallet.id}/deposits/', data=b'\xc1',
+                                    content_type='application/msgpack',
+                                    HTTP_AUTHORIZATION=f'Token {self.token}')
+        self.assertEqual(status.HTTP_400_BAD_REQUEST, response.status_code)
+
+    def test_fallback_without_optional_packages(self):
+        with mock.patch.object(serializers, 'orjson', None), \
+                mock.patch.object(serializers, 'msgpack', None):
+            response = self.get(f'/operations/{self.wallet.id}/deposit/',
+                                HTTP_ACCEPT='application/msgpack')
+            self.assertEqual('application/json', response['Content-Type'])
+            self.assertEqual('10.10', response.json()[0]['amount'])
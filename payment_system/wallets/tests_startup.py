@@ -0,0 +1,44 @@
+import io
+import json
+import os
+import tempfile
+from unittest import mock
+
+from django.core.management import call_command
+from django.test import SimpleTestCase
+
+from wallets.startup import parse_import_times, import_report
+
+IMPORT_TIMES = """\
+import time: self [us] | cumulative | imported package
+import time:       120 |        120 |     django.utils.version
+import time:       300 |        420 |   django
+import time:        50 |         50 |   json
+import time:        30 |        500 | wallets
+"""
+
+
+class StartupTestCase(SimpleTestCase):
+    def test_parse_import_times(self):
+        modules = parse_import_times(IMPORT_TIMES + 'Traceback\n')
+        self.assertEqual([('django.utils.version', 120, 120), ('django', 300, 420),
+                          ('json', 50, 50), ('wallets', 30, 500)], modules)
+
+        report = import_report(modules, top=2)
+        self.assertEqual(0.5, report['total_ms'])
+        self.assertEqual({'django': 0.4, 'json': 0.1}, report['packages_ms'])
+        self.assertEqual({'wallets': 0.5, 'django': 0.4}, report['modules_cumulative_ms'])
+
+    def test_startup_report_of_api_profile(self):
+        out = io.StringIO()
+        with tempfile.TemporaryDirectory() as directory, \
+                mock.patch.dict(os.environ, WALLETS_DB_NAME=os.path.join(directory, 'db')):
+            call_command('startup_report', profiles=['payment_system.settings_api'],
+                         runs=1, requests=2, stdout=out)
+        report = json.loads(out.getvalue())['payment_system.settings_api']
+        # no token
+        self.assertEqual(401, report['status'])
+        self.assertEqual(4, report['apps'])
+        self.assertIn('django', report['imports']['packages_ms'])
+        for key in ('setup_seconds', 'first_request_seconds', 'request_median_seconds'):
+            self.assertGreater(report[key], 0)
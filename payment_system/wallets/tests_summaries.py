@@ -0,0 +1,80 @@
+import datetime
+from decimal import Decimal
+
+from django.contrib.auth.models import User
+from django.core.cache import caches
+from django.test import TestCase
+from rest_framework import status
+from rest_framework.authtoken.models import Token
+
+from wallets.models import Wallet, Operation
+from wallets.summaries import SUMMARY_CACHE
+
+
+class SummaryTestCase(TestCase):
+    def setUp(self):
+        caches[SUMMARY_CACHE].clear()
+        self.token = Token.objects.create(user=User.objects.create_user(username='test'))
+        self.wallet = Wallet.objects.create(name='wallet 1', client_firstname='firstname 1',
+                                            client_surname='surname 1')
+        Operation.objects.bulk_create([
+            Operation(name='deposit', wallet=self.wallet, amount=Decimal("100.00"),
+                      date=datetime.date(2021, 1, 4)),
+            Operation(name='deposit', wallet=self.wallet, amount=Decimal("50.50"),
+                      date=datetime.date(2021, 1, 10)),
+            Operation(name='withdrawal', wallet=self.wallet, amount=Decimal("20.00"),
+                      date=datetime.date(2021, 1, 11)),
+            Operation(name='withdrawal', wallet=self.wallet, amount=Decimal("30.00"),
+                      date=datetime.date(2021, 2, 1)),
+        ])
+        self.url = f'/wallets/{self.wallet.id}/summary/'
+
+    def get(self, **params):
+        return self.client.get(self.url, data=params, HTTP_AUTHORIZATION=f'Token {self.token}')
+
+    def test_week_summary(self):
+        response = self.get(period='week', **{'from': '2021-01-04', 'to': '2021-01-17'})
+        self.assertEqual(status.HTTP_200_OK, response.status_code)
+        self.assertEqual([
+            {'period_start': '2021-01-04', 'deposits': {'count': 2, 'total': '150.50'},
+             'withdrawals': {'count': 0, 'total': '0.00'}},
+            {'period_start': '2021-01-11', 'deposits': {'count': 0, 'total': '0.00'},
+             'withdrawals': {'count': 1, 'total': '20.00'}},
+        ], response.json()['summary'])
+
+    def test_partial_periods(self):
+        response = self.get(period='month', **{'from': '2021-01-05', 'to': '2021-02-01'})
+        self.assertEqual([
+            ('2021-01-01', 1, '50.50', 1, '20.00'),
+            ('2021-02-01', 0, '0.00', 1, '30.00'),
+        ], [(row['period_start'], row['deposits']['count'], row['deposits']['total'],
+             row['withdrawals']['count'], row['withdrawals']['total'])
+            for row in response.json()['summary']])
+
+    def test_closed_periods_are_cached(self):
+        params = {'period': 'month', 'from': '2021-01-01', 'to': '2021-03-31'}
+        first = self.get(**params).json()
+        Operation.objects.create(name='deposit', wallet=self.wallet, amount=Decimal("1.00"),
+                                 date=datetime.date(2021, 1, 5))
+        # the wallet lookup only
+        with self.assertNumQueries(1):
+            second = self.get(**params).json()
+        self.assertEqual(first, second)
+        self.assertEqual(2, second['summary'][0]['deposits']['count'])
+
+    def test_current_period_is_not_cached(self):
+        today = datetime.date.today()
+        params = {'period': 'day', 'from': today.isoformat(), 'to': today.isoformat()}
+        self.get(**params)
+        Operation.objects.create(name='deposit', wallet=self.wallet, amount=Decimal("1.00"))
+        self.assertEqual(1, self.get(**params).json()['summary'][0]['deposits']['count'])
+
+    def test_invalid_parameters(self):
+        self.assertEqual(status.HTTP_400_BAD_REQUEST, self.get(period='year').status_code)
+        self.assertEqual(status.HTTP_400_BAD_REQUEST,
+                         self.get(**{'from': '2021-02-01', 'to': '2021-01-01'}).status_code)
+        self.assertEqual(status.HTTP_400_BAD_REQUEST,
+                         self.get(**{'from': '1990-01-01', 'to': '2021-01-01'}).status_code)
+        response = self.client.get('/wallets/300/summary/',
+                                   HTTP_AUTHORIZATION=f'Token {self.token}')
+        self.assertEqual(status.HTTP_400_BAD_REQUEST, response.status_code)
@@ -1,6 +1,11 @@
 from django.contrib.auth.models import User
+from django.db import connection
 from django.test import TestCase
+from django.test.utils import CaptureQueriesContext
 from rest_framework import status
+from rest_framework.authtoken.models import Token
+
+from wallets.token_cache import token_cache
 
 
 class TokenTestCase(TestCase):
@@ -27,3 +32,46 @@ class TokenTestCase(TestCase):
         }
         response = self.client.post(url, data=data, content_type='application/json')
         self.assertEqual(status.HTTP_401_UNAUTHORIZED, response.status_code)
+
+
+class TokenCacheTestCase(TestCase):
+    def setUp(self):
+        token_cache.clear()
+        self.user = User.objects.create_user(username='test', password='test')
+        self.token = Token.objects.create(user=self.user)
+        self.url = '/wallets/'
+
+    def test_valid_token_is_cached(self):
+        self.client.get(self.url, HTTP_AUTHORIZATION=f'Token {self.token}')
+        hits = token_cache.hits
+        with CaptureQueriesContext(connection) as queries:
+            response = self.client.get(self.url, HTTP_AUTHORIZATION=f'Token {self.token}')
+        self.assertEqual(status.HTTP_200_OK, response.status_code)
+        self.assertFalse([query for query in queries.captured_queries
+                          if 'authtoken_token' in query['sql']])
+        self.assertEqual(hits + 1, token_cache.hits)
+
+    def test_invalid_token_is_cached(self):
+        self.client.get(self.url, HTTP_AUTHORIZATION='Token invalid')
+        negative_hits = token_cache.negative_hits
+        with CaptureQueriesContext(connection) as queries:
+            response = self.client.get(self.url, HTTP_AUTHORIZATION='Token invalid')
+        self.assertEqual(status.HTTP_401_UNAUTHORIZED, response.status_code)
+        self.assertFalse([query for query in queries.captured_queries
+                          if 'authtoken_token' in query['sql']])
+        self.assertEqual(negative_hits + 1, token_cache.negative_hits)
+
+    def test_deleted_token(self):
+        key = self.token.key
+        self.client.get(self.url, HTTP_AUTHORIZATION=f'Token {key}')
+        self.token.delete()
+        response = self.client.get(self.url, HTTP_AUTHORIZATION=f'Token {key}')
+        self.assertEqual(status.HTTP_401_UNAUTHORIZED, response.status_code)
+
+    def test_created_token(self):
+        key = Token.generate_key()
+        self.client.get(self.url, HTTP_AUTHORIZATION=f'Token {key}')
+        self.token.delete()
+        Token.objects.create(user=self.user, key=key)
+        response = self.client.get(self.url, HTTP_AUTHORIZATION=f'Token {key}')
+        self.assertEqual(status.HTTP_200_OK, response.status_code)
@@ -0,0 +1,120 @@
+import threading
+import time
+from collections import OrderedDict
+
+from django.conf import settings
+from rest_framework.authtoken.models import Token
+
+
+class TokenCache:
+    """
+    Per-process LRU cache of checked token keys.
+
+    Valid keys are kept for `ttl` seconds and invalid ones
+    for `negative_ttl` seconds, each store holds at most
+    `max_size` keys. Entries are dropped by the Token model signals
+    when a token is deleted or created, the TTL bounds the staleness
+    of tokens changed by other processes.
+    """
+    def __init__(self, max_size: int, ttl: float, negative_ttl: float):
+        self.max_size = max_size
+        self.ttl = ttl
+        self.negative_ttl = negative_ttl
+        self._valid = OrderedDict()
+        self._invalid = OrderedDict()
+        self._lock = threading.Lock()
+        self._generation = 0
+        self.hits = 0
+        self.negative_hits = 0
+        self.misses = 0
+
+    @staticmethod
+    def _lookup(store: OrderedDict, key: str, now: float) -> bool:
+        expires = store.get(key)
+        if expires is None:
+            return False
+
+        if expires < now:
+            del store[key]
+            return False
+
+        store.move_to_end(key)
+        return True
+
+    def _store(self, store: OrderedDict, key: str, expires: float) -> None:
+        store[key] = expires
+        store.move_to_end(key)
+        while len(store) > self.max_size:
+            store.popitem(last=False)
+
+    def get(self, key: str):
+        """
+        Returns the cached result for the key
+        or None if the key is not cached.
+        """
+        now = time.monotonic()
+        with self._lock:
+            if self._lookup(self._valid, key, now):
+                self.hits += 1
+                return True
+
+            if self._lookup(self._invalid, key, now):
+                self.negative_hits += 1
+                return False
+
+        return None
+
+    def is_valid(self, key: str) -> bool:
+        """
+        Returns True if the token with the key exists,
+        the database is queried only on a cache miss.
+        """
+        cached = self.get(key)
+        if cached is not None:
+            return cached
+
+        now = time.monotonic()
+        with self._lock:
+            self.misses += 1
+            generation = self._generation
+
+        valid = Token.objects.filter(key=key).exists()
+
+        with self._lock:
+            # skips the result if the token was changed during the query
+            if generation == self._generation:
+                if valid:
+                    self._store(self._valid, key, now + self.ttl)
+                else:
+                    self._store(self._invalid, key, now + self.negative_ttl)
+
+        return valid
+
+    def invalidate(self, key: str) -> None:
+        with self._lock:
+            self._generation += 1
+            self._valid.pop(key, None)
+            self._invalid.pop(key, None)
+
+    def clear(self) -> None:
+        with self._lock:
+            self._generation += 1
+            self._valid.clear()
+            self._invalid.clear()
+
+    def stats(self) -> dict:
+        with self._lock:
+            return {
+                'hits': self.hits,
+                'negative_hits': self.negative_hits,
+                'misses': self.misses,
+                'size': len(self._valid),
+                'negative_size': len(self._invalid),
+            }
+
+
+token_cache = TokenCache(
+    max_size=getattr(settings, 'WALLETS_TOKEN_CACHE_SIZE', 10000),
+    ttl=getattr(settings, 'WALLETS_TOKEN_CACHE_TTL', 60),
+    negative_ttl=getattr(settings, 'WALLETS_TOKEN_NEGATIVE_CACHE_TTL', 10),
+)
@@ -1,7 +1,13 @@
+from django.conf import settings
 from django.urls import re_path
 
 from wallets.views import deposits, withdrawals, crud_for_the_wallet, \
-    see_wallets_or_create
+    see_wallets_or_create, batch_withdrawals, wallet_balance, wallet_statement, \
+    provision_wallets, wallet_summary
+
+if settings.WALLETS_ASYNC_READS:
+    from wallets.async_views import crud_for_the_wallet_async as crud_for_the_wallet, \
+        see_wallets_or_create_async as see_wallets_or_create
 
 
 urlpatterns = [
@@ -9,5 +15,10 @@ urlpatterns = [
     re_path('^(?P<wallet_receiver>[0-9]+)/deposits/$', deposits),
     re_path('^(?P<wallet_sender>[0-9]+)/withdrawals/'
             '(?P<wallet_receiver>[0-9]+)/$', withdrawals),
+    re_path('^(?P<wallet_id>[0-9]+)/balance/$', wallet_balance),
+    re_path('^(?P<wallet_id>[0-9]+)/statement/$', wallet_statement),
+    re_path('^(?P<wallet_id>[0-9]+)/summary/$', wallet_summary),
+    re_path('^withdrawals/$', batch_withdrawals),
+    re_path('^bulk/$', provision_wallets),
     re_path('^$', see_wallets_or_create),
 ]
@@ -1,20 +1,34 @@
-import json
-from decimal import Decimal, ROUND_FLOOR, InvalidOperation
+import datetime
+from decimal import InvalidOperation
 
+from django.conf import settings
 from django.contrib.auth.hashers import check_password
 from django.contrib.auth.models import User
 from django.core.handlers.wsgi import WSGIRequest
-from django.core.paginator import Paginator
 from django.db import transaction, IntegrityError
-from django.db.models import F
-from django.http import JsonResponse, HttpResponse
+from django.http import HttpResponse, StreamingHttpResponse
 from django.shortcuts import render
 from django.views.decorators.http import require_http_methods
 from rest_framework import status
 from rest_framework.authtoken.models import Token
 
+from wallets.archive import history
+from wallets.balances import add_balances, credit, debit, sweep, total_balance
+from wallets.checkpoints import record_checkpoints, balance_as_of, statement
 from wallets.decorators import decorator_for_authorization
-from wallets.models import Wallet, Operation
+from wallets.export import EXPORT_FORMATS
+from wallets.group_commit import GroupCommitter
+from wallets.idempotency import idempotent
+from wallets.metrics import registry, render as render_metrics
+from wallets.money import Money, valid_amount
+from wallets.pagination import get_page, page_response
+from wallets.provisioning import clean_clients, create_wallets
+from wallets.summaries import PERIODS, summary
+from wallets.replicas import replica_reads
+from wallets.response_cache import cached_response, bump_versions
+from wallets.retries import retry_on_lock_errors, TransactionAborted
+from wallets.serializers import ApiResponse, parse_body
+from wallets.models import Wallet, WalletSlot, Operation
 
 
 exceptions = (
@@ -26,33 +40,183 @@ exceptions = (
     Wallet.DoesNotExist,
 )
 
+BATCH_MAX_ITEMS = getattr(settings, 'WALLETS_BATCH_MAX_ITEMS', 1000)
+PROVISION_MAX_ITEMS = getattr(settings, 'WALLETS_PROVISION_MAX_ITEMS', 50000)
+
 
 def documentation(request: WSGIRequest) -> HttpResponse:
     """Returns documentation html page"""
     return render(request, "index.html")
 
 
+@transaction.non_atomic_requests
+@require_http_methods(["GET"])
+def metrics(request: WSGIRequest) -> HttpResponse:
+    """
+    Returns the request metrics of all worker processes
+    in the Prometheus text format.
+    """
+    return HttpResponse(render_metrics(registry.collect()),
+                        content_type='text/plain; version=0.0.4; charset=utf-8')
+
+
+@retry_on_lock_errors
 @transaction.atomic
-def transfer_money(sender: int, receiver: int, amount: Decimal) -> None:
+def transfer_money(sender: int, receiver: int, amount: Money) -> None:
     """
     Transfers money from the sender's wallet to the receiver's wallet
     if the sender's wallet balance is greater than or equal
     to the amount of money entered.
+
+    The balance check and the debit are done by one conditional UPDATE,
+    the operations and the daily checkpoints are written
+    by one statement each. Hot wallets may take a few more statements
+    (see wallets.balances).
+
+    The wallets are updated in the order of their ids, so the row locks
+    of opposite transfers are taken in the same order and they wait
+    for each other instead of deadlocking. The remaining lock conflicts
+    are retried (see wallets.retries).
     """
-    Wallet.objects.filter(pk=sender).update(balance=F('balance') - amount)
-    if Wallet.objects.get(pk=sender).balance < Decimal("0.00"):
+    checkpoints = {}
+    credited = credit(receiver, amount) if receiver < sender else None
+    debited = debit(sender, amount, checkpoints)
+    if debited is None:
         raise ValueError
 
-    Wallet.objects.filter(pk=receiver).update(balance=F('balance') + amount)
-    Operation.objects.create(name='deposit', wallet=Wallet.objects.get(pk=receiver),
-                             amount=amount)
-    Operation.objects.create(name='withdrawal', wallet=Wallet.objects.get(pk=sender),
-                             amount=amount)
+    if receiver >= sender:
+        credited = credit(receiver, amount)
+    if credited is None:
+        raise Wallet.DoesNotExist
+
+    today = datetime.date.today()
+    Operation.objects.bulk_create([
+        Operation(name='deposit', wallet_id=receiver, amount=amount, date=today),
+        Operation(name='withdrawal', wallet_id=sender, amount=amount, date=today),
+    ])
+    add_totals(checkpoints, (sender, debited), withdrawals=amount.cents)
+    add_totals(checkpoints, (receiver, credited), deposits=amount.cents)
+    record_checkpoints(today, checkpoints)
+    bump_versions([sender, receiver])
+
+
+@retry_on_lock_errors
+@transaction.atomic
+def deposit_money(receiver: int, amount: Money) -> None:
+    """
+    Transfers money to the receiver's wallet.
+    """
+    credited = credit(receiver, amount)
+    if credited is None:
+        raise Wallet.DoesNotExist
+
+    today = datetime.date.today()
+    Operation.objects.create(name='deposit', wallet_id=receiver, amount=amount,
+                             date=today)
+    record_checkpoints(today, {(receiver, credited): (amount.cents, 0)})
+    bump_versions([receiver])
+
+
+def add_totals(checkpoints: dict, key: tuple, deposits: int = 0,
+               withdrawals: int = 0) -> None:
+    """
+    Adds the amounts in cents to the (deposits, withdrawals) totals
+    of the checkpoint of the (wallet, slot).
+    """
+    current = checkpoints.get(key, (0, 0))
+    checkpoints[key] = (current[0] + deposits, current[1] + withdrawals)
+
+
+@transaction.atomic
+def set_hot_mode(wallet_id: int, slots: int) -> None:
+    """
+    Splits the wallet balance between the wallet row and `slots` slots
+    (see wallets.balances), 0 turns the hot mode off.
+    Existing slot balances are moved to the wallet row.
+
+    All slot rows are locked before the sweep, so no credit changes
+    them until the commit, and only the empty slots are deleted.
+    A credit waiting for a deleted slot goes to the wallet row.
+    """
+    wallet = Wallet.objects.select_for_update().get(pk=wallet_id)
+    list(WalletSlot.objects.select_for_update().filter(wallet=wallet).values_list('pk'))
+    Wallet.objects.filter(pk=wallet_id).update(slots=slots)
+    checkpoints = {}
+    sweep([wallet_id], checkpoints)
+    WalletSlot.objects.filter(wallet=wallet, slot__gt=slots, balance=0).delete()
+    WalletSlot.objects.bulk_create([
+        WalletSlot(wallet=wallet, slot=slot) for slot in range(wallet.slots + 1, slots + 1)
+    ], ignore_conflicts=True)
+    record_checkpoints(datetime.date.today(), checkpoints)
+
+
+@retry_on_lock_errors
+@transaction.atomic
+def transfer_money_batch(transfers: list) -> list:
+    """
+    Applies the list of (sender, receiver, amount) transfers
+    in one transaction and returns the status of each transfer.
+    A transfer with the sender None is a deposit.
+
+    Transfers are applied in order, so a transfer can spend money
+    received by the sender earlier in the same batch.
+    The slots of hot wallets are moved to the wallet rows first.
+    A transfer is rejected (status 400) if one of the wallets
+    does not exist or the sender's balance is insufficient,
+    the rejected transfer does not affect the other ones.
+    """
+    wallet_ids = {pk for sender, receiver, _ in transfers
+                  for pk in (sender, receiver) if pk is not None}
+    balances = {pk: balance.cents for pk, balance in Wallet.objects.select_for_update()
+                .order_by('pk').filter(pk__in=wallet_ids).values_list('pk', 'balance')}
+
+    today = datetime.date.today()
+    totals = {}
+    sweep(list(balances), totals)
+    if totals:
+        balances = {pk: balance.cents for pk, balance in
+                    Wallet.objects.filter(pk__in=wallet_ids).values_list('pk', 'balance')}
+    deltas = {}
+    operations_list = []
+    results = []
+    for sender, receiver, amount in transfers:
+        cents = amount.cents
+        if receiver not in balances or sender is not None and (
+                sender not in balances or balances[sender] < cents):
+            results.append(status.HTTP_400_BAD_REQUEST)
+            continue
+
+        balances[receiver] += cents
+        deltas[receiver] = deltas.get(receiver, 0) + cents
+        add_totals(totals, (receiver, 0), deposits=cents)
+        operations_list.append(Operation(name='deposit', wallet_id=receiver,
+                                         amount=amount, date=today))
+        if sender is not None:
+            balances[sender] -= cents
+            deltas[sender] = deltas.get(sender, 0) - cents
+            add_totals(totals, (sender, 0), withdrawals=cents)
+            operations_list.append(Operation(name='withdrawal', wallet_id=sender,
+                                             amount=amount, date=today))
+        results.append(status.HTTP_200_OK)
+
+    add_balances(deltas)
+    Operation.objects.bulk_create(operations_list)
+    record_checkpoints(today, totals)
+    bump_versions(pk for pk, delta in deltas.items() if delta)
+    return results
+
+
+group_committer = GroupCommitter(
+    transfer_money_batch,
+    max_size=getattr(settings, 'WALLETS_GROUP_COMMIT_MAX_SIZE', 64),
+    max_wait=getattr(settings, 'WALLETS_GROUP_COMMIT_MAX_WAIT', 0.002),
+    timeout=getattr(settings, 'WALLETS_GROUP_COMMIT_TIMEOUT', 5.0),
+)
 
 
 @transaction.non_atomic_requests
 @require_http_methods(["POST"])
-def get_token(request: WSGIRequest) -> JsonResponse:
+def get_token(request: WSGIRequest) -> ApiResponse:
     """
     Returns the user's token
     if the user was successfully authorized.
@@ -62,7 +226,7 @@ def get_token(request: WSGIRequest) -> JsonResponse:
     If the user has been authorized before,
     the existing token is returned.
     """
-    data = json.loads(request.body)
+    data = parse_body(request)
     username = data.get('username')
     password = data.get('password')
 
@@ -72,16 +236,63 @@ def get_token(request: WSGIRequest) -> JsonResponse:
         token = Token.objects.filter(user=user).first()
         token = Token.objects.create(user=user) if not token else token
 
-        return JsonResponse({'Token': f'{token}'})
+        return ApiResponse({'Token': f'{token}'})
 
-    return JsonResponse(['Invalid username or password'], safe=False,
+    return ApiResponse(['Invalid username or password'], safe=False,
                         status=status.HTTP_401_UNAUTHORIZED)
 
 
+def read_wallets(request: WSGIRequest) -> ApiResponse:
+    """
+    Returns the requested page of wallets.
+    """
+    wallet_list = Wallet.objects.values('id', 'name', 'client_firstname',
+                                        'client_surname')
+    try:
+        return page_response(*get_page(request, wallet_list, ('id',)))
+    except ValueError:
+        return ApiResponse({}, status=status.HTTP_400_BAD_REQUEST)
+
+
+@cached_response(lambda wallet_id: (wallet_id, 'wallet'))
+def read_wallet(wallet_id: int) -> ApiResponse:
+    """
+    Returns all data about the wallet.
+    """
+    wallet = Wallet.objects.filter(id=wallet_id) \
+        .values('id', 'name', 'client_firstname', 'client_surname') \
+        .annotate(balance=total_balance())
+    if wallet:
+        return ApiResponse(list(wallet), safe=False)
+
+    return ApiResponse([f'Wallet with id={wallet_id} does not exist'],
+                        safe=False, status=status.HTTP_400_BAD_REQUEST)
+
+
+@cached_response(lambda request, wallet_id, operation: (
+    wallet_id, f'operations:{operation}:{sorted(request.GET.lists())}'))
+def read_operations(request: WSGIRequest, wallet_id: int,
+                    operation: str) -> ApiResponse:
+    """
+    Returns the requested page of operations on the wallet.
+    """
+    querysets = get_operations(request, wallet_id, operation)
+    if querysets is None:
+        return ApiResponse({}, status=status.HTTP_400_BAD_REQUEST)
+
+    ordering = querysets[0].query.order_by
+    try:
+        return page_response(*get_page(request, [queryset.values() for queryset in querysets],
+                                       ordering))
+    except ValueError:
+        return ApiResponse({}, status=status.HTTP_400_BAD_REQUEST)
+
+
 @decorator_for_authorization
+@replica_reads
 @transaction.non_atomic_requests
 @require_http_methods(["GET", "POST"])
-def see_wallets_or_create(request: WSGIRequest) -> JsonResponse:
+def see_wallets_or_create(request: WSGIRequest) -> ApiResponse:
     """
     If HTTP method - GET:
     returns information about all wallets.
@@ -90,40 +301,64 @@ def see_wallets_or_create(request: WSGIRequest) -> JsonResponse:
     creates the new wallet.
     """
     if request.method == "GET":
-        wallet_list = Wallet.objects.all()
-        paginator = Paginator(wallet_list, 25)
-
-        page_number = request.GET.get('page')
-        page_obj = paginator.get_page(page_number)
-        result = page_obj.object_list.values('id', 'name', 'client_firstname',
-                                             'client_surname')
-        return JsonResponse(list(result), safe=False)
+        return read_wallets(request)
 
     if request.method == "POST":
-        data = json.loads(request.body)
-        wallet_pk = Wallet.objects.all().last().pk
-        if not (data.get('client_firstname') and data.get('client_surname')):
-            return JsonResponse(['Enter the correct data'], safe=False,
+        data = parse_body(request)
+        clients, invalid = clean_clients([data])
+        if invalid:
+            return ApiResponse(['Enter the correct data'], safe=False,
                                 status=status.HTTP_400_BAD_REQUEST)
 
-        fields = {
-            'name': f'wallet {wallet_pk + 1}',
-            'client_firstname': data.get('client_firstname'),
-            'client_surname': data.get('client_surname'),
-        }
         try:
-            Wallet.objects.create(**fields)
-            return JsonResponse([f'The wallet with id={wallet_pk + 1} created'],
+            wallet_pk = create_wallets(clients)[0]
+            return ApiResponse([f'The wallet with id={wallet_pk} created'],
                                 safe=False, status=status.HTTP_201_CREATED)
         except exceptions:
-            return JsonResponse(['The wallet can not be created'], safe=False,
+            return ApiResponse(['The wallet can not be created'], safe=False,
                                 status=status.HTTP_400_BAD_REQUEST)
 
 
 @decorator_for_authorization
+@replica_reads
+@transaction.non_atomic_requests
+@require_http_methods(["POST"])
+def provision_wallets(request: WSGIRequest) -> ApiResponse:
+    """
+    Called when requesting to create many wallets at once.
+
+    Expects the list of clients in the "wallets" key,
+    each client is {"client_firstname": name, "client_surname": name}.
+    Creates all the wallets in one transaction and returns
+    their ids in the same order with status 201-CREATED.
+    If the request or any client is invalid returns status 400-BAD REQUEST
+    with the indexes of the invalid clients.
+    """
+    try:
+        items = parse_body(request)['wallets']
+        if not (isinstance(items, list) and 0 < len(items) <= PROVISION_MAX_ITEMS):
+            raise ValueError
+    except exceptions + (TypeError,):
+        return ApiResponse({}, status=status.HTTP_400_BAD_REQUEST)
+
+    clients, invalid = clean_clients(items)
+    if invalid:
+        return ApiResponse({'invalid': invalid}, status=status.HTTP_400_BAD_REQUEST)
+
+    try:
+        with transaction.atomic():
+            ids = create_wallets(clients)
+    except exceptions:
+        return ApiResponse({}, status=status.HTTP_400_BAD_REQUEST)
+
+    return ApiResponse({'ids': ids}, status=status.HTTP_201_CREATED)
+
+
+@decorator_for_authorization
+@replica_reads
 @transaction.non_atomic_requests
 @require_http_methods(["GET", "POST", "DELETE"])
-def crud_for_the_wallet(request: WSGIRequest, wallet_id: str) -> JsonResponse:
+def crud_for_the_wallet(request: WSGIRequest, wallet_id: str) -> ApiResponse:
     """
     If HTTP method - GET:
     Returns all data about the selected wallet.
@@ -135,20 +370,21 @@ def crud_for_the_wallet(request: WSGIRequest, wallet_id: str) -> JsonResponse:
     Updates the selected wallet.
     """
     wallet_id = int(wallet_id)
-    wallet = Wallet.objects.filter(id=wallet_id)
+    if request.method == 'GET':
+        return read_wallet(wallet_id)
 
-    if wallet and request.method == 'GET':
-        return JsonResponse(list(wallet.values()), safe=False)
+    wallet = Wallet.objects.filter(id=wallet_id)
 
     if wallet and request.method == 'DELETE':
         Wallet.objects.get(pk=wallet_id).delete()
-        return JsonResponse([f'Wallet with id={wallet_id} deleted'], safe=False)
+        bump_versions([wallet_id])
+        return ApiResponse([f'Wallet with id={wallet_id} deleted'], safe=False)
 
     if wallet and request.method == 'POST':
         w = Wallet.objects.get(pk=wallet_id)
-        data = json.loads(request.body)
+        data = parse_body(request)
         if not (data.get('client_firstname') and data.get('client_surname')):
-            return JsonResponse(['Enter the correct data'], safe=False,
+            return ApiResponse(['Enter the correct data'], safe=False,
                                 status=status.HTTP_400_BAD_REQUEST)
 
         fields = {
@@ -157,85 +393,103 @@ def crud_for_the_wallet(request: WSGIRequest, wallet_id: str) -> JsonResponse:
         }
         try:
             wallet.update(**fields)
+            bump_versions([wallet_id])
         except exceptions:
-            return JsonResponse(['The wallet can not be updated.'], safe=False,
+            return ApiResponse(['The wallet can not be updated.'], safe=False,
                                 status=status.HTTP_400_BAD_REQUEST)
 
-        return JsonResponse([f'Wallet with id={wallet_id} updated'], safe=False)
+        return ApiResponse([f'Wallet with id={wallet_id} updated'], safe=False)
 
-    return JsonResponse([f'Wallet with id={wallet_id} does not exist'],
+    return ApiResponse([f'Wallet with id={wallet_id} does not exist'],
                         safe=False, status=status.HTTP_400_BAD_REQUEST)
 
 
 @decorator_for_authorization
+@replica_reads
+@idempotent
 @transaction.non_atomic_requests
 @require_http_methods(["POST"])
-def deposits(request: WSGIRequest, wallet_receiver: str) -> JsonResponse:
+def deposits(request: WSGIRequest, wallet_receiver: str) -> ApiResponse:
     """
     Called when requesting to transfer money to
     the customer's wallet.
 
     Returns status 200-OK if it can be done
-    otherwise returns status 400-BAD REQUEST.
+    otherwise returns status 400-BAD REQUEST,
+    or 503-SERVICE UNAVAILABLE if it failed by lock conflicts.
+    With WALLETS_GROUP_COMMIT the deposit is applied
+    by the group commit writer (see wallets.group_commit).
     """
     wallet_id = int(wallet_receiver)
     try:
-        data = json.loads(request.body)
-        amount = Decimal(data['amount'])
-        amount = amount.quantize(Decimal("1.00"), ROUND_FLOOR)
-        if amount > Decimal("0.00"):
-            with transaction.atomic():
-                Wallet.objects.filter(id=wallet_id).update(balance=F('balance') + amount)
-                Operation.objects.create(name='deposit', amount=amount,
-                                         wallet=Wallet.objects.get(id=wallet_id))
-                return JsonResponse({}, status=status.HTTP_200_OK)
+        data = parse_body(request)
+        amount = Money.parse(data['amount'])
+        if valid_amount(amount):
+            if getattr(settings, 'WALLETS_GROUP_COMMIT', False):
+                return ApiResponse({}, status=group_committer.submit(None, wallet_id, amount))
+
+            deposit_money(wallet_id, amount)
+            return ApiResponse({}, status=status.HTTP_200_OK)
 
+    except TransactionAborted:
+        return ApiResponse({}, status=status.HTTP_503_SERVICE_UNAVAILABLE)
     except exceptions:
-        return JsonResponse({}, status=status.HTTP_400_BAD_REQUEST)
+        return ApiResponse({}, status=status.HTTP_400_BAD_REQUEST)
 
-    return JsonResponse({}, status=status.HTTP_400_BAD_REQUEST)
+    return ApiResponse({}, status=status.HTTP_400_BAD_REQUEST)
 
 
 @transaction.non_atomic_requests
 @decorator_for_authorization
+@replica_reads
+@idempotent
 @require_http_methods(["POST"])
 def withdrawals(request: WSGIRequest, wallet_sender: str,
-                wallet_receiver: str) -> JsonResponse:
+                wallet_receiver: str) -> ApiResponse:
     """
     Called when requesting to transfer money to
     the customer's wallet from another wallet.
 
     Returns status 200-OK if it can be done
-    otherwise returns status 400-BAD REQUEST.
+    otherwise returns status 400-BAD REQUEST,
+    or 503-SERVICE UNAVAILABLE if it failed by lock conflicts.
+    With WALLETS_GROUP_COMMIT the transfer is applied
+    by the group commit writer (see wallets.group_commit).
     """
     wallet_sender = int(wallet_sender)
     wallet_receiver = int(wallet_receiver)
     try:
-        data = json.loads(request.body)
-        amount = Decimal(data['amount'])
-        amount = amount.quantize(Decimal("1.00"), ROUND_FLOOR)
-        if amount > Decimal("0.00"):
+        data = parse_body(request)
+        amount = Money.parse(data['amount'])
+        if valid_amount(amount):
+            if getattr(settings, 'WALLETS_GROUP_COMMIT', False):
+                return ApiResponse({}, status=group_committer.submit(
+                    wallet_sender, wallet_receiver, amount))
+
             transfer_money(wallet_sender, wallet_receiver, amount)
-            return JsonResponse({}, status=status.HTTP_200_OK)
+            return ApiResponse({}, status=status.HTTP_200_OK)
 
+    except TransactionAborted:
+        return ApiResponse({}, status=status.HTTP_503_SERVICE_UNAVAILABLE)
     except exceptions:
-        return JsonResponse({}, status=status.HTTP_400_BAD_REQUEST)
+        return ApiResponse({}, status=status.HTTP_400_BAD_REQUEST)
 
-    return JsonResponse({}, status=status.HTTP_400_BAD_REQUEST)
+    return ApiResponse({}, status=status.HTTP_400_BAD_REQUEST)
 
 
-@transaction.non_atomic_requests
-@decorator_for_authorization
-@require_http_methods(["GET"])
-def operations(request: WSGIRequest, wallet_id: str,
-               operation: str) -> JsonResponse:
+def get_operations(request: WSGIRequest, wallet_id: int, operation: str):
     """
-    Returns operations (deposit/withdrawal/all operations)
-    on the desired wallet in JSON format.
+    Returns the querysets of the operations and of the archived
+    operations (deposit/withdrawal/all operations) on the wallet
+    in the order they are read in (see wallets.archive.history),
+    ordered by the "filter" GET parameter: "date" (default) or "-date",
+    ties are ordered by id.
+
+    Returns None if the wallet does not exist
+    or the operation or the filter is invalid.
     """
-    wallet_id = int(wallet_id)
     if not Wallet.objects.filter(id=wallet_id):
-        return JsonResponse({}, status=status.HTTP_400_BAD_REQUEST)
+        return None
 
     operation_cases = (
         '',
@@ -243,20 +497,187 @@ def operations(request: WSGIRequest, wallet_id: str,
         'withdrawal',
     )
     if operation not in operation_cases:
-        return JsonResponse({}, status=status.HTTP_400_BAD_REQUEST)
+        return None
 
-    operations_qs = Operation.objects.filter(wallet=wallet_id)
+    filters = {'wallet': wallet_id}
     if operation:
-        operations_qs = operations_qs.filter(name=operation)
+        filters['name'] = operation
 
     filter_ = request.GET.get('filter')
-    if filter_ in ('date', '-date'):
-        operations_qs = operations_qs.order_by(filter_)
-    elif filter_:
-        return JsonResponse({}, status=status.HTTP_400_BAD_REQUEST)
-
-    paginator = Paginator(operations_qs, 25)
-    page_number = request.GET.get('page')
-    page_obj = paginator.get_page(page_number)
-    result = page_obj.object_list.values()
-    return JsonResponse(list(result), safe=False)
+    if filter_ == '-date':
+        return history(filters, ('-date', '-id'))
+    if filter_ in ('date', None):
+        return history(filters, ('date', 'id'))
+
+    return None
+
+
+@transaction.non_atomic_requests
+@decorator_for_authorization
+@replica_reads
+@require_http_methods(["GET"])
+def operations(request: WSGIRequest, wallet_id: str,
+               operation: str) -> ApiResponse:
+    """
+    Returns operations (deposit/withdrawal/all operations)
+    on the desired wallet in JSON format.
+
+    Operations are paginated by the (date, id) cursor,
+    see wallets.pagination.get_page.
+    """
+    return read_operations(request, int(wallet_id), operation)
+
+
+@transaction.non_atomic_requests
+@decorator_for_authorization
+@replica_reads
+@require_http_methods(["POST"])
+def batch_withdrawals(request: WSGIRequest) -> ApiResponse:
+    """
+    Called when requesting to make many transfers
+    between customers' wallets at once.
+
+    Expects the list of transfers in the "transfers" key,
+    each transfer is {"sender": id, "receiver": id, "amount": amount}.
+    Returns the list of transfers with the status of each one
+    (200-OK or 400-BAD REQUEST) in the same order.
+    If the request itself is invalid returns status 400-BAD REQUEST,
+    if the batch failed by lock conflicts 503-SERVICE UNAVAILABLE.
+    """
+    try:
+        items = parse_body(request)['transfers']
+        if not (isinstance(items, list) and 0 < len(items) <= BATCH_MAX_ITEMS):
+            raise ValueError
+
+        transfers = []
+        for item in items:
+            transfers.append((int(item['sender']), int(item['receiver']),
+                              Money.parse(item['amount'])))
+    except exceptions + (TypeError,):
+        return ApiResponse({}, status=status.HTTP_400_BAD_REQUEST)
+
+    valid = [valid_amount(amount) for _, _, amount in transfers]
+
+    try:
+        statuses = iter(transfer_money_batch(
+            [transfer for transfer, ok in zip(transfers, valid) if ok]
+        ))
+    except TransactionAborted:
+        return ApiResponse({}, status=status.HTTP_503_SERVICE_UNAVAILABLE)
+    except exceptions:
+        return ApiResponse({}, status=status.HTTP_400_BAD_REQUEST)
+
+    result = [
+        {
+            'sender': sender,
+            'receiver': receiver,
+            'amount': f'{amount}',
+            'status': next(statuses) if ok else status.HTTP_400_BAD_REQUEST,
+        }
+        for (sender, receiver, amount), ok in zip(transfers, valid)
+    ]
+    return ApiResponse(result, safe=False, status=status.HTTP_200_OK)
+
+
+@transaction.non_atomic_requests
+@decorator_for_authorization
+@replica_reads
+@require_http_methods(["GET"])
+def export_operations(request: WSGIRequest, wallet_id: str,
+                      operation: str) -> HttpResponse:
+    """
+    Streams all operations (deposit/withdrawal/all operations)
+    on the desired wallet in NDJSON (default) or CSV format
+    selected by the "format" GET parameter.
+    Operations are filtered the same way as in operations().
+    """
+    wallet_id = int(wallet_id)
+    querysets = get_operations(request, wallet_id, operation)
+    if querysets is None or request.GET.get('format', 'ndjson') not in EXPORT_FORMATS:
+        return ApiResponse({}, status=status.HTTP_400_BAD_REQUEST)
+
+    serializer, content_type = EXPORT_FORMATS[request.GET.get('format', 'ndjson')]
+    return StreamingHttpResponse(serializer(querysets), content_type=content_type)
+
+
+def parse_date(value: str, default: datetime.date) -> datetime.date:
+    """
+    Returns the date in YYYY-MM-DD format or the default if it is empty.
+    """
+    return datetime.date.fromisoformat(value) if value else default
+
+
+@transaction.non_atomic_requests
+@decorator_for_authorization
+@replica_reads
+@require_http_methods(["GET"])
+def wallet_balance(request: WSGIRequest, wallet_id: str) -> ApiResponse:
+    """
+    Returns the balance of the selected wallet
+    at the end of the day passed in the "date" GET parameter
+    (today by default).
+    """
+    wallet_id = int(wallet_id)
+    try:
+        wallet = Wallet.objects.get(pk=wallet_id)
+        date = parse_date(request.GET.get('date'), datetime.date.today())
+    except exceptions:
+        return ApiResponse({}, status=status.HTTP_400_BAD_REQUEST)
+
+    return ApiResponse({'wallet_id': wallet_id, 'date': date,
+                         'balance': balance_as_of(wallet, date)})
+
+
+@transaction.non_atomic_requests
+@decorator_for_authorization
+@replica_reads
+@require_http_methods(["GET"])
+def wallet_statement(request: WSGIRequest, wallet_id: str) -> ApiResponse:
+    """
+    Returns the statement of the selected wallet for the period
+    passed in the "from" and "to" GET parameters (both days included):
+    the opening and closing balances and the totals of deposits
+    and withdrawals. The current month is used by default.
+    """
+    wallet_id = int(wallet_id)
+    today = datetime.date.today()
+    try:
+        wallet = Wallet.objects.get(pk=wallet_id)
+        date_from = parse_date(request.GET.get('from'), today.replace(day=1))
+        date_to = parse_date(request.GET.get('to'), today)
+        if date_from > date_to:
+            raise ValueError
+    except exceptions:
+        return ApiResponse({}, status=status.HTTP_400_BAD_REQUEST)
+
+    return ApiResponse(statement(wallet, date_from, date_to))
+
+
+@transaction.non_atomic_requests
+@decorator_for_authorization
+@replica_reads
+@require_http_methods(["GET"])
+def wallet_summary(request: WSGIRequest, wallet_id: str) -> ApiResponse:
+    """
+    Returns the counts and totals of deposits and withdrawals
+    of the selected wallet per "period" GET parameter
+    (day (default), week or month) for the range passed
+    in the "from" and "to" GET parameters (both days included).
+    The current month is used by default.
+    """
+    wallet_id = int(wallet_id)
+    today = datetime.date.today()
+    period = request.GET.get('period', 'day')
+    try:
+        if period not in PERIODS or not Wallet.objects.filter(pk=wallet_id).exists():
+            raise ValueError
+        date_from = parse_date(request.GET.get('from'), today.replace(day=1))
+        date_to = parse_date(request.GET.get('to'), today)
+        if date_from > date_to:
+            raise ValueError
+        result = summary(wallet_id, period, date_from, date_to)
+    except exceptions:
+        return ApiResponse({}, status=status.HTTP_400_BAD_REQUEST)
+
+    return ApiResponse({'wallet_id': wallet_id, 'period': period, 'date_from': date_from,
+                         'date_to': date_to, 'summary': result})